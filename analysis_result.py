@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+群聊分析结果视图
+AnalysisResult 包装一个分析完成的 ChatAnalyzer，热词、贡献者、示例、趣味榜单、时段分布
+各部分在首次访问时计算并缓存，控制台报告、文件报告、图片报告和后端导出共用同一份结果，
+不再各自重复对词频和各个榜单 Counter 排序。
+"""
+
+from functools import cached_property
+
+# 趣味榜单：标题 -> ChatAnalyzer 上的计数属性（长文王单独处理，按插入顺序导出）
+RANKING_COUNTERS = (
+    ('话痨榜', 'user_msg_count'),
+    ('字数榜', 'user_char_count'),
+    ('长文王', None),
+    ('图片狂魔', 'user_image_count'),
+    ('合并转发王', 'user_forward_count'),
+    ('回复狂', 'user_reply_count'),
+    ('被回复最多', 'user_replied_count'),
+    ('艾特狂', 'user_at_count'),
+    ('被艾特最多', 'user_ated_count'),
+    ('表情帝', 'user_emoji_count'),
+    ('链接分享王', 'user_link_count'),
+    ('深夜党', 'user_night_count'),
+    ('早起鸟', 'user_morning_count'),
+    ('复读机', 'user_repeat_count'),
+)
+
+
+class AnalysisResult:
+    """分析结果的只读视图（分析器状态变化后需重新创建）"""
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.options = analyzer.options
+
+    @cached_property
+    def top_words(self):
+        """[(词, 词频)]，TOP_N 个"""
+        return self.analyzer.word_freq.most_common(self.options.top_n)
+
+    @cached_property
+    def contributors(self):
+        """热词 -> [(uin, 次数)]，每个词 CONTRIBUTOR_TOP_N 个"""
+        matrix = self.analyzer.word_contributors
+        top_n = self.options.contributor_top_n
+        return {word: matrix[word].most_common(top_n) for word, _ in self.top_words}
+
+    @cached_property
+    def samples(self):
+        """热词 -> 示例消息列表"""
+        word_samples = self.analyzer.word_samples
+        return {word: word_samples.get(word, []) for word, _ in self.top_words}
+
+    @cached_property
+    def rankings(self):
+        """榜单标题 -> [(uin, 数值)]"""
+        analyzer = self.analyzer
+        top_n = self.options.rank_top_n
+        rankings = {}
+        for title, attr in RANKING_COUNTERS:
+            if attr is None:
+                sorted_avg = sorted(analyzer.user_char_per_msg.items(), key=lambda x: x[1], reverse=True)[:top_n]
+                rankings[title] = [(uin, f"{avg:.1f}字/条") for uin, avg in sorted_avg]
+            else:
+                rankings[title] = getattr(analyzer, attr).most_common(top_n)
+        return rankings
+
+    @cached_property
+    def hour_distribution(self):
+        """{'0'..'23': 消息数}"""
+        hours = self.analyzer.hour_distribution
+        return {str(h): hours.get(h, 0) for h in range(24)}
+
+    def get_top_words(self, n=None):
+        n = n or self.options.top_n
+        if n <= self.options.top_n:
+            return self.top_words[:n]
+        return self.analyzer.word_freq.most_common(n)
+
+    def get_contributors(self, word):
+        contributors = self.contributors.get(word)
+        if contributors is None:
+            contributors = self.analyzer.word_contributors[word].most_common(self.options.contributor_top_n)
+        return contributors
+
+    def get_samples(self, word):
+        samples = self.samples.get(word)
+        if samples is None:
+            samples = self.analyzer.word_samples.get(word, [])
+        return samples
+
+    def get_word_detail(self, word):
+        analyzer = self.analyzer
+        return {
+            'word': word,
+            'freq': analyzer.get_word_freq(word),
+            'samples': self.get_samples(word),
+            'contributors': [(analyzer.get_name(uin), count) for uin, count in self.get_contributors(word)]
+        }
+
+    def get_fun_rankings(self):
+        get_name = self.analyzer.get_name
+        return {title: [(get_name(uin), value) for uin, value in entries]
+                for title, entries in self.rankings.items()}
+
+    def to_json(self):
+        """导出JSON格式结果（包含uin信息），结果会被缓存，调用方不应修改"""
+        return self._json
+
+    @cached_property
+    def _json(self):
+        analyzer = self.analyzer
+        options = self.options
+        get_name = analyzer.get_name
+
+        top_words = []
+        for word, freq in self.top_words:
+            # 再次在导出阶段过滤停用词，保证报告中不包含停用词
+            if analyzer.use_stopwords and word in analyzer.stopwords:
+                continue
+            top_words.append({
+                'word': word,
+                'freq': freq,
+                'contributors': [
+                    {'name': get_name(uin), 'uin': uin, 'count': count}
+                    for uin, count in self.contributors[word]
+                ],
+                'samples': self.samples[word][:options.sample_count]
+            })
+
+        result = {
+            'chatName': analyzer.chat_name,
+            'messageCount': analyzer.message_count,
+            'topWords': top_words,
+            'rankings': {},
+            'hourDistribution': self.hour_distribution
+        }
+        if analyzer._word_stats is not None:
+            result['wordStats'] = analyzer._word_stats
+
+        # 趣味榜单（包含uin）
+        for title, entries in self.rankings.items():
+            result['rankings'][title] = [
+                {'name': get_name(uin), 'uin': uin, 'value': value} for uin, value in entries
+            ]
+        return result
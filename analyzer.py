@@ -3,42 +3,79 @@ import os
 import re
 import random
 import string
-import math
-# 尝试导入 jieba_fast（更快），如果失败则回退到 jieba（标准版本）
-try:
-    import jieba_fast as jieba
-except ImportError:
-    import jieba
+from array import array
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import config as cfg
 from utils import (
     is_emoji,
-    parse_timestamp,
-    parse_datetime,
     clean_text,
-    calculate_entropy,
     analyze_single_chars,
+    iter_messages,
+    NO_TIME,
+    epoch_to_hour,
+    resolve_date_range,
+    in_date_range,
 )
+from message_table import (
+    MessageTable,
+    MessageIndex,
+    FLAG_BOT_SUBTYPE,
+    FLAG_LINK,
+    FLAG_FORWARD,
+    MENTION_TEXT_ELEMENT,
+)
+from tokenizer import CachedTokenizer, TokenStreams, compile_word_pattern
+from options import AnalysisOptions, HOUR_NIGHT_OWL, HOUR_EARLY_BIRD
+from word_discovery import discover_words
+from sketches import CountMinSketch, SpaceSaving
+from contributors import ContributorMatrix
+from samples import WordSamples, reservoir_weight, reservoir_gap
+from analysis_result import AnalysisResult
+from progress import ProgressReporter
 from logger import get_logger, init_logging
 
 init_logging()
 
-# 设置 jieba 日志级别（jieba_fast 和 jieba 都支持，但标准 jieba 可能没有此方法）
-try:
-    if hasattr(jieba, 'setLogLevel') and hasattr(jieba, 'logging'):
-        jieba.setLogLevel(jieba.logging.INFO)
-except (AttributeError, Exception):
-    # 某些版本的 jieba 可能没有 setLogLevel，忽略错误
-    pass
-
 logger = get_logger('analyzer')
 
 _STOPWORDS_CACHE = None
 
 _DIGIT_SYMBOL_PATTERN = re.compile(r'^[\d\W]+$')
-_URL_PATTERN = re.compile(r'https?://')
 _SENTENCE_SPLIT_PATTERN = re.compile(r'[，。！？、；：""''（）\s\n\r,\.!?\(\)]')
 
+# 并行预处理：每个进程分到的段数，以及每段的最少文本数
+_PREPROCESS_CHUNKS_PER_WORKER = 4
+_PREPROCESS_MIN_CHUNK = 2000
+# 流式分析不保留消息表时，消息表中累积这么多行后清空一次
+_STREAM_BATCH_ROWS = 1024
+
+# 预处理 worker 进程内的分词器（由 _init_preprocess_worker 创建）
+_worker_tokenizer = None
+
+
+def _init_preprocess_worker(cache_size, added_words):
+    """进程池 initializer：每个 worker 只加载一次 jieba 词典，并补上主进程分词器已添加的词"""
+    global _worker_tokenizer
+    _worker_tokenizer = CachedTokenizer(cache_size)
+    _worker_tokenizer.warm_up()
+    for word, freq in added_words:
+        _worker_tokenizer.add_word(word, freq=freq)
+
+
+def _preprocess_chunk(items):
+    """
+    进程池 worker：对一段 (文本, @内容) 做清洗和分词，返回 (清洗后文本列表, TokenStreams)
+    分词结果用 worker 自己的词表编号，传回主进程的是整数数组而不是逐条的词元组
+    """
+    cleaned_texts = []
+    streams = TokenStreams()
+    for text, at_contents in items:
+        cleaned = clean_text(text, at_contents)
+        cleaned_texts.append(cleaned)
+        streams.append(_worker_tokenizer.cut(cleaned) if cleaned else ())
+    return cleaned_texts, streams
+
 def load_stopwords(force_enable=None):
     """
     加载停用词
@@ -114,18 +151,43 @@ def load_stopwords(force_enable=None):
     return _STOPWORDS_CACHE
 
 
+class _CandidateSkip(dict):
+    """近似模式的 skip 标记：只保存候选词编号（值为 False），其余编号查询时返回 True，不为整个词表分配标记"""
+
+    __slots__ = ()
+
+    def __init__(self, candidates):
+        super().__init__(dict.fromkeys(candidates, False))
+
+    def __missing__(self, wid):
+        return True
+
+
 class ChatAnalyzer:
-    def __init__(self, data, use_stopwords=None):
-        self.data = data
-        self.messages = data.get('messages', [])
-        self.chat_name = data.get('chatName', data.get('chatInfo', {}).get('name', '未知群聊'))
-
-        # 如果传入了use_stopwords参数，使用传入的值；否则使用配置文件的值
-        if use_stopwords is not None:
-            self.use_stopwords = use_stopwords
+    def __init__(self, data, use_stopwords=None, message_source=None, workers=None, options=None,
+                 progress=None):
+        """
+        Args:
+            data: MessageTable，或 load_json 的结果（包含messages和chatInfo）
+            use_stopwords: 是否使用停用词，None 表示使用 options 中的值
+            message_source: 可选的消息迭代器（流式模式），见 from_stream
+            workers: 文本清洗和分词的并行进程数，None 表示使用 options 中的值
+            options: AnalysisOptions 参数快照，None 表示从配置文件读取
+            progress: 可选的 ProgressReporter，analyze 期间报告各阶段进度
+        """
+        if isinstance(data, MessageTable):
+            self.table = data
+        elif message_source is not None:
+            self.table = MessageTable()
         else:
-            # 安全获取USE_STOPWORDS，如果不存在则默认为False
-            self.use_stopwords = getattr(cfg, 'USE_STOPWORDS', False)
+            self.table = MessageTable.from_data(data)
+        self.chat_name = self.table.chat_name
+
+        # 分析期间只读这份参数快照，不再访问全局 config
+        if options is None:
+            options = AnalysisOptions.from_config(cfg)
+        self.options = options = options.with_overrides(use_stopwords=use_stopwords, workers=workers)
+        self.use_stopwords = options.use_stopwords
         
         # 根据use_stopwords参数决定是否加载停用词
         if self.use_stopwords:
@@ -133,10 +195,30 @@ class ChatAnalyzer:
         else:
             self.stopwords = set()
         
-        self._filter_messages_and_build_mappings()
+        self.tokenizer = CachedTokenizer(options.tokenize_cache_size)
+        self.workers = options.workers
+        
+        self._filter_bot = options.filter_bot_messages
+        self._bot_uins = options.bot_uins
+        
+        self._message_source = message_source
+        self._keep_table = True
+        self.progress = progress if progress is not None else ProgressReporter()
+        self.date_range = self._parse_date_range()
+        self._uin_names = {}
+        self._uin_member_names = {}
+        self.uin_to_name = {}
+        self.message_index = MessageIndex()  # messageId 驻留编号 -> (发送者驻留编号, 时间)
+        self.rows = range(0)
+        self.message_count = 0
+        if message_source is None:
+            self._filter_messages_and_build_mappings()
         self.word_freq = Counter()
-        self.word_samples = defaultdict(list)
-        self.word_contributors = defaultdict(Counter)
+        self.word_samples = WordSamples()
+        self.word_contributors = ContributorMatrix()
+        self.word_sketch = None  # 近似模式下长尾词频的 Count-Min Sketch
+        self._word_stats = None  # 近似模式的误差说明，导出为 wordStats
+        self._result = None
         self.user_msg_count = Counter()
         self.user_char_count = Counter()
         self.user_char_per_msg = {}
@@ -156,109 +238,109 @@ class ChatAnalyzer:
         self.merged_words = {}
         self.single_char_stats = {}  
         self.cleaned_texts_with_sender = []  # 改为存储 (文本, 发送者uin) 元组
+        self.token_streams = TokenStreams()  # 与 cleaned_texts_with_sender 一一对应的分词结果
 
+    @classmethod
+    def from_stream(cls, filepath, use_stopwords=None, options=None, progress=None, keep_table=False):
+        """
+        流式分析模式：消息从解析器直接追加进消息表，并立即完成时间过滤、
+        映射构建和第一轮统计，整个文件只解析一遍。
+        
+        keep_table 为 False 时已统计过的行会被分批丢弃，消息表只保留驻留池（发送者、昵称、
+        messageId 等），分析后 analyzer.table 不能再用于个人报告；为 True 时保留完整消息表。
+        清洗后的文本和分词结果无论如何都会保留到分析结束（新词发现、词组合并和词频统计需要它们），
+        因此峰值内存仍随有效文本量增长，省下的是消息列表/消息表和第二次解析。
+        
+        与普通模式的区别：通过 msgId 解析回复目标时只能找到此前出现过的消息
+        （回复总是指向更早的消息，实际结果通常一致）。
+        """
+        chat_info = {}
+        analyzer = cls(None, use_stopwords=use_stopwords, message_source=iter(()), options=options,
+                       progress=progress)
+        # 时间范围下推到解析器，范围外的消息在读到 timestamp 时就被跳过；
+        # 第一轮统计与解析同步进行，进度按解析的字节数报告
+        analyzer._message_source = iter_messages(filepath, chat_info, date_range=analyzer.date_range,
+                                                 progress=progress)
+        analyzer._stream_chat_info = chat_info
+        analyzer._keep_table = keep_table
+        return analyzer
+
+    def _parse_date_range(self):
+        """解析参数中的时间范围，返回 resolve_date_range 的结果（None 表示不过滤）"""
+        message_start_date = self.options.start_date
+        message_end_date = self.options.end_date
+        
+        date_range = resolve_date_range(message_start_date, message_end_date)
+        if date_range is not None and date_range != (None, None):
+            time_range = []
+            if date_range[0] is not None:
+                time_range.append(f"从 {message_start_date}")
+            if date_range[1] is not None:
+                time_range.append(f"到 {message_end_date}")
+            logger.info(f"⏰ 时间范围过滤: {' '.join(time_range)}")
+        return date_range
+
+    def _in_date_range(self, row):
+        """消息是否落在配置的时间范围内（未配置范围时恒为 True）"""
+        return in_date_range(self.table.timestamps[row], self.date_range)
     
     def _filter_messages_and_build_mappings(self):
         """
-        合并时间过滤和构建 uin 到 name 及 msgid_to_sender 的映射，
+        合并时间过滤和构建 uin 到 name 的映射及 messageId 索引，
         减少两次遍历带来的性能开销
         """
-        # 安全获取时间过滤配置
-        message_start_date = getattr(cfg, 'MESSAGE_START_DATE', None)
-        message_end_date = getattr(cfg, 'MESSAGE_END_DATE', None)
-        
-        if message_start_date is None and message_end_date is None:
-            filtered_messages = self.messages
+        original_count = len(self.table)
+        if self.date_range is not None:
+            self.rows = array('I', (row for row in range(original_count) if self._in_date_range(row)))
+            if self.date_range != (None, None):
+                logger.info(f"   原始消息: {original_count} 条, 过滤后: {len(self.rows)} 条")
         else:
-            from datetime import datetime
-            start_dt = None
-            end_dt = None
-            
-            if message_start_date:
-                try:
-                    start_dt = datetime.strptime(message_start_date, '%Y-%m-%d')
-                    start_dt = start_dt.replace(hour=0, minute=0, second=0, microsecond=0)
-                    from datetime import timezone, timedelta
-                    start_dt = start_dt.replace(tzinfo=timezone(timedelta(hours=8)))
-                except Exception as e:
-                    logger.warning(f"起始日期格式错误: {message_start_date}, 错误: {e}")
-            
-            if message_end_date:
-                try:
-                    end_dt = datetime.strptime(message_end_date, '%Y-%m-%d')
-                    end_dt = end_dt.replace(hour=23, minute=59, second=59, microsecond=999999)
-                    from datetime import timezone, timedelta
-                    end_dt = end_dt.replace(tzinfo=timezone(timedelta(hours=8)))
-                except Exception as e:
-                    logger.warning(f"结束日期格式错误: {message_end_date}, 错误: {e}")
-            
-            filtered_messages = []
-            for msg in self.messages:
-                timestamp = msg.get('timestamp', '')
-                msg_dt = parse_datetime(timestamp)
-                if msg_dt is None:
-                    continue
-                if start_dt and msg_dt < start_dt:
-                    continue
-                if end_dt and msg_dt > end_dt:
-                    continue
-                filtered_messages.append(msg)
-            
-            filtered_count = len(filtered_messages)
-            original_count = len(self.messages)
-            if start_dt or end_dt:
-                time_range = []
-                if start_dt:
-                    time_range.append(f"从 {message_start_date}")
-                if end_dt:
-                    time_range.append(f"到 {message_end_date}")
-                logger.info(f"⏰ 时间范围过滤: {' '.join(time_range)}")
-                logger.info(f"   原始消息: {original_count} 条, 过滤后: {filtered_count} 条")
-
-        self.messages = filtered_messages
-        
-        uin_names = defaultdict(list)
-        uin_member_names = {}
-        msgid_to_sender = {}
-        all_uins = set()
-
-        for msg in self.messages:
-            if self._is_bot_message(msg):
-                continue
-            sender = msg.get('sender', {})
-            uin = sender.get('uin')
-            name = (sender.get('name') or '').strip()
-            msg_id = msg.get('messageId')
-            if uin:
-                all_uins.add(uin)
-            if uin and name:
-                if not uin_names[uin] or uin_names[uin][-1] != name:
-                    uin_names[uin].append(name)
-            if uin:
-                raw_msg = msg.get('rawMessage', {})
-                send_member_name = raw_msg.get('sendMemberName', '').strip()
-                if send_member_name:
-                    uin_member_names[uin] = send_member_name
-            if msg_id and uin:
-                msgid_to_sender[msg_id] = uin
-
-        self.uin_to_name = {}
-        for uin in all_uins:
+            self.rows = range(original_count)
+        self.message_count = len(self.rows)
+
+        for row in self.rows:
+            self._collect_sender_info(row)
+        self._build_name_mapping()
+
+    def _collect_sender_info(self, row):
+        """记录一行消息的发送者名称和 msgId，用于构建 uin_to_name / message_index"""
+        if self._is_bot_row(row):
+            return
+        table = self.table
+        sid = table.sender_ids[row]
+        if sid < 0:
+            return
+        name = table.names[row]
+        uin_names = self._uin_names.get(sid)
+        if uin_names is None:
+            uin_names = self._uin_names[sid] = []
+        if name >= 0 and (not uin_names or uin_names[-1] != name):
+            uin_names.append(name)
+        member_name = table.member_names[row]
+        if member_name >= 0:
+            self._uin_member_names[sid] = member_name
+        self.message_index.add(table.msg_ids[row], sid, table.timestamps[row])
+
+    def _build_name_mapping(self):
+        """根据收集到的名称记录为每个 uin 选出展示名"""
+        senders = self.table.senders.values
+        strings = self.table.strings.values
+        for sid, name_ids in self._uin_names.items():
+            uin = senders[sid]
+            names = [strings[name_id] for name_id in name_ids]
             chosen_name = None
             
             # 优先使用有效的name
-            if uin in uin_names:
-                names = uin_names[uin]
-                for name in reversed(names):
-                    if name != str(uin):
-                        chosen_name = name
-                        break
-                if chosen_name is None and names:
-                    chosen_name = names[-1]
+            for name in reversed(names):
+                if name != str(uin):
+                    chosen_name = name
+                    break
+            if chosen_name is None and names:
+                chosen_name = names[-1]
             
             # 其次使用sendMemberName
-            if chosen_name is None and uin in uin_member_names:
-                chosen_name = uin_member_names[uin]
+            if chosen_name is None and sid in self._uin_member_names:
+                chosen_name = strings[self._uin_member_names[sid]]
             
             # 兜底：使用uin本身
             if chosen_name is None or chosen_name == str(uin):
@@ -266,25 +348,20 @@ class ChatAnalyzer:
             
             self.uin_to_name[uin] = chosen_name
         
-        self.msgid_to_sender = msgid_to_sender
+        self._uin_names = {}
+        self._uin_member_names = {}
 
-    def _is_bot_message(self, msg):
+    def _is_bot_row(self, row):
         """判断是否为机器人消息（基于 subMsgType 或 配置的机器人UIN）"""
-        # 安全获取FILTER_BOT_MESSAGES，如果不存在则默认为True
-        filter_bot = getattr(cfg, 'FILTER_BOT_MESSAGES', True)
-        if not filter_bot:
+        if not self._filter_bot:
             return False
         
-        raw_msg = msg.get('rawMessage', {})
-        sub_msg_type = raw_msg.get('subMsgType', 0)
-        if sub_msg_type in [577, 65]:
+        if self.table.flags[row] & FLAG_BOT_SUBTYPE:
             return True
         
-        # 安全获取BOT_UINS，如果不存在则默认为空列表
-        bot_uins = getattr(cfg, 'BOT_UINS', [])
-        if bot_uins:
-            sender_uin = msg.get('sender', {}).get('uin')
-            if sender_uin and str(sender_uin) in [str(uin) for uin in bot_uins]:
+        if self._bot_uins:
+            sender_uin = self.table.sender(row)
+            if sender_uin and str(sender_uin) in self._bot_uins:
                 return True
         
         return False
@@ -293,101 +370,180 @@ class ChatAnalyzer:
         return self.uin_to_name.get(uin, f"未知用户({uin})")
 
     def analyze(self):
-        logger.info(f"📊 开始分析: {self.chat_name}")
-        logger.info(f"📝 消息总数: {len(self.messages)}")
+        progress = self.progress
+        if self._message_source is not None:
+            logger.info("📊 开始分析（流式模式，群名和消息总数在解析完成后确定）")
+        else:
+            logger.info(f"📊 开始分析: {self.chat_name}")
+            logger.info(f"📝 消息总数: {self.message_count}")
 
         logger.info("🧹 第一轮：处理消息，预处理文本、统计词频和趣味数据...")
-        self._process_messages_once()
+        if self._message_source is not None:
+            self._process_messages_once(self._stream_messages())
+            self._message_source = None
+        else:
+            preprocessed = None
+            if self.workers and self.workers > 1:
+                preprocessed = self._preprocess_parallel(self.rows)
+            progress.start('第一轮：统计消息', total=self.message_count)
+            self._process_messages_once(progress.track(self.rows), preprocessed)
 
         logger.info("🔤 分析单字独立性...")
+        progress.start('分析单字独立性')
         self.single_char_stats = analyze_single_chars(
             [text for text, _ in self.cleaned_texts_with_sender]
         )
 
         logger.info("🔍 新词发现...")
+        progress.start('新词发现')
         discovered_count = self._discover_new_words()  
+        if discovered_count > 0:
+            self._resegment_texts(self.discovered_words)
 
         logger.info("🔗 词组合并...")
+        progress.start('词组合并', total=len(self.token_streams))
         merged_count = self._merge_word_pairs()  
 
         if discovered_count > 0 or merged_count > 0:
             logger.info(f"🔄 发现 {discovered_count} 个新词，合并 {merged_count} 个词组")
-            logger.info("🔄 重新分词以应用新词...")
-            self._reprocess_word_frequency()
+            if merged_count > 0:
+                logger.info("🔄 重新分词以应用新词...")
+                self._resegment_texts(self.merged_words)
+
+        self._count_words()
         
         logger.info("🧹 释放临时内存...")
         if self.cleaned_texts_with_sender:
             memory_mb = len(self.cleaned_texts_with_sender) * 100 / 1024 / 1024
             self.cleaned_texts_with_sender.clear()
+            self.token_streams = TokenStreams()
             logger.debug(f"已释放约 {memory_mb:.1f} MB 内存")
 
+        self.tokenizer.log_stats()
+
         logger.info("🧹 过滤整理...")
+        progress.start('过滤整理')
         self._filter_results()
 
         logger.info("✅ 分析完成!")
 
-    def _process_messages_once(self):
-        """一次遍历实现预处理文本、词频统计、趣味统计"""
+    def _stream_messages(self):
+        """流式模式下的消息来源：边解析边追加到消息表，并做时间过滤和映射收集"""
+        table = self.table
+        keep_table = self._keep_table
+        for msg in self._message_source:
+            # 此前产出的行都已统计完（消费方处理完一行才会取下一行），可以安全地清空
+            if not keep_table and len(table) >= _STREAM_BATCH_ROWS:
+                table.clear_rows()
+            row = table.append(msg)
+            if not self._in_date_range(row):
+                continue
+            self.message_count += 1
+            self._collect_sender_info(row)
+            yield row
+        if not keep_table:
+            table.clear_rows()
+
+        self.chat_name = table.chat_name = self._stream_chat_info.get('name') or '未知群聊'
+        self._build_name_mapping()
+
+    def _row_text(self, row):
+        """行的文本，以及清洗时需要去掉的 @ 内容"""
+        table = self.table
+        text = table.text(row)
+        at_contents = []
+        if '@' in text:
+            strings = table.strings.values
+            for m in table.mentions(row):
+                content_id = table.mention_contents[m]
+                if table.mention_at_types[m] == 2 and content_id >= 0:
+                    at_contents.append(strings[content_id])
+        return text, at_contents
+
+    def _preprocess_parallel(self, rows):
+        """
+        用进程池并行完成文本清洗和分词，按行顺序返回 (清洗后文本, 词编号) 的迭代器，
+        与 _process_messages_once 中需要清洗的行一一对应；失败时返回 None 改为单进程处理
+        """
+        sender_ids = self.table.sender_ids
+        items = [self._row_text(row) for row in rows
+                 if not self._is_bot_row(row) and sender_ids[row] >= 0]
+        if not items:
+            return None
+
+        chunk_size = max(_PREPROCESS_MIN_CHUNK,
+                         -(-len(items) // (self.workers * _PREPROCESS_CHUNKS_PER_WORKER)))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        # 先在主进程加载词典，fork 出的 worker 直接继承
+        self.tokenizer.warm_up()
+        try:
+            self.progress.start('并行清洗分词', total=len(chunks), unit='段')
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks)),
+                                     initializer=_init_preprocess_worker,
+                                     initargs=(self.tokenizer.max_size, self.tokenizer.added_words)) as pool:
+                results = list(self.progress.track(pool.map(_preprocess_chunk, chunks), every=1))
+        except Exception as e:
+            logger.warning(f"⚠️ 并行预处理失败，改用单进程处理: {e}")
+            return None
+        logger.info(f"⚡ {self.workers} 个进程并行清洗分词 {len(items)} 条文本（{len(chunks)} 段）")
+        return self._remap_preprocessed(results)
+
+    def _remap_preprocessed(self, results):
+        """把各 worker 词表的编号映射到主进程的词表"""
+        vocab = self.token_streams.vocab
+        for cleaned_texts, streams in results:
+            mapping = vocab.mapping_from(streams.vocab)
+            for cleaned, ids in zip(cleaned_texts, streams):
+                yield cleaned, array('I', map(mapping.__getitem__, ids))
+
+    def _process_messages_once(self, rows, preprocessed=None):
+        """
+        一次遍历实现预处理文本、词频统计、趣味统计
+        
+        Args:
+            preprocessed: 可选，_preprocess_parallel 的结果，给出时直接使用其中的清洗和分词结果
+        """
 
         skipped = 0
         bot_filtered = 0
         prev_clean = None
         prev_sender = None
 
-        for msg in self.messages:
+        table = self.table
+        sender_ids = table.sender_ids
+        senders = table.senders.values
+        strings = table.strings.values
+        flags = table.flags
+        # 只查询不驻留：消息表可能来自解析缓存或数据集暂存，与其他分析共用
+        zero_msg_id = table.message_ids.lookup('0')
+        hour_flags = self.options.hour_flags
 
-            if self._is_bot_message(msg):
-                continue
-            
-            sender_uin = msg.get('sender', {}).get('uin')
-            if not sender_uin:
-                continue
+        for row in rows:
 
-            if self._is_bot_message(msg):
+            if self._is_bot_row(row):
                 bot_filtered += 1
                 continue
             
-            sender_uin = msg.get('sender', {}).get('uin')
-            if not sender_uin:
+            sid = sender_ids[row]
+            if sid < 0:
                 continue
+            sender_uin = senders[sid]
             
-            content = msg.get('content', {})
-            text = content.get('text', '') if isinstance(content, dict) else ''
-
-            at_contents = []
-            if '@' in text:
-                elements = msg.get('rawMessage', {}).get('elements', [])
-                for element in elements:
-                    text_element = element.get('textElement')
-                    if not text_element:
-                        continue
-                        
-                    at_type = text_element.get('atType', 0)
-                    content_text = text_element.get('content', '')
-                    
-                    if at_type == 2 and content_text:
-                        at_contents.append(content_text)
-                        
-            cleaned = clean_text(text, at_contents)
+            if preprocessed is not None:
+                text = table.text(row)
+                cleaned, ids = next(preprocessed)
+            else:
+                text, at_contents = self._row_text(row)
+                cleaned = clean_text(text, at_contents)
+                ids = None
             
             if cleaned and len(cleaned) >= 1:
                 self.cleaned_texts_with_sender.append((cleaned, sender_uin))
-
-                words = list(jieba.cut(cleaned))
-
-                for word in words:
-                    word = word.strip()
-                    if not word:
-                        continue
-                    if self.use_stopwords and word in self.stopwords:
-                        continue
-                    
-                    self.word_freq[word] += 1
-                    if sender_uin:
-                        self.word_contributors[word][sender_uin] += 1
-                    sample_count = getattr(cfg, 'SAMPLE_COUNT', 10)
-                    if len(self.word_samples[word]) < sample_count * 3:
-                        self.word_samples[word].append(cleaned)
+                # 词频在所有分词轮次结束后由 _count_words 统一统计
+                if ids is not None:
+                    self.token_streams.append_ids(ids)
+                else:
+                    self.token_streams.append(self.tokenizer.cut(cleaned))
 
                 self.user_msg_count[sender_uin] += 1
                 self.user_char_count[sender_uin] += len(cleaned)
@@ -395,95 +551,64 @@ class ChatAnalyzer:
                 if text:
                     skipped += 1
 
-            raw = msg.get('rawMessage', {})
-            elements = raw.get('elements', [])
+            # @ 统计
+            for m in table.mentions(row):
+                if not table.mention_flags[m] & MENTION_TEXT_ELEMENT:
+                    continue
+                at_uid = table.mention_uids[m]
+                if table.mention_at_types[m] > 0 and at_uid >= 0:
+                    at_uid_str = strings[at_uid]
+                    if at_uid_str != '0':
+                        self.user_at_count[sender_uin] += 1
+                        self.user_ated_count[at_uid_str] += 1
 
-            image_count = 0 
-            emoji_count_from_elements = 0 
-            has_forward = False
-            has_link = False
+            # 回复统计
             has_reply = False
-
-            
-
-            for elem in elements:
-                elem_type = elem.get('elementType')
+            for r in table.replies(row):
+                has_reply = True
                 
-                if elem_type == 2:  # 图片元素
-                    pic_elem = elem.get('picElement', {})
-                    summary = pic_elem.get('summary', '')
-                    # 判断是否为表情包（summary格式为 [表情名称]）
-                    if summary and summary.startswith('[') and summary.endswith(']'):
-                        emoji_count_from_elements += 1
-                    else:
-                        image_count += 1
+                # 优先用 senderUid（如果有的话）
+                sender_uid = table.reply_sender_uids[r]
+                target_uin = strings[sender_uid] if sender_uid >= 0 else None
                 
-                elif elem_type == 1:  # 文本元素
-                    text_elem = elem.get('textElement', {})
-                    at_type = text_elem.get('atType', 0)
-                    at_uid = text_elem.get('atUid', '')
-                    at_uid_str = str(at_uid) if at_uid else ''
-                    if at_type > 0 and at_uid_str and at_uid_str != '0' and at_uid_str != '':
-                        self.user_at_count[sender_uin] += 1
-                        self.user_ated_count[at_uid_str] += 1
+                # 如果没有，回退到用 msgId 查找
+                if not target_uin or target_uin == '0':
+                    ref_msg_id = table.reply_sources[r]
+                    if ref_msg_id < 0 or ref_msg_id == zero_msg_id:
+                        ref_msg_id = table.reply_replays[r]
                     
-                    # 链接统计
-                    text_content = text_elem.get('content', '')
-                    if re.search(_URL_PATTERN, text_content):
-                        has_link = True
-                
-                elif elem_type == 10:  # 链接元素
-                    has_link = True
-                
-                elif elem_type == 16 and 'multiForwardMsgElement' in elem:  # 合并转发元素
-                    has_forward = True
+                    if ref_msg_id >= 0 and ref_msg_id != zero_msg_id:
+                        target_sid = self.message_index.sender(ref_msg_id)
+                        target_uin = senders[target_sid] if target_sid is not None else None
                 
-                elif elem_type == 7:  # 回复元素
-                    has_reply = True
-                    reply_elem = elem.get('replyElement', {})
-                    
-                    # 优先用 senderUid（如果有的话）
-                    target_uin = reply_elem.get('senderUid')
-                    
-                    # 如果没有，回退到用 msgId 查找
-                    if not target_uin or target_uin == '0':
-                        ref_msg_id = reply_elem.get('sourceMsgIdInRecords')
-                        if not ref_msg_id or ref_msg_id == '0':
-                            ref_msg_id = reply_elem.get('replayMsgId')
-                        
-                        if ref_msg_id and ref_msg_id != '0':
-                            target_uin = self.msgid_to_sender.get(ref_msg_id)
-                    
-                    if target_uin and str(target_uin) != '0':
-                        self.user_replied_count[str(target_uin)] += 1
+                if target_uin and str(target_uin) != '0':
+                    self.user_replied_count[str(target_uin)] += 1
             
             # 统计各项数据
+            image_count = table.pic_images[row]
             if image_count > 0:
                 self.user_image_count[sender_uin] += image_count  
             
             if has_reply:
                 self.user_reply_count[sender_uin] += 1
             
-            if has_link:
+            if flags[row] & FLAG_LINK:
                 self.user_link_count[sender_uin] += 1
             
-            if has_forward:
+            if flags[row] & FLAG_FORWARD:
                 self.user_forward_count[sender_uin] += 1    
 
-            emojis = content.get('emojis', []) if isinstance(content, dict) else []
-            emoji_count = len(emojis) + emoji_count_from_elements
+            emoji_count = table.content_emojis[row] + table.pic_emojis[row]
             if emoji_count > 0:
                 self.user_emoji_count[sender_uin] += emoji_count
             
-            hour = parse_timestamp(msg.get('timestamp', ''))
-            if hour is not None:
+            ts = table.timestamps[row]
+            if ts != NO_TIME:
+                hour = epoch_to_hour(ts)
                 self.hour_distribution[hour] += 1
-                # 安全获取时间范围配置
-                night_owl_hours = getattr(cfg, 'NIGHT_OWL_HOURS', range(0, 6))
-                early_bird_hours = getattr(cfg, 'EARLY_BIRD_HOURS', range(6, 9))
-                if hour in night_owl_hours:
+                if hour_flags[hour] & HOUR_NIGHT_OWL:
                     self.user_night_count[sender_uin] += 1
-                if hour in early_bird_hours:
+                if hour_flags[hour] & HOUR_EARLY_BIRD:
                     self.user_morning_count[sender_uin] += 1
             
             if cleaned and len(cleaned) >= 2:
@@ -494,7 +619,7 @@ class ChatAnalyzer:
             prev_sender = sender_uin
         
         # 处理跳过及机器人消息计数日志
-        if cfg.FILTER_BOT_MESSAGES and bot_filtered > 0:
+        if self._filter_bot and bot_filtered > 0:
             logger.debug(f"有效文本: {len(self.cleaned_texts_with_sender)} 条, 跳过: {skipped} 条, 过滤机器人: {bot_filtered} 条")
         else:
             logger.debug(f"有效文本: {len(self.cleaned_texts_with_sender)} 条, 跳过: {skipped} 条")
@@ -508,65 +633,18 @@ class ChatAnalyzer:
 
     def _discover_new_words(self):
         """新词发现"""
-        ngram_freq = Counter()
-        left_neighbors = defaultdict(Counter)
-        right_neighbors = defaultdict(Counter)
-        total_chars = 0
-        
-        for text, _ in self.cleaned_texts_with_sender:
-            sentences = re.split(_SENTENCE_SPLIT_PATTERN, text)
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if len(sentence) < 2:
-                    continue
-                total_chars += len(sentence)
-                
-                for n in range(2, min(6, len(sentence) + 1)):
-                    for i in range(len(sentence) - n + 1):
-                        ngram = sentence[i:i+n]
-                        # 只跳过纯空格
-                        if not ngram.strip():
-                            continue
-                        ngram_freq[ngram] += 1
-                        if i > 0:
-                            left_neighbors[ngram][sentence[i-1]] += 1
-                        else:
-                            left_neighbors[ngram]['<BOS>'] += 1
-                        if i + n < len(sentence):
-                            right_neighbors[ngram][sentence[i+n]] += 1
-                        else:
-                            right_neighbors[ngram]['<EOS>'] += 1
-        
-        for word, freq in ngram_freq.items():
-            if freq < cfg.NEW_WORD_MIN_FREQ:
-                continue
-            
-            # 邻接熵
-            left_ent = calculate_entropy(left_neighbors[word])
-            right_ent = calculate_entropy(right_neighbors[word])
-            min_ent = min(left_ent, right_ent)
-            if min_ent < cfg.ENTROPY_THRESHOLD:
-                continue
-            
-            # PMI
-            min_pmi = float('inf')
-            for i in range(1, len(word)):
-                left_freq = ngram_freq.get(word[:i], 0)
-                right_freq = ngram_freq.get(word[i:], 0)
-                if left_freq > 0 and right_freq > 0:
-                    pmi = math.log2((freq * total_chars) / (left_freq * right_freq + 1e-10))
-                    min_pmi = min(min_pmi, pmi)
-            
-            if min_pmi == float('inf'):
-                min_pmi = 0
-            
-            if min_pmi < cfg.PMI_THRESHOLD:
-                continue
-            
-            self.discovered_words.add(word)
+        options = self.options
+        self.discovered_words.update(discover_words(
+            (text for text, _ in self.cleaned_texts_with_sender),
+            _SENTENCE_SPLIT_PATTERN,
+            options.new_word_min_freq,
+            options.entropy_threshold,
+            options.pmi_threshold,
+            engine=options.new_word_engine,
+        ))
         
         for word in self.discovered_words:
-            jieba.add_word(word, freq=1000)
+            self.tokenizer.add_word(word, freq=1000)
         
         discovered_count = len(self.discovered_words)
 
@@ -575,33 +653,37 @@ class ChatAnalyzer:
         return discovered_count
 
     def _merge_word_pairs(self):
+        options = self.options
+        # 直接在已保存的分词结果上统计相邻词对；纯数字/符号的词按编号预先标记
+        # 词对编码为整数 id1 * 词表大小 + id2，右邻计数按编号存在数组中
+        vocab = self.token_streams.vocab
+        size = len(vocab)
         bigram_counter = Counter()
-        word_right_counter = Counter()
-        
-        for text, _ in self.cleaned_texts_with_sender:
-            words = [w for w in jieba.cut(text) if w.strip()]
-            for i in range(len(words) - 1):
-                w1, w2 = words[i].strip(), words[i+1].strip()
-                if not w1 or not w2:
+        word_right_counter = vocab.counts()
+        symbolic = [re.match(_DIGIT_SYMBOL_PATTERN, word) is not None for word in vocab.words]
+        for ids in self.progress.track(self.token_streams):
+            for i in range(len(ids) - 1):
+                w1, w2 = ids[i], ids[i+1]
+                if symbolic[w1] or symbolic[w2]:
                     continue
-                if re.match(_DIGIT_SYMBOL_PATTERN, w1) or re.match(_DIGIT_SYMBOL_PATTERN, w2):
-                    continue
-                bigram_counter[(w1, w2)] += 1
+                bigram_counter[w1 * size + w2] += 1
                 word_right_counter[w1] += 1
         
-        for (w1, w2), count in bigram_counter.items():
+        for key, count in bigram_counter.items():
+            id1, id2 = divmod(key, size)
+            w1, w2 = vocab[id1], vocab[id2]
             merged = w1 + w2
-            if len(merged) > cfg.MERGE_MAX_LEN:
+            if len(merged) > options.merge_max_len:
                 continue
-            if count < cfg.MERGE_MIN_FREQ:
+            if count < options.merge_min_freq:
                 continue
             
             # 条件概率 P(w2|w1)
-            if word_right_counter[w1] > 0:
-                prob = count / word_right_counter[w1]
-                if prob >= cfg.MERGE_MIN_PROB:
+            if word_right_counter[id1] > 0:
+                prob = count / word_right_counter[id1]
+                if prob >= options.merge_min_prob:
                     self.merged_words[merged] = (w1, w2, count, prob)
-                    jieba.add_word(merged, freq=count * 1000)
+                    self.tokenizer.add_word(merged, freq=count * 1000)
 
         merged_count = len(self.merged_words)
         
@@ -614,172 +696,207 @@ class ChatAnalyzer:
         
         return merged_count
     
-    def _reprocess_word_frequency(self):
-        # 清空旧的词频统计
-        self.word_freq = Counter()
-        self.word_samples = defaultdict(list)
-        self.word_contributors = defaultdict(Counter)
-        
-        # 重新处理每条消息
-        for cleaned, sender_uin in self.cleaned_texts_with_sender:
-            # 重新分词
-            words = list(jieba.cut(cleaned))
-            
-            for word in words:
-                word = word.strip()
-                if not word:
+    def _resegment_texts(self, new_words):
+        """
+        新词加入词典后重新分词（默认全部重分）
+        增量模式下只处理包含新词的文本，其余文本沿用已有结果。jieba 的路径打分含词典总词频，
+        加词会让少数不含新词的文本在近似平局处切分不同，因此与全部重分相比词频可能有个位数差异。
+        """
+        texts = self.cleaned_texts_with_sender
+        self.progress.start('重新分词', total=len(texts))
+        if not self.options.incremental_resegment:
+            # 全部重分：边分词边写入新的 TokenStreams（沿用同一词表），不保留中间的分词元组
+            streams = TokenStreams(self.token_streams.vocab)
+            for text, _ in self.progress.track(texts):
+                streams.append(self.tokenizer.cut(text))
+            self.token_streams = streams
+            logger.debug(f"重新分词 {len(texts)} 条文本")
+            return
+
+        pattern = compile_word_pattern(new_words)
+        updates = {}
+        for idx, (text, _) in enumerate(self.progress.track(texts)):
+            if pattern.search(text):
+                updates[idx] = self.tokenizer.cut(text)
+        self.token_streams.replace(updates)
+        logger.debug(f"重新分词 {len(updates)}/{len(texts)} 条文本")
+
+    def _count_words(self):
+        """在最终的分词结果上统计词频、贡献者和示例（按文本顺序遍历，计数与顺序都与逐条统计一致）"""
+        vocab = self.token_streams.vocab
+        word_keys = None
+        if self.options.word_stats_mode == 'approximate':
+            # 计数和标记都只为候选词分配，与词表大小无关
+            word_keys = self._approximate_candidates()
+            skip = _CandidateSkip(word_keys)
+            freq = dict.fromkeys(word_keys, 0)
+        else:
+            if self.use_stopwords:
+                skip = [word in self.stopwords for word in vocab.words]
+            else:
+                skip = [False] * len(vocab)
+            freq = vocab.counts()
+
+        # 示例：每个词在全部出现位置上均匀抽样 SAMPLE_COUNT 条（Algorithm L），只记文本下标
+        k = self.options.sample_count
+        seed = self.options.sample_seed
+        rng = random.Random(seed) if seed is not None else random
+        # 抽样状态只为出现满 k 次的词按需创建
+        next_replace = {}
+        weights = {}
+        reservoirs = {}  # 插入顺序即词的首次出现顺序
+        self.progress.start('统计词频', total=len(self.token_streams))
+        for idx, ids in enumerate(self.progress.track(self.token_streams)):
+            for wid in ids:
+                if skip[wid]:
                     continue
-                if self.use_stopwords and word in self.stopwords:
+                n = freq[wid] + 1
+                freq[wid] = n
+                if n == 1:
+                    reservoirs[wid] = array('I')
+                if n <= k:
+                    reservoirs[wid].append(idx)
+                    if n == k:
+                        weights[wid] = weight = reservoir_weight(rng, k)
+                        next_replace[wid] = n + reservoir_gap(rng, weight)
+                elif k > 0 and n == next_replace[wid]:
+                    reservoirs[wid][rng.randrange(k)] = idx
+                    weights[wid] = weight = weights[wid] * reservoir_weight(rng, k)
+                    next_replace[wid] = n + reservoir_gap(rng, weight)
+
+        self.word_freq = Counter({vocab[wid]: freq[wid] for wid in reservoirs})
+        self.word_contributors = ContributorMatrix.build(
+            vocab, self.cleaned_texts_with_sender, self.token_streams, skip, word_keys)
+        # 只为过滤后仍会输出的词保留示例
+        reservoirs = {wid: reservoir for wid, reservoir in reservoirs.items()
+                      if self._is_reported_word(vocab[wid], freq[wid])}
+        self.word_samples = WordSamples.from_reservoirs(reservoirs, self.cleaned_texts_with_sender, vocab)
+        logger.debug(f"词频统计完成，当前词汇总数: {len(self.word_freq)}")
+
+    def _approximate_candidates(self):
+        """
+        近似模式的第一遍：用 Space-Saving 找出可能进入 TOP_N 的高频词，长尾词频记入 Count-Min Sketch。
+        返回候选词编号（已排序的 array），第二遍只对这些词精确统计词频、贡献者和示例。
+        
+        按词的统计状态（计数、跳过标记、贡献者、示例）只为候选词分配，大小由 WORD_STATS_CAPACITY 决定；
+        词表、分词结果和清洗后文本是新词发现和词组合并需要的，仍随语料增长。
+        """
+        options = self.options
+        vocab = self.token_streams.vocab
+        stopwords = self.stopwords if self.use_stopwords else ()
+        keep_word = self._keep_word
+        top = SpaceSaving(options.word_stats_capacity)
+        tracked = top.counts
+        sketch = CountMinSketch(options.word_sketch_width, options.word_sketch_depth)
+        words = vocab.words
+        self.progress.start('近似词频统计', total=len(self.token_streams))
+        for ids in self.progress.track(self.token_streams):
+            for wid in ids:
+                word = words[wid]
+                # 已被跟踪的词一定符合条件；其余词每次出现时检查，不为整个词表缓存结果
+                if word not in tracked and (word in stopwords or not keep_word(word)):
                     continue
-                
-                # 重新统计
-                self.word_freq[word] += 1
-                if sender_uin:
-                    self.word_contributors[word][sender_uin] += 1
-                if len(self.word_samples[word]) < cfg.SAMPLE_COUNT * 3:
-                    self.word_samples[word].append(cleaned)
+                top.add(word)
+                sketch.add(word)
+
+        # 计数下界（计数 - 误差）第 TOP_N 大的值；计数上界达不到它的词不可能进入 TOP_N
+        tracked = top.items()
+        lower_bounds = sorted((count - error for _, count, error in tracked), reverse=True)
+        cutoff = lower_bounds[options.top_n - 1] if len(lower_bounds) >= options.top_n else 0
+        cutoff = max(cutoff, options.min_freq)
+        candidates = {word for word, count, _ in tracked if count >= cutoff}
+
+        self.word_sketch = sketch
+        self._word_stats = {
+            'mode': 'approximate',
+            'totalTokens': top.total,
+            'capacity': top.capacity,
+            'trackedWords': len(candidates),
+            # 未被跟踪（不在 topWords 中）的词真实词频的上界
+            'untrackedMaxCount': top.min_count,
+            'sketch': {
+                'width': sketch.width,
+                'depth': sketch.depth,
+                'epsilon': sketch.epsilon,
+                'delta': sketch.delta,
+                'errorBound': sketch.error_bound,
+            },
+        }
+        logger.info(f"📐 近似词频统计: {top.total} 个词次, 精确统计 {len(candidates)} 个候选词, "
+                    f"未跟踪词词频上界 {top.min_count}")
+        return array('I', sorted(vocab.get(word) for word in candidates))
+
+    def _keep_word(self, word):
+        """与词频无关的过滤条件（词长、表情、白名单、单字独立性）"""
+        options = self.options
+        if len(word) < options.min_word_len or len(word) > options.max_word_len:
+            return False
+        if is_emoji(word):
+            return True
+
+        if word in options.whitelist:
+            return True
         
-        logger.debug(f"重新分词完成，当前词汇总数: {len(self.word_freq)}")
+        # 单字特殊处理
+        if len(word) == 1:
+            # 单个符号跳过（但数字/字母走单字统计）
+            if word in string.punctuation or word in '，。！？；：、""''（）【】':
+                return False
+            # 其他单字（数字/字母/汉字）走独立性检查
+            stats = self.single_char_stats.get(word)
+            if stats:
+                total, indep, ratio = stats
+                if ratio < options.single_min_solo_ratio or indep < options.single_min_solo_count:
+                    return False
+            else:
+                return False
+        return True
+
+    def _is_reported_word(self, word, freq):
+        """词频达到 MIN_FREQ 且通过 _keep_word 的词才会出现在最终结果中"""
+        return freq >= self.options.min_freq and self._keep_word(word)
 
     def _filter_results(self):
         """过滤结果"""
         filtered_freq = Counter()
         
         for word, freq in self.word_freq.items():
-            if len(word) < cfg.MIN_WORD_LEN or len(word) > cfg.MAX_WORD_LEN:
-                continue
-            if freq < cfg.MIN_FREQ:
-                continue
-            if is_emoji(word):
+            if self._is_reported_word(word, freq):
                 filtered_freq[word] = freq
-                continue
-
-            if word in cfg.WHITELIST:
-                filtered_freq[word] = freq
-                continue
-            
-            # 单字特殊处理
-            if len(word) == 1:
-                # 单个符号跳过（但数字/字母走单字统计）
-                if word in string.punctuation or word in '，。！？；：、""''（）【】':
-                    continue
-                # 其他单字（数字/字母/汉字）走独立性检查
-                stats = self.single_char_stats.get(word)
-                if stats:
-                    total, indep, ratio = stats
-                    if ratio < cfg.SINGLE_MIN_SOLO_RATIO or indep < cfg.SINGLE_MIN_SOLO_COUNT:
-                        continue
-                else:
-                    continue
-                        
-            filtered_freq[word] = freq
         
         self.word_freq = filtered_freq
-        
-        # 采样
-        for word in self.word_samples:
-            samples = self.word_samples[word]
-            sample_count = getattr(cfg, 'SAMPLE_COUNT', 10)
-            if len(samples) > sample_count:
-                self.word_samples[word] = random.sample(samples, sample_count)
+        self._result = None
+        if self._word_stats is not None:
+            # 候选词的词频是精确值；TOP_N 中最小的词频大于未跟踪词的上界时，榜单与精确模式一致
+            top = self.get_top_words()
+            self._word_stats['topWordsExact'] = (
+                not top or top[-1][1] > self._word_stats['untrackedMaxCount'])
         
         logger.debug(f"过滤后 {len(self.word_freq)} 个词")
 
+    @property
+    def result(self):
+        """分析结果视图（AnalysisResult），各部分首次访问时计算并缓存"""
+        if self._result is None:
+            self._result = AnalysisResult(self)
+        return self._result
+
     def get_top_words(self, n=None):
-        n = n or cfg.TOP_N
-        return self.word_freq.most_common(n)
+        return self.result.get_top_words(n)
+
+    def get_word_freq(self, word):
+        """词频；近似模式下不在候选词中的词返回 Count-Min Sketch 的估计值"""
+        freq = self.word_freq.get(word)
+        if freq is None:
+            freq = self.word_sketch.estimate(word) if self.word_sketch is not None else 0
+        return freq
 
     def get_word_detail(self, word):
-        return {
-            'word': word,
-            'freq': self.word_freq.get(word, 0),
-            'samples': self.word_samples.get(word, []),
-            'contributors': [(self.get_name(uin), count) 
-                           for uin, count in self.word_contributors[word].most_common(cfg.CONTRIBUTOR_TOP_N)]
-        }
+        return self.result.get_word_detail(word)
 
     def get_fun_rankings(self):
-        rankings = {}
-        
-        def fmt(counter, top_n=cfg.RANK_TOP_N):
-            return [(self.get_name(uin), count) for uin, count in counter.most_common(top_n)]
-        
-        rankings['话痨榜'] = fmt(self.user_msg_count)
-        rankings['字数榜'] = fmt(self.user_char_count)
-        
-        sorted_avg = sorted(self.user_char_per_msg.items(), key=lambda x: x[1], reverse=True)[:cfg.RANK_TOP_N]
-        rankings['长文王'] = [(self.get_name(uin), f"{avg:.1f}字/条") for uin, avg in sorted_avg]
-        
-        rankings['图片狂魔'] = fmt(self.user_image_count)
-        rankings['合并转发王'] = fmt(self.user_forward_count)
-        rankings['回复狂'] = fmt(self.user_reply_count)
-        rankings['被回复最多'] = fmt(self.user_replied_count)
-        rankings['艾特狂'] = fmt(self.user_at_count)
-        rankings['被艾特最多'] = fmt(self.user_ated_count)
-        rankings['表情帝'] = fmt(self.user_emoji_count)
-        rankings['链接分享王'] = fmt(self.user_link_count)
-        rankings['深夜党'] = fmt(self.user_night_count)
-        rankings['早起鸟'] = fmt(self.user_morning_count)
-        rankings['复读机'] = fmt(self.user_repeat_count)
-        
-        return rankings
-    
+        return self.result.get_fun_rankings()
+
     def export_json(self):
         """导出JSON格式结果（包含uin信息）"""
-        top_words = []
-        for word, freq in self.get_top_words():
-            # 再次在导出阶段过滤停用词，保证报告中不包含停用词
-            if self.use_stopwords and word in self.stopwords:
-                continue
-            top_words.append({
-                'word': word,
-                'freq': freq,
-                'contributors': [
-                    {
-                        'name': self.get_name(uin),
-                        'uin': uin,
-                        'count': count
-                    }
-                    for uin, count in self.word_contributors[word].most_common(cfg.CONTRIBUTOR_TOP_N)
-                ],
-                'samples': self.word_samples.get(word, [])[:getattr(cfg, 'SAMPLE_COUNT', 10)]
-            })
-
-        result = {
-            'chatName': self.chat_name,
-            'messageCount': len(self.messages),
-            'topWords': top_words,
-            'rankings': {},
-            'hourDistribution': {str(h): self.hour_distribution.get(h, 0) for h in range(24)}
-        }
-        
-        # 趣味榜单（包含uin）
-        def fmt_with_uin(counter, top_n=cfg.RANK_TOP_N):
-            return [
-                {'name': self.get_name(uin), 'uin': uin, 'value': count}
-                for uin, count in counter.most_common(top_n)
-            ]
-        
-        result['rankings']['话痨榜'] = fmt_with_uin(self.user_msg_count)
-        result['rankings']['字数榜'] = fmt_with_uin(self.user_char_count)
-        
-        # 长文王特殊处理
-        sorted_avg = sorted(self.user_char_per_msg.items(), key=lambda x: x[1], reverse=True)[:cfg.RANK_TOP_N]
-        result['rankings']['长文王'] = [
-            {'name': self.get_name(uin), 'uin': uin, 'value': f"{avg:.1f}字/条"}
-            for uin, avg in sorted_avg
-        ]
-        
-        result['rankings']['图片狂魔'] = fmt_with_uin(self.user_image_count)
-        result['rankings']['合并转发王'] = fmt_with_uin(self.user_forward_count)
-        result['rankings']['回复狂'] = fmt_with_uin(self.user_reply_count)
-        result['rankings']['被回复最多'] = fmt_with_uin(self.user_replied_count)
-        result['rankings']['艾特狂'] = fmt_with_uin(self.user_at_count)
-        result['rankings']['被艾特最多'] = fmt_with_uin(self.user_ated_count)
-        result['rankings']['表情帝'] = fmt_with_uin(self.user_emoji_count)
-        result['rankings']['链接分享王'] = fmt_with_uin(self.user_link_count)
-        result['rankings']['深夜党'] = fmt_with_uin(self.user_night_count)
-        result['rankings']['早起鸟'] = fmt_with_uin(self.user_morning_count)
-        result['rankings']['复读机'] = fmt_with_uin(self.user_repeat_count)
-        
-        return result
+        return self.result.to_json()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析服务：上传分析、保存报告等不依赖请求上下文的逻辑，以及它们用到的存储
+（数据库、解析缓存、数据集暂存）。
+
+本模块不导入 Flask。后台任务进程以 spawn 方式启动，按名称导入这里的函数，
+不会再初始化一遍 Web 应用（路由、限流器、任务队列）。
+"""
+
+import os
+import sys
+import json
+import uuid
+from typing import List, Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import analyzer as analyzer_mod
+from image_generator import AIWordSelector
+from message_table import load_table
+from utils import resolve_date_range
+from options import AnalysisOptions
+from parse_cache import ParseCache
+from dataset_store import DatasetStore
+from personal_analyzer import PersonalAnalyzer
+from progress import ProgressReporter
+from backend.db_service import DatabaseService
+from backend.json_storage import JSONStorageService
+from logger import get_logger, init_logging
+
+init_logging()
+logger = get_logger('backend')
+
+# AI功能开关
+AI_COMMENT_ENABLED = os.getenv('AI_COMMENT_ENABLED', 'false').lower() == 'true'
+AI_WORD_SELECTION_ENABLED = os.getenv('AI_WORD_SELECTION_ENABLED', 'false').lower() == 'true'
+
+# 分析配置
+STREAM_ANALYSIS = os.getenv('STREAM_ANALYSIS', 'false').lower() == 'true'
+PARSE_CACHE_ENABLED = os.getenv('PARSE_CACHE_ENABLED', 'true').lower() == 'true'
+PARSE_CACHE_MAX_MB = int(os.getenv('PARSE_CACHE_MAX_MB', '1024'))
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', '1'))
+DATASET_STORE_ENABLED = os.getenv('DATASET_STORE_ENABLED', 'true').lower() == 'true'
+DATASET_TTL_HOURS = float(os.getenv('DATASET_TTL_HOURS', '24'))
+DATASET_STORE_MAX_MB = int(os.getenv('DATASET_STORE_MAX_MB', '2048'))
+JOB_PROGRESS_INTERVAL = float(os.getenv('JOB_PROGRESS_INTERVAL', '1'))
+
+storage_mode = os.getenv('STORAGE_MODE', 'json').lower()
+
+if storage_mode == 'mysql':
+    try:
+        logger.info("📦 使用 MySQL 数据库存储")
+        db_service = DatabaseService()
+        db_service.init_database()
+    except Exception as e:
+        logger.warning(f"MySQL 初始化失败: {e}")
+        logger.info("🔄 回退到 JSON 文件存储")
+        db_service = JSONStorageService()
+        db_service.init_database()
+else:
+    try:
+        logger.info("📦 使用 JSON 文件存储（本地模式）")
+        db_service = JSONStorageService()
+        db_service.init_database()
+    except Exception as e:
+        logger.error(f"存储服务初始化失败: {e}")
+        db_service = None
+
+# 解析缓存（同一文件重复上传时跳过 JSON 解析）
+parse_cache = None
+if PARSE_CACHE_ENABLED:
+    parse_cache = ParseCache(os.path.join(PROJECT_ROOT, "runtime_outputs", "parse_cache"), PARSE_CACHE_MAX_MB)
+
+# 已上传数据集暂存（按 report_id 保留消息表，生成个人报告时不必重新上传）
+dataset_store = None
+if DATASET_STORE_ENABLED:
+    dataset_store = DatasetStore(os.path.join(PROJECT_ROOT, "runtime_outputs", "datasets"),
+                                 ttl_seconds=DATASET_TTL_HOURS * 3600, max_mb=DATASET_STORE_MAX_MB)
+
+
+def generate_ai_comments(selected_word_objects: List[Dict]) -> Dict[str, str]:
+    # 使用OpenAI API为每个热词生成犀利的AI锐评
+    # 返回: {word: comment} 的字典
+    if not AI_COMMENT_ENABLED:
+        logger.info("⚠️ AI锐评功能被禁用，跳过生成")
+        return {}  # 如果关掉，返回空字典
+    try:
+        from image_generator import AICommentGenerator
+        ai_gen = AICommentGenerator()
+        
+        if ai_gen.client:
+            comments = ai_gen.generate_batch(selected_word_objects)
+            logger.info("✅ AI锐评生成完成")
+            return comments
+        else:
+            logger.warning("OpenAI未配置，使用默认锐评")
+            return {w['word']: ai_gen._fallback_comment(w['word']) 
+                   for w in selected_word_objects}
+    except Exception as e:
+        logger.error(f"AI锐评生成失败: {e}")
+        from image_generator import AICommentGenerator
+        ai_gen = AICommentGenerator()
+        return {w['word']: ai_gen._fallback_comment(w['word']) 
+               for w in selected_word_objects}
+
+
+def analyze_upload(report_id: str, temp_path: str, options: AnalysisOptions, auto_select: bool,
+                   user_id: str, set_stage=None, set_progress=None) -> Dict:
+    """
+    分析上传的聊天记录（同步请求和后台任务共用），返回响应数据；失败时清理临时文件并抛出异常
+    
+    Args:
+        set_stage: 可选的回调，接收当前阶段名称（后台任务用来更新任务状态）
+        set_progress: 可选的回调，接收解析和分析各阶段的进度（ProgressReporter.snapshot() 的字典）
+    """
+    if set_stage is None:
+        set_stage = lambda stage: None
+    progress = ProgressReporter(set_progress, min_interval=JOB_PROGRESS_INTERVAL)
+    try:
+        set_stage('解析聊天记录')
+        if STREAM_ANALYSIS:
+            # 流式分析：解析与统计合并为一遍，不保留消息列表
+            # 启用数据集暂存时保留消息表，供之后生成个人报告
+            analyzer = analyzer_mod.ChatAnalyzer.from_stream(temp_path, options=options, progress=progress,
+                                                             keep_table=dataset_store is not None)
+        else:
+            # 流式解析并构建列式消息表（避免内存溢出）
+            date_range = resolve_date_range(options.start_date, options.end_date)
+            table = load_table(temp_path, cache=parse_cache, workers=PARSE_WORKERS, date_range=date_range,
+                               progress=progress)
+            analyzer = analyzer_mod.ChatAnalyzer(table, options=options, progress=progress)
+        set_stage('分析中')
+        analyzer.analyze()
+        report = analyzer.export_json()
+        if dataset_store:
+            dataset_store.put(report_id, analyzer.table, owner=user_id,
+                              start_date=options.start_date, end_date=options.end_date)
+
+        all_words = report.get('topWords', [])[:100]
+
+        # 确保有足够的词汇
+        if len(all_words) == 0:
+            logger.error("❌ 分析结果中没有找到任何热词")
+            raise ValueError("分析结果中没有找到热词，请检查聊天记录文件")
+
+        if auto_select:
+            logger.info("✅ 进入自动选词模式")
+            set_stage('选词中')
+            # 自动选词模式：根据AI功能是否开启选择不同的选词方式
+            if AI_WORD_SELECTION_ENABLED:
+                logger.info("🤖 启动AI智能选词...")
+                ai_selector = AIWordSelector()
+
+                if ai_selector.client:
+                    selected_word_objects = ai_selector.select_words(all_words, top_n=200)
+
+                    if selected_word_objects:
+                        # 按词频从高到低排序
+                        selected_word_objects_sorted = sorted(
+                            selected_word_objects,
+                            key=lambda w: w['freq'],
+                            reverse=True
+                        )
+                        selected_words = [w['word'] for w in selected_word_objects_sorted[:10]]
+                        # 如果AI选词少于10个，用前10个热词补齐
+                        if len(selected_words) < 10:
+                            logger.warning(f"AI选词只有{len(selected_words)}个，用前10个热词补齐")
+                            selected_words = [w['word'] for w in all_words[:10]]
+                        logger.info(f"✅ AI选词成功（已按词频排序）: {', '.join(selected_words)}")
+                    else:
+                        logger.warning("AI选词失败，使用前10个热词")
+                        selected_words = [w['word'] for w in all_words[:10]]
+                else:
+                    logger.warning("OpenAI未配置或客户端未就绪，使用前10个热词")
+                    selected_words = [w['word'] for w in all_words[:10]]
+            else:
+                # AI功能未开启，直接使用前10个热词
+                logger.info("📋 使用默认前10个热词（AI功能未开启）")
+                if len(all_words) < 10:
+                    logger.warning(f"可用词汇只有{len(all_words)}个，少于10个")
+                selected_words = [w['word'] for w in all_words[:10]]
+                if len(selected_words) < 10:
+                    logger.error(f"无法选择10个词，只有{len(selected_words)}个可用词汇")
+                    raise ValueError(f"可用词汇不足10个，无法生成报告")
+
+            logger.info(f"📝 准备生成报告，已选择{len(selected_words)}个词: {', '.join(selected_words[:5])}...")
+            set_stage('生成报告')
+            result = save_report(report_id, selected_words, report, auto_mode=True, user_id=user_id)
+            logger.info(f"✅ 自动选词模式报告生成完成，返回结果: {result}")
+            cleanup_temp_files(temp_path)
+            return result
+        else:
+            temp_dir = os.path.dirname(temp_path)
+            result_temp_path = os.path.join(temp_dir, f"{report_id}_result.json")
+            with open(result_temp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+            return {
+                "report_id": report_id,
+                "chat_name": report.get('chatName', '未知群聊'),
+                "message_count": report.get('messageCount', 0),
+                "available_words": all_words,
+                "stopwords_enabled": options.use_stopwords
+            }
+    except Exception as exc:
+        import traceback
+        error_trace = traceback.format_exc()
+        logger.error(f"❌ upload_and_analyze失败: {exc}")
+        logger.error(f"错误堆栈:\n{error_trace}")
+        cleanup_temp_files(temp_path)
+        raise
+
+
+def save_report(report_id: str, selected_words: List[str], report: Dict,
+                auto_mode: bool = False, user_id: str = None) -> Dict:
+    """生成AI锐评并保存报告，返回响应数据（不依赖请求上下文，后台任务中也可调用）；失败时抛出异常"""
+    # 转换selected_words为详细对象
+    top_words = report.get('topWords', [])
+    logger.info(f"📊 报告中的topWords数量: {len(top_words)}")
+    if not isinstance(top_words, list):
+        logger.error(f"❌ topWords格式错误，期望list，实际: {type(top_words)}")
+        raise ValueError(f"topWords格式错误: {type(top_words)}")
+    
+    all_words = {}
+    for w in top_words:
+        if isinstance(w, dict) and 'word' in w:
+            all_words[w['word']] = w
+        else:
+            logger.warning(f"⚠️ 跳过无效的词汇项: {w}")
+    
+    logger.info(f"📝 构建的all_words字典包含{len(all_words)}个词")
+    logger.info(f"📝 需要处理的selected_words: {selected_words}")
+    
+    selected_word_objects = []
+    for word in selected_words:
+        if word in all_words:
+            selected_word_objects.append(all_words[word])
+        else:
+            logger.warning(f"⚠️ 词汇 '{word}' 不在topWords中，使用默认值")
+            selected_word_objects.append({"word": word, "freq": 0, "samples": []})
+    
+    ai_comments = generate_ai_comments(selected_word_objects)
+    
+    statistics = {
+        "chatName": report.get('chatName'),
+        "messageCount": report.get('messageCount'),
+        "rankings": report.get('rankings', {}),
+        "timeDistribution": report.get('timeDistribution', {}),
+        "hourDistribution": report.get('hourDistribution', {})
+    }
+    if 'wordStats' in report:
+        statistics['wordStats'] = report['wordStats']
+    
+    success = db_service.create_report(
+        report_id=report_id,
+        chat_name=statistics['chatName'],
+        message_count=statistics['messageCount'],
+        selected_words=selected_word_objects,
+        statistics=statistics,
+        ai_comments=ai_comments,
+        user_id=user_id  
+    )
+    
+    if not success:
+        raise RuntimeError("保存数据库失败")
+    
+    return {
+        "success": True,
+        "report_id": report_id,
+        "report_url": f"/report/{report_id}",
+        "message": "报告已生成" if not auto_mode else "AI已自动完成选词并生成报告"
+    }
+
+
+def cleanup_temp_files(file_path: str):
+    try:
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+            logger.info(f"🗑️ 已删除临时文件: {file_path}")
+    except Exception as e:
+        logger.warning(f"⚠️ 清理临时文件失败: {e}")
+
+
+def analyze_personal_bulk(temp_path: str, options: AnalysisOptions, min_messages: int, user_id: str,
+                          set_stage=None, set_progress=None) -> Dict:
+    """
+    为上传的聊天记录中全部成员生成并保存个人报告（同步请求和后台任务共用），返回响应数据；
+    临时文件在结束后删除，失败时抛出异常
+    
+    Args:
+        set_stage / set_progress: 同 analyze_upload
+    """
+    if set_stage is None:
+        set_stage = lambda stage: None
+    progress = ProgressReporter(set_progress, min_interval=JOB_PROGRESS_INTERVAL)
+    try:
+        set_stage('解析聊天记录')
+        table = load_table(temp_path, cache=parse_cache, workers=PARSE_WORKERS, progress=progress)
+        set_stage('分析中')
+        members = PersonalAnalyzer.analyze_all(table, min_messages=min_messages, options=options,
+                                               progress=progress)
+
+        set_stage('保存报告')
+        progress.start('保存报告', total=len(members), unit='份')
+        reports = []
+        for uin, analyzer in progress.track(members.items(), every=1):
+            report = analyzer.export_json()
+            report_id = str(uuid.uuid4())
+            if db_service and not db_service.create_personal_report(
+                    report_id=report_id,
+                    user_name=report.get('user_name'),
+                    chat_name=report.get('chat_name', '未知群聊'),
+                    report_data=report,
+                    user_id=user_id):
+                logger.warning(f"⚠️ 个人报告保存到数据库失败: {report.get('user_name')}")
+                continue
+            reports.append({
+                "report_id": report_id,
+                "uin": str(uin),
+                "user_name": report.get('user_name'),
+                "total_messages": report.get('total_messages', 0),
+                "report_url": f"/personal-report/{report_id}"
+            })
+
+        logger.info(f"✅ 批量个人报告生成完成: {len(reports)} 份")
+        return {
+            "success": True,
+            "chat_name": table.chat_name,
+            "count": len(reports),
+            "reports": reports
+        }
+    except Exception as e:
+        import traceback
+        logger.error(f"❌ 批量个人报告生成失败: {e}\n{traceback.format_exc()}")
+        raise
+    finally:
+        cleanup_temp_files(temp_path)
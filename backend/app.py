@@ -16,13 +16,15 @@ import asyncio
 from typing import List, Dict
 from io import BytesIO
 
-from flask import Flask, request, jsonify, send_from_directory, session
+from flask import Flask, Response, request, jsonify, send_from_directory, session, stream_with_context
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
+import time
 import secrets
+import threading
 import hmac
 import hashlib
 
@@ -34,14 +36,17 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 import config
-import analyzer as analyzer_mod
-from image_generator import ImageGenerator, AIWordSelector
-from utils import load_json
+from image_generator import ImageGenerator
+from message_table import load_table
+from options import AnalysisOptions
+from backend.jobs import JobStore, JobQueue, JOB_FINISHED_STATES
+from backend.analysis_service import (
+    AI_COMMENT_ENABLED, AI_WORD_SELECTION_ENABLED, PARSE_WORKERS, JOB_PROGRESS_INTERVAL,
+    db_service, parse_cache, dataset_store,
+    analyze_upload, analyze_personal_bulk, save_report, cleanup_temp_files,
+)
 from personal_analyzer import PersonalAnalyzer
 
-from backend.db_service import DatabaseService
-from backend.json_storage import JSONStorageService
-
 # 导入日志系统
 import sys
 sys.path.insert(0, PROJECT_ROOT)
@@ -69,10 +74,8 @@ RATE_LIMIT_GET_REPORT = os.getenv('RATE_LIMIT_GET_REPORT', '100 per hour')
 RATE_LIMIT_LIST_REPORTS = os.getenv('RATE_LIMIT_LIST_REPORTS', '200 per hour')
 RATE_LIMIT_GENERATE_IMAGE = os.getenv('RATE_LIMIT_GENERATE_IMAGE', '30 per hour')
 RATE_LIMIT_DELETE_REPORT = os.getenv('RATE_LIMIT_DELETE_REPORT', '50 per hour')
-
-# AI功能开关
-AI_COMMENT_ENABLED = os.getenv('AI_COMMENT_ENABLED', 'false').lower() == 'true'
-AI_WORD_SELECTION_ENABLED = os.getenv('AI_WORD_SELECTION_ENABLED', 'false').lower() == 'true'
+RATE_LIMIT_JOB_STATUS = os.getenv('RATE_LIMIT_JOB_STATUS', '1200 per hour')
+RATE_LIMIT_JOB_EVENTS = os.getenv('RATE_LIMIT_JOB_EVENTS', '120 per hour')
 
 # Redis URL（用于分布式限流）
 REDIS_URL = os.getenv('REDIS_URL', '')
@@ -88,6 +91,17 @@ SECURITY_HEADER_HSTS = os.getenv('SECURITY_HEADER_HSTS', '')
 # 文件验证配置
 ALLOWED_FILE_EXTENSIONS = os.getenv('ALLOWED_FILE_EXTENSIONS', 'json').split(',')
 
+# 分析配置（分析本身用到的配置在 backend/analysis_service.py 中读取）
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '1'))
+WORD_STATS_MODE = os.getenv('WORD_STATS_MODE', 'exact').lower()
+PERSONAL_BULK_MIN_MESSAGES = int(os.getenv('PERSONAL_BULK_MIN_MESSAGES', '10'))
+ASYNC_ANALYSIS = os.getenv('ASYNC_ANALYSIS', 'true').lower() == 'true'
+ANALYSIS_JOB_WORKERS = int(os.getenv('ANALYSIS_JOB_WORKERS', '1'))
+ANALYSIS_JOB_QUEUE_SIZE = int(os.getenv('ANALYSIS_JOB_QUEUE_SIZE', '8'))
+JOB_TTL_HOURS = float(os.getenv('JOB_TTL_HOURS', '24'))
+JOB_EVENTS_MAX_SECONDS = float(os.getenv('JOB_EVENTS_MAX_SECONDS', '60'))
+JOB_EVENTS_MAX_STREAMS = int(os.getenv('JOB_EVENTS_MAX_STREAMS', '4'))
+
 logger.info(f"{'='*60}")
 logger.info(f"🔒 安全配置状态")
 logger.info(f"{'='*60}")
@@ -200,52 +214,13 @@ def csrf_protect():
         logger.warning(f"CSRF验证失败 | IP: {request.remote_addr} | 路径: {request.path}")
         return jsonify({"error": "CSRF令牌验证失败"}), 403
 
-storage_mode = os.getenv('STORAGE_MODE', 'json').lower()
-
-if storage_mode == 'mysql':
-    try:
-        logger.info("📦 使用 MySQL 数据库存储")
-        db_service = DatabaseService()
-        db_service.init_database()
-    except Exception as e:
-        logger.warning(f"MySQL 初始化失败: {e}")
-        logger.info("🔄 回退到 JSON 文件存储")
-        db_service = JSONStorageService()
-        db_service.init_database()
-else:
-    try:
-        logger.info("📦 使用 JSON 文件存储（本地模式）")
-        db_service = JSONStorageService()
-        db_service.init_database()
-    except Exception as e:
-        logger.error(f"存储服务初始化失败: {e}")
-        db_service = None
-
-
-def generate_ai_comments(selected_word_objects: List[Dict]) -> Dict[str, str]:
-    # 使用OpenAI API为每个热词生成犀利的AI锐评
-    # 返回: {word: comment} 的字典
-    if not AI_COMMENT_ENABLED:
-        logger.info("⚠️ AI锐评功能被禁用，跳过生成")
-        return {}  # 如果关掉，返回空字典
-    try:
-        from image_generator import AICommentGenerator
-        ai_gen = AICommentGenerator()
-        
-        if ai_gen.client:
-            comments = ai_gen.generate_batch(selected_word_objects)
-            logger.info("✅ AI锐评生成完成")
-            return comments
-        else:
-            logger.warning("OpenAI未配置，使用默认锐评")
-            return {w['word']: ai_gen._fallback_comment(w['word']) 
-                   for w in selected_word_objects}
-    except Exception as e:
-        logger.error(f"AI锐评生成失败: {e}")
-        from image_generator import AICommentGenerator
-        ai_gen = AICommentGenerator()
-        return {w['word']: ai_gen._fallback_comment(w['word']) 
-               for w in selected_word_objects}
+# 后台分析任务（上传后立即返回任务 ID，分析在独立进程池中执行）
+job_store = JobStore(os.path.join(PROJECT_ROOT, "runtime_outputs", "jobs"), ttl_seconds=JOB_TTL_HOURS * 3600)
+job_queue = None
+# 每个 SSE 连接占用一个 worker 线程，限制本进程同时打开的连接数，留出线程处理其他请求
+job_event_streams = threading.BoundedSemaphore(max(1, JOB_EVENTS_MAX_STREAMS))
+if ASYNC_ANALYSIS:
+    job_queue = JobQueue(job_store, max_workers=ANALYSIS_JOB_WORKERS, max_pending=ANALYSIS_JOB_QUEUE_SIZE)
 
 
 @app.route("/api/health", methods=["GET"])
@@ -320,16 +295,14 @@ def upload_and_analyze():
     end_date = request.form.get('end_date')
 
     if start_date:
-        config.MESSAGE_START_DATE = start_date
         logger.info(f"设置消息开始时间过滤：{start_date}")
-    else:
-        config.MESSAGE_START_DATE = None
-
     if end_date:
-        config.MESSAGE_END_DATE = end_date
         logger.info(f"设置消息结束时间过滤：{end_date}")
-    else:
-        config.MESSAGE_END_DATE = None
+
+    # 本次请求的参数快照（不修改全局 config，并发请求互不影响）
+    options = AnalysisOptions.from_config(config, use_stopwords=use_stopwords,
+                                          start_date=start_date or None, end_date=end_date or None,
+                                          workers=ANALYSIS_WORKERS, word_stats_mode=WORD_STATS_MODE)
 
     report_id = str(uuid.uuid4())
 
@@ -351,95 +324,101 @@ def upload_and_analyze():
     temp_path = os.path.join(temp_dir, f"{report_id}.json")
     file.save(temp_path)
 
-    try:
-        # 使用流式解析加载JSON（避免内存溢出）
-        data = load_json(temp_path)
-        analyzer = analyzer_mod.ChatAnalyzer(data, use_stopwords=use_stopwords)
-        analyzer.analyze()
-        report = analyzer.export_json()
-
-        all_words = report.get('topWords', [])[:100]
+    user_id = get_or_create_user_id()
 
-        # 确保有足够的词汇
-        if len(all_words) == 0:
-            logger.error("❌ 分析结果中没有找到任何热词")
+    if job_queue:
+        # 后台分析：立即返回 202 和任务 ID，前端订阅 /api/jobs/<job_id>/events（或轮询 /api/jobs/<job_id>）
+        job = job_queue.submit(report_id, analyze_upload, report_id, temp_path, options, auto_select, user_id,
+                               user_id=user_id)
+        if job is None:
             cleanup_temp_files(temp_path)
-            return jsonify({"error": "分析结果中没有找到热词，请检查聊天记录文件"}), 500
-
-        if auto_select:
-            logger.info("✅ 进入自动选词模式")
-            # 自动选词模式：根据AI功能是否开启选择不同的选词方式
-            if AI_WORD_SELECTION_ENABLED:
-                logger.info("🤖 启动AI智能选词...")
-                ai_selector = AIWordSelector()
-
-                if ai_selector.client:
-                    selected_word_objects = ai_selector.select_words(all_words, top_n=200)
-
-                    if selected_word_objects:
-                        # 按词频从高到低排序
-                        selected_word_objects_sorted = sorted(
-                            selected_word_objects,
-                            key=lambda w: w['freq'],
-                            reverse=True
-                        )
-                        selected_words = [w['word'] for w in selected_word_objects_sorted[:10]]
-                        # 如果AI选词少于10个，用前10个热词补齐
-                        if len(selected_words) < 10:
-                            logger.warning(f"AI选词只有{len(selected_words)}个，用前10个热词补齐")
-                            selected_words = [w['word'] for w in all_words[:10]]
-                        logger.info(f"✅ AI选词成功（已按词频排序）: {', '.join(selected_words)}")
-                    else:
-                        logger.warning("AI选词失败，使用前10个热词")
-                        selected_words = [w['word'] for w in all_words[:10]]
-                else:
-                    logger.warning("OpenAI未配置或客户端未就绪，使用前10个热词")
-                    selected_words = [w['word'] for w in all_words[:10]]
-            else:
-                # AI功能未开启，直接使用前10个热词
-                logger.info("📋 使用默认前10个热词（AI功能未开启）")
-                if len(all_words) < 10:
-                    logger.warning(f"可用词汇只有{len(all_words)}个，少于10个")
-                selected_words = [w['word'] for w in all_words[:10]]
-                if len(selected_words) < 10:
-                    logger.error(f"无法选择10个词，只有{len(selected_words)}个可用词汇")
-                    raise ValueError(f"可用词汇不足10个，无法生成报告")
-
-            user_id = get_or_create_user_id()
-            logger.info(f"📝 准备生成报告，已选择{len(selected_words)}个词: {', '.join(selected_words[:5])}...")
-            result = finalize_report(
-                report_id=report_id,
-                analyzer=None,  
-                selected_words=selected_words,
-                auto_mode=True,
-                report_data=report,
-                user_id=user_id
-            )
-            logger.info(f"✅ 自动选词模式报告生成完成，返回结果: {result.get_json() if hasattr(result, 'get_json') else result}")
-            cleanup_temp_files(temp_path)
-            return result
-        else:
-            result_temp_path = os.path.join(temp_dir, f"{report_id}_result.json")
-            with open(result_temp_path, 'w', encoding='utf-8') as f:
-                json.dump(report, f, ensure_ascii=False, indent=2)
+            return jsonify({"error": "服务器繁忙，排队中的分析任务已满，请稍后再试"}), 503
+        logger.info(f"📥 已提交后台分析任务: {report_id}")
+        return jsonify({
+            "job_id": report_id,
+            "state": job['state'],
+            "status_url": f"/api/jobs/{report_id}",
+            "events_url": f"/api/jobs/{report_id}/events"
+        }), 202
 
-            return jsonify({
-                "report_id": report_id,
-                "chat_name": report.get('chatName', '未知群聊'),
-                "message_count": report.get('messageCount', 0),
-                "available_words": all_words,
-                "stopwords_enabled": use_stopwords
-            })
+    try:
+        return jsonify(analyze_upload(report_id, temp_path, options, auto_select, user_id))
     except Exception as exc:
-        import traceback
-        error_trace = traceback.format_exc()
-        logger.error(f"❌ upload_and_analyze失败: {exc}")
-        logger.error(f"错误堆栈:\n{error_trace}")
-        traceback.print_exc()
-        cleanup_temp_files(temp_path)
         return jsonify({"error": f"分析失败: {exc}"}), 500
 
 
+def _public_job(job: Dict) -> Dict:
+    """去掉任务状态中不返回给前端的字段"""
+    job.pop('user_id', None)
+    job.pop('pid', None)
+    job.pop('worker_pid', None)
+    return job
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+@limiter.limit(RATE_LIMIT_JOB_STATUS if SECURITY_ENABLED and RATE_LIMIT_JOB_STATUS else "1000000 per hour")
+def get_job_status(job_id):
+    """
+    查询后台分析任务的状态（state: queued / running / done / failed），完成后 result 为上传接口原本的返回数据
+    运行中的 progress 为当前阶段的进度：stage、processed/total、unit、percent、eta_seconds（未知时为 null）
+    """
+    job = job_store.get(secure_filename(job_id))
+    if not job or job.get('user_id') != get_or_create_user_id():
+        return jsonify({"error": "任务不存在或已过期"}), 404
+    return jsonify(_public_job(job))
+
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+@limiter.limit(RATE_LIMIT_JOB_EVENTS if SECURITY_ENABLED and RATE_LIMIT_JOB_EVENTS else "1000000 per hour")
+def stream_job_events(job_id):
+    """
+    以 Server-Sent Events 推送任务状态：状态或进度每变化一次发送一条 data（内容同 /api/jobs/<job_id>），
+    任务结束后发送最后一条并关闭。每个连接占用一个 worker 线程，超过 JOB_EVENTS_MAX_SECONDS 后服务端主动断开，
+    浏览器的 EventSource 会自动重连；本进程已有 JOB_EVENTS_MAX_STREAMS 个连接时返回 503，前端改为轮询。
+    """
+    job_id = secure_filename(job_id)
+    job = job_store.get(job_id)
+    if not job or job.get('user_id') != get_or_create_user_id():
+        return jsonify({"error": "任务不存在或已过期"}), 404
+    if not job_event_streams.acquire(blocking=False):
+        return jsonify({"error": "进度推送连接已满，请改用 /api/jobs/<job_id> 查询"}), 503
+
+    def events():
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        last_sent = time.monotonic()
+        current = job
+        last_updated = None
+        yield "retry: 2000\n\n"
+        while True:
+            if current is None:
+                yield 'event: gone\ndata: {"error": "任务不存在或已过期"}\n\n'
+                return
+            if current.get('updated_at') != last_updated:
+                last_updated = current.get('updated_at')
+                last_sent = time.monotonic()
+                yield f"data: {json.dumps(_public_job(current), ensure_ascii=False)}\n\n"
+                if current.get('state') in JOB_FINISHED_STATES:
+                    return
+            elif time.monotonic() - last_sent >= 15:
+                # 注释行作心跳，防止代理因长时间无数据断开连接
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(JOB_PROGRESS_INTERVAL)
+            current = job_store.get(job_id)
+
+    try:
+        response = Response(stream_with_context(events()), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    except Exception:
+        job_event_streams.release()
+        raise
+    # 连接结束（包括客户端提前断开）时释放名额
+    response.call_on_close(job_event_streams.release)
+    return response
+
+
 @app.route("/api/personal-report", methods=["POST"])
 @limiter.limit(RATE_LIMIT_UPLOAD if SECURITY_ENABLED and RATE_LIMIT_UPLOAD else "1000000 per hour")
 def generate_personal_report():
@@ -457,6 +436,8 @@ def generate_personal_report():
             return jsonify({"error": "未指定要分析的用户名称"}), 400
         
         use_stopwords = request.form.get("use_stopwords", "false").lower() == "true"
+        start_date = request.form.get('start_date') or None
+        end_date = request.form.get('end_date') or None
         
         # 保存临时文件
         base_dir = os.path.join(PROJECT_ROOT, "runtime_outputs")
@@ -468,11 +449,13 @@ def generate_personal_report():
         file.save(temp_path)
         
         try:
-            # 加载JSON数据
-            data = load_json(temp_path)
+            # 加载为列式消息表
+            table = load_table(temp_path, cache=parse_cache, workers=PARSE_WORKERS)
             
             # 创建个人分析器
-            analyzer = PersonalAnalyzer(data, target_name, use_stopwords=use_stopwords)
+            options = AnalysisOptions.from_config(config, use_stopwords=use_stopwords,
+                                                  start_date=start_date, end_date=end_date)
+            analyzer = PersonalAnalyzer(table, target_name, options=options)
             analyzer.analyze()
             report = analyzer.export_json()
             
@@ -516,6 +499,115 @@ def generate_personal_report():
         return jsonify({"error": f"服务器错误: {str(e)}"}), 500
 
 
+@app.route("/api/reports/<report_id>/personal", methods=["POST"])
+@limiter.limit(RATE_LIMIT_UPLOAD if SECURITY_ENABLED and RATE_LIMIT_UPLOAD else "1000000 per hour")
+def generate_personal_report_from_dataset(report_id):
+    """用群报告上传时暂存的数据集生成个人报告（无需再次上传文件，仅限上传者本人）"""
+    if not dataset_store:
+        return jsonify({"error": "数据集暂存未启用，请使用 /api/personal-report 上传文件"}), 400
+
+    data = request.get_json(silent=True) or request.form
+    target_name = (data.get('target_name') or '').strip()
+    target_uin = str(data.get('uin') or '').strip()
+    if not target_name and not target_uin:
+        return jsonify({"error": "未指定要分析的用户名称或QQ号"}), 400
+    use_stopwords = str(data.get("use_stopwords", "false")).lower() == "true"
+
+    user_id = get_or_create_user_id()
+    # 不属于当前用户的数据集与不存在同样返回 404，不暴露报告是否有暂存数据
+    dataset = dataset_store.get(report_id, owner=user_id)
+    if dataset is None:
+        return jsonify({"error": "数据集不存在或已过期，请重新上传聊天记录"}), 404
+    table, (start_date, end_date) = dataset
+
+    try:
+        # 沿用群报告上传时的时间范围
+        options = AnalysisOptions.from_config(config, use_stopwords=use_stopwords,
+                                              start_date=start_date, end_date=end_date)
+        analyzer = PersonalAnalyzer(table, target_name, options=options, target_uin=target_uin or None)
+        analyzer.analyze()
+        report = analyzer.export_json()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ 个人报告生成失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"分析失败: {str(e)}"}), 500
+
+    personal_report_id = str(uuid.uuid4())
+    if db_service:
+        success = db_service.create_personal_report(
+            report_id=personal_report_id,
+            user_name=report.get('user_name', target_name),
+            chat_name=report.get('chat_name', '未知群聊'),
+            report_data=report,
+            user_id=user_id
+        )
+        if not success:
+            logger.warning(f"⚠️ 个人报告保存到数据库失败，但继续返回数据")
+
+    return jsonify({
+        "success": True,
+        "report_id": personal_report_id,
+        "report": report,
+        "report_url": f"/personal-report/{personal_report_id}"
+    })
+
+
+@app.route("/api/personal-report/bulk", methods=["POST"])
+@limiter.limit(RATE_LIMIT_UPLOAD if SECURITY_ENABLED and RATE_LIMIT_UPLOAD else "1000000 per hour")
+def generate_personal_reports_bulk():
+    """
+    一次上传，为群内全部成员生成个人年度报告
+    启用后台分析时与 /api/upload 相同：立即返回 202 和任务 ID，完成后任务的 result 为全部报告的列表
+    """
+    if 'file' not in request.files:
+        return jsonify({"error": "未上传文件"}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({"error": "未选择文件"}), 400
+
+    use_stopwords = request.form.get("use_stopwords", "false").lower() == "true"
+    start_date = request.form.get('start_date') or None
+    end_date = request.form.get('end_date') or None
+    try:
+        min_messages = int(request.form.get("min_messages", PERSONAL_BULK_MIN_MESSAGES))
+    except ValueError:
+        return jsonify({"error": "min_messages 必须是整数"}), 400
+
+    job_id = str(uuid.uuid4())
+    base_dir = os.path.join(PROJECT_ROOT, "runtime_outputs")
+    temp_dir = os.path.join(base_dir, "temp")
+    os.makedirs(temp_dir, exist_ok=True)
+    temp_path = os.path.join(temp_dir, f"{job_id}.json")
+    file.save(temp_path)
+
+    user_id = get_or_create_user_id()
+    options = AnalysisOptions.from_config(config, use_stopwords=use_stopwords,
+                                          start_date=start_date, end_date=end_date)
+
+    if job_queue:
+        job = job_queue.submit(job_id, analyze_personal_bulk, temp_path, options, min_messages, user_id,
+                               user_id=user_id)
+        if job is None:
+            cleanup_temp_files(temp_path)
+            return jsonify({"error": "服务器繁忙，排队中的分析任务已满，请稍后再试"}), 503
+        logger.info(f"📥 已提交批量个人报告任务: {job_id}")
+        return jsonify({
+            "job_id": job_id,
+            "state": job['state'],
+            "status_url": f"/api/jobs/{job_id}",
+            "events_url": f"/api/jobs/{job_id}/events"
+        }), 202
+
+    try:
+        return jsonify(analyze_personal_bulk(temp_path, options, min_messages, user_id))
+    except Exception as e:
+        return jsonify({"error": f"分析失败: {str(e)}"}), 500
+
+
 @app.route("/api/finalize", methods=["POST"])
 @limiter.limit(RATE_LIMIT_FINALIZE if SECURITY_ENABLED and RATE_LIMIT_FINALIZE else "1000000 per hour")
 def finalize_report_endpoint():
@@ -596,64 +688,8 @@ def finalize_report(report_id: str, analyzer, selected_words: List[str],
     """
     try:
         if report_data is None:
-            report = analyzer.export_json()
-        else:
-            report = report_data
-        
-        # 转换selected_words为详细对象
-        top_words = report.get('topWords', [])
-        logger.info(f"📊 报告中的topWords数量: {len(top_words)}")
-        if not isinstance(top_words, list):
-            logger.error(f"❌ topWords格式错误，期望list，实际: {type(top_words)}")
-            raise ValueError(f"topWords格式错误: {type(top_words)}")
-        
-        all_words = {}
-        for w in top_words:
-            if isinstance(w, dict) and 'word' in w:
-                all_words[w['word']] = w
-            else:
-                logger.warning(f"⚠️ 跳过无效的词汇项: {w}")
-        
-        logger.info(f"📝 构建的all_words字典包含{len(all_words)}个词")
-        logger.info(f"📝 需要处理的selected_words: {selected_words}")
-        
-        selected_word_objects = []
-        for word in selected_words:
-            if word in all_words:
-                selected_word_objects.append(all_words[word])
-            else:
-                logger.warning(f"⚠️ 词汇 '{word}' 不在topWords中，使用默认值")
-                selected_word_objects.append({"word": word, "freq": 0, "samples": []})
-        
-        ai_comments = generate_ai_comments(selected_word_objects)
-        
-        statistics = {
-            "chatName": report.get('chatName'),
-            "messageCount": report.get('messageCount'),
-            "rankings": report.get('rankings', {}),
-            "timeDistribution": report.get('timeDistribution', {}),
-            "hourDistribution": report.get('hourDistribution', {})
-        }
-        
-        success = db_service.create_report(
-            report_id=report_id,
-            chat_name=statistics['chatName'],
-            message_count=statistics['messageCount'],
-            selected_words=selected_word_objects,
-            statistics=statistics,
-            ai_comments=ai_comments,
-            user_id=user_id  
-        )
-        
-        if not success:
-            return jsonify({"error": "保存数据库失败"}), 500
-        
-        return jsonify({
-            "success": True,
-            "report_id": report_id,
-            "report_url": f"/report/{report_id}",
-            "message": "报告已生成" if not auto_mode else "AI已自动完成选词并生成报告"
-        })
+            report_data = analyzer.export_json()
+        return jsonify(save_report(report_id, selected_words, report_data, auto_mode, user_id))
     except Exception as exc:
         import traceback
         error_trace = traceback.format_exc()
@@ -663,15 +699,6 @@ def finalize_report(report_id: str, analyzer, selected_words: List[str],
         return jsonify({"error": f"最终化失败: {exc}"}), 500
 
 
-def cleanup_temp_files(file_path: str):
-    try:
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-            logger.info(f"🗑️ 已删除临时文件: {file_path}")
-    except Exception as e:
-        logger.warning(f"⚠️ 清理临时文件失败: {e}")
-
-
 @app.route("/api/reports", methods=["GET"])
 @limiter.limit(RATE_LIMIT_LIST_REPORTS if SECURITY_ENABLED and RATE_LIMIT_LIST_REPORTS else "1000000 per hour")
 def list_reports():
@@ -872,6 +899,8 @@ def delete_report(report_id):
         success = db_service.delete_report(report_id)
         if not success:
             return jsonify({"error": "删除失败"}), 500
+        if dataset_store:
+            dataset_store.delete(report_id)
         
         logger.info(f"✅ 报告已删除: {report_id} (用户: {user_id})")
         return jsonify({"success": True, "message": "报告已删除"})
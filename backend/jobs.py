@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台分析任务
+上传接口只保存文件并提交任务，分析在独立的进程池中执行（与 Web 进程隔离 GIL 和内存），
+任务状态写在 runtime_outputs/jobs/<job_id>.json，多个 gunicorn worker 都能查询。
+运行中的任务把当前阶段的进度（已处理量、总量、预计剩余时间）写在 progress 字段。
+
+排队上限按任务目录统计，对所有 gunicorn worker 合计生效；进程池属于各个 worker，
+因此全站同时运行的分析数最多为 worker 数 × max_workers。
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, Any, Callable
+
+# 添加父目录到路径以导入 logger
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_FINISHED_STATES = (JOB_DONE, JOB_FAILED)
+
+
+class JobStore:
+    """任务状态的文件存储（每个任务一个 JSON 文件，原子替换写入）"""
+
+    def __init__(self, store_dir: str, ttl_seconds: float = 24 * 3600):
+        self.store_dir = store_dir
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.store_dir, f"{job_id}.json")
+
+    def _write(self, job_id: str, job: Dict[str, Any]):
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(job, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(job_id))
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def create(self, job_id: str, **fields) -> Dict[str, Any]:
+        self.purge()
+        now = time.time()
+        job = {'job_id': job_id, 'state': JOB_QUEUED, 'stage': '排队中',
+               'created_at': now, 'updated_at': now}
+        job.update(fields)
+        self._write(job_id, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """合并更新字段（同一任务只由一个进程写入，无需加锁）"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        job['updated_at'] = time.time()
+        self._write(job_id, job)
+        return job
+
+    def active_count(self) -> int:
+        """
+        所有 worker 合计的排队中和运行中任务数
+        提交它的 Web 进程（排队中）或执行它的任务进程（运行中）已退出的任务永远不会完成，
+        标记为失败且不计入
+        """
+        count = 0
+        for name in os.listdir(self.store_dir):
+            if not name.endswith('.json'):
+                continue
+            job_id = name[:-len('.json')]
+            job = self.get(job_id)
+            if job is None or job.get('state') not in (JOB_QUEUED, JOB_RUNNING):
+                continue
+            pid = job.get('pid') if job['state'] == JOB_RUNNING else job.get('worker_pid')
+            if pid and not _pid_alive(pid):
+                logger.warning(f"⚠️ 任务 {job_id} 的进程 {pid} 已退出，标记为失败")
+                self.update(job_id, state=JOB_FAILED, stage='失败', progress=None,
+                            error="分析进程已退出（服务可能已重启），请重新上传")
+                continue
+            count += 1
+        return count
+
+    def purge(self):
+        """删除超过保留时间的任务记录"""
+        now = time.time()
+        for name in os.listdir(self.store_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.store_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl_seconds:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == 'nt':
+        # Windows 上 os.kill 会直接结束进程，无法用来探测，视为存活
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _execute(store_dir: str, job_id: str, fn: Callable, args: tuple):
+    """
+    在任务进程中执行 fn(*args, set_stage=..., set_progress=...)，结果或错误写入任务状态
+    set_stage 切换阶段并清空进度，set_progress 接收 ProgressReporter.snapshot() 的字典
+    """
+    store = JobStore(store_dir)
+    store.update(job_id, state=JOB_RUNNING, stage='开始分析', progress=None, pid=os.getpid())
+    try:
+        result = fn(*args,
+                    set_stage=lambda stage: store.update(job_id, stage=stage, progress=None),
+                    set_progress=lambda progress: store.update(job_id, progress=progress))
+    except Exception as e:
+        import traceback
+        logger.error(f"❌ 任务 {job_id} 失败: {e}\n{traceback.format_exc()}")
+        store.update(job_id, state=JOB_FAILED, stage='失败', progress=None, error=str(e))
+        return
+    store.update(job_id, state=JOB_DONE, stage='完成', progress=None, result=result)
+
+
+class JobQueue:
+    """
+    有界的进程池任务队列：本进程同时运行 max_workers 个任务；
+    全站（任务目录中）排队和运行中的任务达到 max_pending 个时拒绝提交
+    """
+
+    def __init__(self, store: JobStore, max_workers: int = 1, max_pending: int = 8):
+        self.store = store
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn：任务进程不继承 Web 进程的线程和锁状态（gthread worker 下 fork 不安全）
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def submit(self, job_id: str, fn: Callable, *args, **fields) -> Optional[Dict[str, Any]]:
+        """提交任务，队列已满时返回 None；fn 必须是模块级函数（需要在任务进程中按名称导入）"""
+        with self._lock:
+            # 统计与创建之间不跨进程加锁，多个 worker 同时提交时最多超出 worker 数 - 1 个
+            if self.store.active_count() >= self.max_pending:
+                return None
+            job = self.store.create(job_id, worker_pid=os.getpid(), **fields)
+            try:
+                future = self._get_executor().submit(_execute, self.store.store_dir, job_id, fn, args)
+            except BrokenProcessPool:
+                self._executor = None
+                future = self._get_executor().submit(_execute, self.store.store_dir, job_id, fn, args)
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        return job
+
+    def _on_done(self, job_id: str, future):
+        exc = future.exception()
+        if exc is not None:
+            # 任务进程异常退出（例如内存不足被杀），_execute 来不及记录
+            logger.error(f"❌ 任务 {job_id} 的进程异常退出: {exc}")
+            self.store.update(job_id, state=JOB_FAILED, stage='失败', progress=None,
+                              error=f"分析进程异常退出: {exc}")
+            if isinstance(exc, BrokenProcessPool):
+                with self._lock:
+                    self._executor = None
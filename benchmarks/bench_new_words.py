@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+新词发现基准：对比 NEW_WORD_ENGINE 各实现的耗时和峰值内存，并校验发现的新词一致
+
+    python benchmarks/bench_new_words.py --messages 500000
+    python benchmarks/bench_new_words.py --file 某个真实导出.json --min-freq 5
+
+峰值内存用 tracemalloc 单独跑一遍测量（tracemalloc 会拖慢运行，不计入耗时）。
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import generate
+from message_table import load_table
+from analyzer import ChatAnalyzer, _SENTENCE_SPLIT_PATTERN
+from word_discovery import ENGINES, discover_words
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=500000)
+    parser.add_argument('--file', default='runtime_outputs/bench/synthetic.json')
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=ENGINES)
+    parser.add_argument('--min-freq', type=int, default=None, help='默认使用配置中的 NEW_WORD_MIN_FREQ')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    if not os.path.exists(args.file):
+        print(f"生成 {args.messages} 条合成消息 -> {args.file}")
+        generate(args.messages, args.file)
+
+    # 第一轮处理得到清洗后的文本，与 analyze() 中新词发现的输入相同
+    analyzer = ChatAnalyzer(load_table(args.file))
+    analyzer._process_messages_once(analyzer.rows)
+    texts = [text for text, _ in analyzer.cleaned_texts_with_sender]
+    options = analyzer.options
+    min_freq = args.min_freq if args.min_freq is not None else options.new_word_min_freq
+    print(f"文本 {len(texts)} 条, {sum(map(len, texts))} 字, 最低词频 {min_freq}")
+
+    def run(engine):
+        return discover_words(texts, _SENTENCE_SPLIT_PATTERN, min_freq,
+                              options.entropy_threshold, options.pmi_threshold, engine=engine)
+
+    baseline = None
+    for engine in args.engines:
+        start = time.perf_counter()
+        words = set(run(engine))
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        run(engine)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        if baseline is None:
+            baseline = words
+        print(f"{engine:<14} {elapsed:7.2f}s  峰值内存 {peak / 1024 / 1024:7.1f} MB  "
+              f"新词 {len(words)} 个  结果一致: {words == baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+并行解析基准：对比不同进程数下 load_table 的耗时，并校验结果与单进程一致
+
+    python benchmarks/bench_parallel_load.py --messages 500000 --workers 1 2 4 8
+
+加速比受限于机器的物理核数，进程数超过核数后不会继续提升。
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import generate
+from message_table import load_table
+
+
+def tables_equal(a, b):
+    if len(a) != len(b) or a.chat_name != b.chat_name:
+        return False
+    for name, col in vars(a).items():
+        other = getattr(b, name)
+        if hasattr(col, 'values') and isinstance(col.values, list):
+            if col.values != other.values:
+                return False
+        elif name != 'texts' and col != other:
+            return False
+    return all(a.text(i) == b.text(i) for i in range(len(a)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=500000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--file', default='runtime_outputs/bench/synthetic.json')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    if not os.path.exists(args.file):
+        print(f"生成 {args.messages} 条合成消息 -> {args.file}")
+        generate(args.messages, args.file)
+    size_mb = os.path.getsize(args.file) / 1024 / 1024
+    print(f"文件 {size_mb:.1f} MB, CPU 核数 {os.cpu_count()}")
+
+    baseline = None
+    base_time = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        table = load_table(args.file, workers=workers)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline, base_time = table, elapsed
+            same = True
+        else:
+            same = tables_equal(baseline, table)
+        print(f"workers={workers:<3} {elapsed:7.2f}s  {size_mb / elapsed:6.1f} MB/s  "
+              f"加速比 {base_time / elapsed:4.2f}x  结果一致: {same}")
+
+
+if __name__ == '__main__':
+    main()
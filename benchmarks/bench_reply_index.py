@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+回复间隔基准：对比按 messageId 逐行查找（list.index，O(回复数 × 消息数)）与 MessageIndex（O(1)）
+计算个人报告回复间隔的耗时，并校验结果一致
+
+    python benchmarks/bench_reply_index.py --messages 500000 --users 20
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import generate
+from message_table import load_table
+from personal_analyzer import PersonalAnalyzer
+from utils import NO_TIME
+
+
+def reply_targets(table, rows):
+    """目标用户每条回复的 (发出时间, 被回复人 uin, 引用的 messageId 编号)"""
+    strings = table.strings.values
+    result = []
+    for row in rows:
+        ts = table.timestamps[row]
+        for r in table.replies(row):
+            sender_uid = table.reply_sender_uids[r]
+            ref_msg_id = table.reply_sources[r]
+            if ref_msg_id < 0:
+                ref_msg_id = table.reply_replays[r]
+            if sender_uid >= 0 and ref_msg_id >= 0:
+                result.append((ts, strings[sender_uid], ref_msg_id))
+    return result
+
+
+def scan_intervals(table, targets):
+    intervals = defaultdict(list)
+    for ts, uin, ref_msg_id in targets:
+        try:
+            prev_row = table.msg_ids.index(ref_msg_id)
+        except ValueError:
+            continue
+        prev_ts = table.timestamps[prev_row]
+        if prev_ts != NO_TIME:
+            intervals[uin].append((ts - prev_ts) / 1000000)
+    return intervals
+
+
+def indexed_intervals(table, targets):
+    index = table.build_message_index()
+    intervals = defaultdict(list)
+    for ts, uin, ref_msg_id in targets:
+        prev_ts = index.timestamp(ref_msg_id)
+        if prev_ts != NO_TIME:
+            intervals[uin].append((ts - prev_ts) / 1000000)
+    return intervals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=500000)
+    parser.add_argument('--users', type=int, default=20, help='成员越少，单个成员的回复越多')
+    parser.add_argument('--file', default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    path = args.file or f'runtime_outputs/bench/synthetic_{args.messages}_{args.users}u.json'
+    if not os.path.exists(path):
+        print(f"生成 {args.messages} 条合成消息（{args.users} 个成员） -> {path}")
+        generate(args.messages, path, users=args.users)
+    table = load_table(path)
+
+    # 回复最多的成员
+    sender_ids = table.sender_ids
+    reply_rows = defaultdict(list)
+    for row in range(len(table)):
+        if table.reply_ptr[row] != table.reply_ptr[row + 1]:
+            reply_rows[sender_ids[row]].append(row)
+    sid, rows = max(reply_rows.items(), key=lambda item: len(item[1]))
+    targets = reply_targets(table, rows)
+    print(f"消息 {len(table)} 条, 成员 {table.senders.values[sid]} 的回复 {len(targets)} 条")
+
+    start = time.perf_counter()
+    expected = scan_intervals(table, targets)
+    scan_time = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = indexed_intervals(table, targets)
+    index_time = time.perf_counter() - start
+    print(f"逐行查找 {scan_time:7.2f}s  MessageIndex {index_time:7.2f}s  "
+          f"加速比 {scan_time / index_time:6.1f}x  结果一致: {expected == actual}")
+
+    start = time.perf_counter()
+    analyzer = PersonalAnalyzer(table, f"群友{int(table.senders.values[sid]) - 10000}")
+    analyzer.analyze()
+    print(f"PersonalAnalyzer.analyze 总耗时 {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
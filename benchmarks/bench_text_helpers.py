@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+文本工具微基准：对比 clean_text / analyze_single_chars / is_emoji / extract_emojis
+与逐字符实现（改写前的版本，保留在本文件中作对照）的耗时，并校验结果完全一致
+
+    python benchmarks/bench_text_helpers.py --lines 1000000
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import _PHRASES
+from utils import clean_text, analyze_single_chars, is_emoji, extract_emojis
+
+_EXTRA = ["[图片]", "[表情]", "[[嵌套]外层]", "未闭合[括号", "多余]括号", "www.example.com/x", "A", "b",
+          "好", "？", "！！", "  多个   空白 ", "“引号”", "《书名》", "😀", "⌚", "a b c"]
+
+
+# ---------- 改写前的实现 ----------
+
+def legacy_extract_emojis(text):
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"
+        "\U0001F300-\U0001F5FF"
+        "\U0001F680-\U0001F6FF"
+        "\U0001F1E0-\U0001F1FF"
+        "\U00002702-\U000027B0"
+        "\U0001F900-\U0001F9FF"
+        "\U0001FA00-\U0001FA6F"
+        "\U0001FA70-\U0001FAFF"
+        "\U00002600-\U000026FF"
+        "\U00002300-\U000023FF"
+        "]",
+        flags=re.UNICODE
+    )
+    return emoji_pattern.findall(text)
+
+
+def legacy_is_emoji(char):
+    if len(char) != 1:
+        return False
+    code = ord(char)
+    emoji_ranges = [
+        (0x1F600, 0x1F64F), (0x1F300, 0x1F5FF), (0x1F680, 0x1F6FF),
+        (0x1F1E0, 0x1F1FF), (0x2702, 0x27B0), (0x1F900, 0x1F9FF),
+        (0x1FA00, 0x1FA6F), (0x1FA70, 0x1FAFF), (0x2600, 0x26FF), (0x2300, 0x23FF),
+    ]
+    return any(start <= code <= end for start, end in emoji_ranges)
+
+
+def legacy_clean_text(text, at_contents=None):
+    if not text:
+        return ""
+    if at_contents:
+        for at_content in at_contents:
+            if at_content:
+                text = text.replace(at_content, '')
+    if '[' in text or ']' in text:
+        result = []
+        bracket_depth = 0
+        for char in text:
+            if char == '[':
+                bracket_depth += 1
+            elif char == ']':
+                if bracket_depth > 0:
+                    bracket_depth -= 1
+            elif bracket_depth == 0:
+                result.append(char)
+        text = ''.join(result)
+    if 'http' in text or 'www.' in text:
+        text = re.sub(r'https?://\S+', '', text)
+        text = re.sub(r'www\.\S+', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def legacy_analyze_single_chars(texts):
+    total_count = Counter()
+    solo_count = Counter()
+    boundary_count = Counter()
+    punctuation = set('，。！？、；：""''（）,.!?;:\'"()[]【】《》<>…—～·')
+    for text in texts:
+        for char in text:
+            if re.match(r'^[一-鿿a-zA-Z]$', char):
+                total_count[char] += 1
+        clean_chars = [c for c in text if re.match(r'^[一-鿿a-zA-Z]$', c)]
+        if len(clean_chars) == 1:
+            solo_count[clean_chars[0]] += 1
+        for i, char in enumerate(text):
+            if not re.match(r'^[一-鿿a-zA-Z]$', char):
+                continue
+            left_ok = (i == 0) or (text[i-1] in punctuation) or (text[i-1].isspace())
+            right_ok = (i == len(text)-1) or (text[i+1] in punctuation) or (text[i+1].isspace())
+            if left_ok and right_ok:
+                boundary_count[char] += 1
+    result = {}
+    for char in total_count:
+        total = total_count[char]
+        solo = solo_count[char]
+        boundary = boundary_count[char]
+        independent = solo + boundary * 0.5
+        ratio = independent / total if total > 0 else 0
+        result[char] = (total, independent, ratio)
+    return result
+
+
+def make_corpus(lines, seed=1):
+    rnd = random.Random(seed)
+    pool = _PHRASES + _EXTRA
+    return [' '.join(rnd.choice(pool) for _ in range(rnd.randint(1, 3))) for _ in range(lines)]
+
+
+def timed(label, old, new, *args):
+    start = time.perf_counter()
+    expected = old(*args)
+    old_time = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = new(*args)
+    new_time = time.perf_counter() - start
+    print(f"{label:<22} 改写前 {old_time:7.2f}s  现在 {new_time:7.2f}s  "
+          f"加速比 {old_time / new_time:5.1f}x  结果一致: {expected == actual}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=1000000)
+    args = parser.parse_args()
+
+    raw = make_corpus(args.lines)
+    cleaned = [clean_text(text) for text in raw]
+    chars = [char for text in raw[:args.lines // 10] for char in text]
+    print(f"{len(raw)} 行, {sum(map(len, raw))} 字")
+
+    timed('clean_text', lambda: [legacy_clean_text(t) for t in raw], lambda: [clean_text(t) for t in raw])
+    timed('analyze_single_chars', legacy_analyze_single_chars, analyze_single_chars, cleaned)
+    timed('is_emoji', lambda: [legacy_is_emoji(c) for c in chars], lambda: [is_emoji(c) for c in chars])
+    timed('extract_emojis', lambda: [legacy_extract_emojis(t) for t in raw],
+          lambda: [extract_emojis(t) for t in raw])
+
+
+if __name__ == '__main__':
+    main()
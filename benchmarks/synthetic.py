@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+生成 qq-chat-exporter 格式的合成聊天记录，供 benchmarks 下的脚本使用
+
+    python benchmarks/synthetic.py 200000 runtime_outputs/bench/synthetic.json
+"""
+
+import os
+import sys
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+_PHRASES = [
+    "哈哈哈", "6", "？", "今天吃什么", "这个好离谱", "绝绝子真的绝绝子", "打工人打工魂", "摸鱼摸鱼",
+    "群主发红包", "yyds永远的神", "有没有人一起打游戏", "草", "我超", "破防了家人们", "笑死我了哈哈哈",
+    "明天上班好累", "周末去哪玩", "看看这个 https://example.com/a?b=1 链接", "😀😂👍", "好的👌",
+    "芜湖起飞", "芜湖起飞了兄弟们", "内卷严重", "躺平躺平", "电子榨菜", "蚌埠住了", "蚌埠住了真的",
+]
+
+
+def generate(n, path, users=200, seed=1, indent=2):
+    """生成 n 条消息写入 path，时间均匀分布在 2024 全年"""
+    rnd = random.Random(seed)
+    members = [(str(10000 + i), f"群友{i}") for i in range(users)]
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    messages = []
+    for i in range(n):
+        uin, name = rnd.choice(members)
+        t = t0 + timedelta(seconds=int(i * (366 * 86400 / n)) + rnd.randint(0, 50))
+        text = rnd.choice(_PHRASES)
+        if rnd.random() < 0.3:
+            text += rnd.choice(_PHRASES)
+        msg_id = str(7300000000000000000 + i * 7919)
+        elements = []
+        if rnd.random() < 0.1:
+            target = rnd.choice(members)
+            at = f"@{target[1]}"
+            text = f"{at} {text}"
+            elements.append({"elementType": 1, "elementId": "1",
+                             "textElement": {"content": at, "atType": 2, "atUid": target[0]}})
+        elements.append({"elementType": 1, "elementId": "2",
+                         "textElement": {"content": text, "atType": 0, "atUid": "0"}})
+        if rnd.random() < 0.1:
+            elements.append({"elementType": 2, "elementId": "3",
+                             "picElement": {"summary": rnd.choice(["[动画表情]", ""]), "fileName": "a.jpg"}})
+        if messages and rnd.random() < 0.1:
+            ref = rnd.choice(messages[-50:])
+            elements.insert(0, {"elementType": 7, "elementId": "4",
+                                "replyElement": {"sourceMsgIdInRecords": ref["messageId"],
+                                                 "senderUid": ref["sender"]["uin"]}})
+        messages.append({
+            "id": msg_id,
+            "messageId": msg_id,
+            "seq": str(i),
+            "timestamp": t.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            "sender": {"uid": "u_" + uin, "uin": uin, "name": name},
+            "messageType": 1,
+            "content": {"text": text, "html": text, "elements": [], "resources": [], "mentions": []},
+            "rawMessage": {"msgId": msg_id, "subMsgType": 1, "sendMemberName": name, "elements": elements},
+        })
+
+    data = {
+        "metadata": {"name": "QQChatExporter", "version": "4"},
+        "chatInfo": {"name": "合成测试群", "type": "group"},
+        "statistics": {"totalMessages": n},
+        "messages": messages,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    return path
+
+
+if __name__ == '__main__':
+    generate(int(sys.argv[1]), sys.argv[2])
@@ -20,6 +20,64 @@ OUTPUT_ENCODING = "utf-8"
 CONSOLE_WIDTH = 60
 
 
+# ============================================
+# 性能配置
+# ============================================
+
+# 流式分析模式
+# True：边解析边统计，文件只解析一遍，统计过的消息不再保留（不建消息列表/消息表）；
+#   清洗后的文本和分词结果仍保留到分析结束，峰值内存仍随有效文本量增长
+# False：先加载全部消息再分析（默认）
+# 注意：流式模式下通过 msgId 查找回复对象时只能匹配到更早出现的消息
+STREAM_ANALYSIS = False
+
+# 解析缓存
+# 以文件内容的 SHA-256 为键缓存解析结果，同一文件再次分析时跳过 JSON 解析
+# （修改时间范围、停用词、TOP_N 等参数后重跑都能命中）
+# 流式分析模式不使用缓存
+PARSE_CACHE_ENABLED = True
+PARSE_CACHE_DIR = 'runtime_outputs/parse_cache'
+PARSE_CACHE_MAX_MB = 1024  # 缓存总大小上限，超出时淘汰最久未使用的条目
+
+# 并行解析进程数
+# 大于 1 时按消息边界把 messages 数组切段，用多个进程并行解析
+# 仅对缩进格式（导出工具默认）的 JSON 生效，压缩成一行的文件自动回退为单进程
+PARSE_WORKERS = 1
+
+# 分词缓存条数上限
+# 按清洗后的文本缓存 jieba 分词结果，重复消息（复读、“哈哈哈”等）不再重复分词
+# 设为 0 关闭缓存
+TOKENIZE_CACHE_SIZE = 200000
+
+# 增量重新分词
+# False：新词发现、词组合并之后对全部文本重新分词，结果与原有流程完全一致（默认）
+# True：只对包含新词的文本重新分词，快很多，但 jieba 加词会改变词典总词频，
+#      少数不含新词的文本切分也可能随之变化，因此词频可能有个位数的差异
+INCREMENTAL_RESEGMENT = False
+
+# 文本清洗和分词的并行进程数
+# 大于 1 时把第一轮的 clean_text + jieba 分词分给多个进程，结果与单进程一致
+# 流式分析模式下不生效；命令行可用 --workers 覆盖
+ANALYSIS_WORKERS = 1
+
+# 新词发现实现（两种实现结果完全一致）
+# 'apriori'：逐层计数，只延伸高频的 n-gram（默认）
+# 'suffix_array'：后缀数组 + LCP，内存只与语料长度成正比，适合多年的超大导出
+NEW_WORD_ENGINE = 'apriori'
+
+# 词频统计方式
+# 'exact'：精确统计全部词的词频、贡献者和示例（默认）
+# 'approximate'：先用 Space-Saving 找出可能进入 TOP_N 的高频词，只对这些词精确统计，
+#   其余长尾词的词频用 Count-Min Sketch 估计。词频统计本身的内存（计数、标记、贡献者、示例）
+#   只为候选词分配，上限由下面的参数决定，与词表大小无关；新词发现需要的分词结果、词表和
+#   清洗后文本仍完整保存，随语料增长，这部分与精确模式相同；
+#   误差说明写入导出结果的 wordStats（topWordsExact 为 True 时热词榜与精确模式一致）
+WORD_STATS_MODE = 'exact'
+WORD_STATS_CAPACITY = 10000  # Space-Saving 跟踪的词数，应远大于 TOP_N
+WORD_SKETCH_WIDTH = 131072  # Count-Min Sketch 每行宽度，误差约为 e / 宽度 × 总词次
+WORD_SKETCH_DEPTH = 4  # Count-Min Sketch 行数，误差超出上述范围的概率约为 e^-行数
+
+
 # ============================================
 # 词频统计参数
 # ============================================
@@ -134,6 +192,10 @@ CONTRIBUTOR_TOP_N = 10
 # 每个热词显示的示例消息数量
 SAMPLE_COUNT = 10
 
+# 示例消息抽样的随机种子（示例从该词全年的所有出现中均匀抽取）
+# None：每次运行随机抽取；设为整数则同一份数据每次生成的示例相同
+SAMPLE_SEED = None
+
 
 # ============================================
 # 时间分析配置
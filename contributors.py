@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+词 × 发言人的稀疏贡献计数
+按 CSR（按词压缩的行）格式存成三个平行的 array：发言人编号、次数、该组合首次出现的文本下标，
+同一个词的组合连续存放，word_ptr 给出每个词的区间；每个组合约 12 字节，不再为每个词建立一个 Counter。
+近似模式只统计候选词，这时区间按候选词（word_keys）而不是整个词表编号，查询时二分查找。
+构建时按发言人分组统计，临时内存只有单个发言人的计数，最后按词编号做一次计数排序；
+某个词的贡献者按需提取（只有进入热词榜的词才需要），只读取该词的区间，
+提取结果与逐词 Counter 的 most_common 完全一致（同票按首次出现顺序）。
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+
+class ContributorMatrix:
+    """按词查询时返回 Counter（发言人 uin -> 次数），用法与 defaultdict(Counter) 相同"""
+
+    def __init__(self, vocab=None):
+        self.vocab = vocab
+        self.users = []  # 发言人编号 -> uin
+        self.word_ptr = array('Q', [0])  # 区间编号 -> 起点，word_ptr[slot + 1] 为终点
+        self.word_keys = None  # 区间编号 -> 词编号，None 表示区间编号就是词编号
+        self.user_ids = array('I')
+        self.counts = array('I')
+        self.firsts = array('I')
+        self._cache = {}
+
+    @classmethod
+    def build(cls, vocab, texts_with_sender, streams, skip, word_keys=None):
+        """
+        Args:
+            vocab: 词表
+            texts_with_sender: (文本, 发送者 uin) 列表，与 streams 一一对应
+            streams: TokenStreams
+            skip: 按词编号标记不统计的词
+            word_keys: 可选，参与统计的全部词编号（已排序）；给出时只为这些词建区间
+        """
+        matrix = cls(vocab)
+        by_user = {}
+        for idx, (_, uin) in enumerate(texts_with_sender):
+            if uin:
+                indices = by_user.get(uin)
+                if indices is None:
+                    indices = by_user[uin] = array('I')
+                indices.append(idx)
+
+        # 先按发言人顺序写成 COO，再按词编号重排
+        word_ids = array('I')
+        user_ids = array('I')
+        counts = array('I')
+        firsts = array('I')
+        for uid, (uin, indices) in enumerate(by_user.items()):
+            matrix.users.append(uin)
+            user_counts = {}
+            user_firsts = {}
+            for idx in indices:
+                for wid in streams[idx]:
+                    if skip[wid]:
+                        continue
+                    count = user_counts.get(wid)
+                    if count is None:
+                        user_counts[wid] = 1
+                        user_firsts[wid] = idx
+                    else:
+                        user_counts[wid] = count + 1
+            word_ids.extend(user_counts.keys())
+            counts.extend(user_counts.values())
+            firsts.extend(user_firsts.values())
+            user_ids.extend([uid] * len(user_counts))
+        matrix._compress(word_ids, user_ids, counts, firsts, len(vocab), word_keys)
+        return matrix
+
+    def _compress(self, word_ids, user_ids, counts, firsts, vocab_size, word_keys=None):
+        """按词编号计数排序，把 COO 转为 CSR（同一个词内保持原有顺序）"""
+        if word_keys is not None:
+            slots = {wid: slot for slot, wid in enumerate(word_keys)}
+            word_ids = array('I', map(slots.__getitem__, word_ids))
+            vocab_size = len(word_keys)
+            self.word_keys = word_keys
+        word_ptr = array('Q', bytes(8 * (vocab_size + 1)))
+        for wid in word_ids:
+            word_ptr[wid + 1] += 1
+        for wid in range(vocab_size):
+            word_ptr[wid + 1] += word_ptr[wid]
+
+        size = len(word_ids)
+        positions = word_ptr[:-1]
+        sorted_users = array('I', bytes(4 * size))
+        sorted_counts = array('I', bytes(4 * size))
+        sorted_firsts = array('I', bytes(4 * size))
+        for i, wid in enumerate(word_ids):
+            pos = positions[wid]
+            positions[wid] = pos + 1
+            sorted_users[pos] = user_ids[i]
+            sorted_counts[pos] = counts[i]
+            sorted_firsts[pos] = firsts[i]
+
+        self.word_ptr = word_ptr
+        self.user_ids = sorted_users
+        self.counts = sorted_counts
+        self.firsts = sorted_firsts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _slot(self, wid):
+        """词编号对应的区间编号，该词不在矩阵中时返回 None"""
+        keys = self.word_keys
+        if keys is None:
+            return wid if wid + 1 < len(self.word_ptr) else None
+        slot = bisect_left(keys, wid)
+        if slot < len(keys) and keys[slot] == wid:
+            return slot
+        return None
+
+    def __getitem__(self, word):
+        counter = self._cache.get(word)
+        if counter is None:
+            counter = self._cache[word] = self._extract(word)
+        return counter
+
+    def _extract(self, word):
+        wid = self.vocab.get(word) if self.vocab is not None else None
+        slot = self._slot(wid) if wid is not None else None
+        if slot is None:
+            return Counter()
+        start = self.word_ptr[slot]
+        end = self.word_ptr[slot + 1]
+        # 按首次出现顺序插入，与逐条累加的 Counter 顺序相同
+        entries = sorted(zip(self.firsts[start:end], self.user_ids[start:end], self.counts[start:end]))
+        users = self.users
+        return Counter({users[uid]: count for _, uid, count in entries})
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+已上传数据集的暂存
+群报告分析完成后，把构建好的 MessageTable 连同上传者的 user_id 和上传时选择的时间范围
+以 pickle 按 report_id 存到磁盘，
+之后上传者为同一个群生成个人报告时直接读取，不必再次上传和解析原始 JSON。
+群报告可以通过分享链接公开访问，但原始聊天数据只对上传者可用：读取时必须给出相同的 user_id。
+消息表可能是完整的（命中解析缓存时）也可能已按时间范围裁剪，因此时间范围一并保存，
+生成个人报告时由 PersonalAnalyzer 再按它过滤，结果与缓存状态无关。
+
+条目在最后一次使用后保留 ttl 秒（读取时刷新 mtime），过期或总大小超过上限时删除。
+存在磁盘上，多个 gunicorn worker 之间共享。
+"""
+
+import os
+import re
+import time
+import pickle
+import tempfile
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+_SUFFIX = '.table.pkl'
+_VALID_ID = re.compile(r'^[0-9a-fA-F-]{1,64}$')
+
+
+class DatasetStore:
+    """按 report_id 暂存 MessageTable（记录上传者），带 TTL 和总大小上限"""
+
+    def __init__(self, store_dir='runtime_outputs/datasets', ttl_seconds=24 * 3600, max_mb=2048):
+        self.store_dir = store_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, report_id):
+        # report_id 来自 URL，只接受 uuid 形式，防止路径遍历
+        if not _VALID_ID.match(report_id or ''):
+            return None
+        return os.path.join(self.store_dir, report_id + _SUFFIX)
+
+    def put(self, report_id, table, owner, start_date=None, end_date=None):
+        """
+        写入（先写临时文件再原子替换），然后清理过期和超出上限的条目
+        owner 为上传者的 user_id，start_date / end_date 为上传时选择的时间范围（'YYYY-MM-DD' 或 None）
+        """
+        path = self._path(report_id)
+        if path is None:
+            return
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((owner, (start_date, end_date), table), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"⚠️ 暂存数据集失败: {e}")
+            if tmp_path:
+                self._remove(tmp_path)
+            return
+
+        size = os.path.getsize(path)
+        logger.info(f"🗂️ 已暂存数据集: {report_id} ({size / 1024 / 1024:.1f} MB, "
+                    f"保留 {self.ttl_seconds / 3600:.1f} 小时)")
+        self.purge(keep=path)
+
+    def get(self, report_id, owner):
+        """
+        读取数据集，返回 (消息表, (start_date, end_date))；
+        不存在、已过期、损坏或 owner 不是上传者时返回 None
+        """
+        path = self._path(report_id)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                logger.info(f"🗂️ 数据集已过期: {report_id}")
+                self._remove(path)
+                return None
+        except OSError:
+            return None
+
+        start_time = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                stored_owner, date_range, table = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ 暂存数据集损坏，已删除: {report_id} ({e})")
+            self._remove(path)
+            return None
+
+        if owner is None or stored_owner != owner:
+            logger.warning(f"⚠️ 权限拒绝: 用户 {owner} 尝试读取数据集 {report_id} (所有者: {stored_owner})")
+            return None
+
+        # 刷新 mtime，最后一次使用后重新计时
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        logger.info(f"🗂️ 读取暂存数据集: {report_id}, 耗时 {time.perf_counter() - start_time:.2f}s")
+        return table, date_range
+
+    def delete(self, report_id):
+        path = self._path(report_id)
+        if path is not None:
+            self._remove(path)
+
+    def purge(self, keep=None):
+        """删除过期条目；总大小仍超过上限时按 mtime 从旧到新删除"""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.store_dir):
+            if not name.endswith(_SUFFIX):
+                continue
+            path = os.path.join(self.store_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds and path != keep:
+                self._remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+            logger.info(f"🗂️ 淘汰暂存数据集: {os.path.basename(path)}")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -6,14 +6,16 @@ QQ群聊年度报告生成器 - 主入口
 Licensed under AGPL-3.0: https://www.gnu.org/licenses/agpl-3.0.html
 
 Usage:
-    python main.py [input_file]
+    python main.py [input_file] [--workers N]
     
     input_file: 可选，JSON文件路径，默认读取config.py中的INPUT_FILE
+    --workers:  可选，文本清洗和分词的并行进程数，默认读取config.py中的ANALYSIS_WORKERS
 """
 
 import sys
 import os
 import json
+import argparse
 
 # 添加当前目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -28,8 +30,11 @@ except ImportError:
     pass  # python-dotenv 未安装，跳过
 
 import config as cfg
-from utils import load_json, sanitize_filename
+from utils import sanitize_filename, resolve_date_range, ChatFileError
+from message_table import load_table
+from parse_cache import ParseCache
 from analyzer import ChatAnalyzer
+from options import AnalysisOptions
 from report_generator import ReportGenerator
 from image_generator import ImageGenerator
 from logger import get_logger, init_logging
@@ -42,10 +47,13 @@ logger = get_logger('main')
 def main():
     """主函数"""
     # 解析命令行参数
-    if len(sys.argv) > 1:
-        input_file = sys.argv[1]
-    else:
-        input_file = cfg.INPUT_FILE
+    parser = argparse.ArgumentParser(description='QQ群聊年度报告生成器')
+    parser.add_argument('input_file', nargs='?', default=cfg.INPUT_FILE,
+                        help='JSON文件路径，默认读取config.py中的INPUT_FILE')
+    parser.add_argument('--workers', type=int, default=getattr(cfg, 'ANALYSIS_WORKERS', 1),
+                        help='文本清洗和分词的并行进程数')
+    args = parser.parse_args()
+    input_file = args.input_file
     
     # 检查文件存在
     if not os.path.exists(input_file):
@@ -55,19 +63,35 @@ def main():
     
     logger.info(f"📂 加载文件: {input_file}")
     
-    # 加载数据
+    options = AnalysisOptions.from_config(cfg, workers=args.workers)
+    
+    # 加载数据并创建分析器
+    if getattr(cfg, 'STREAM_ANALYSIS', False):
+        # 流式模式：解析与第一轮统计合并，不在内存中保留消息列表
+        logger.info("🌊 使用流式分析模式")
+        analyzer = ChatAnalyzer.from_stream(input_file, options=options)
+    else:
+        cache = None
+        if getattr(cfg, 'PARSE_CACHE_ENABLED', True):
+            cache = ParseCache(getattr(cfg, 'PARSE_CACHE_DIR', 'runtime_outputs/parse_cache'),
+                               getattr(cfg, 'PARSE_CACHE_MAX_MB', 1024))
+        try:
+            date_range = resolve_date_range(options.start_date, options.end_date)
+            table = load_table(input_file, cache=cache, workers=getattr(cfg, 'PARSE_WORKERS', 1),
+                               date_range=date_range)
+        except Exception as e:
+            logger.error(f"文件加载失败: {e}")
+            sys.exit(1)
+        
+        analyzer = ChatAnalyzer(table, options=options)
+    
+    # 执行分析（流式模式下文件在分析过程中才被解析，只有解析错误按加载失败处理）
     try:
-        data = load_json(input_file)
-    except Exception as e:
+        analyzer.analyze()
+    except ChatFileError as e:
         logger.error(f"文件加载失败: {e}")
         sys.exit(1)
     
-    # 创建分析器
-    analyzer = ChatAnalyzer(data)
-    
-    # 执行分析
-    analyzer.analyze()
-    
     # 生成报告
     reporter = ReportGenerator(analyzer)
     reporter.print_console_report()
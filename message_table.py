@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+列式消息表
+把 load_json 产出的嵌套消息字典压缩成若干 array 列 + 一段文本区，
+百万级消息时内存占用比“字典列表”低一个数量级。
+
+每条消息一行，各列按行号对齐：
+- timestamps: 东八区时间对应的 epoch 微秒（int64），解析失败为 NO_TIME
+- senders: 发送者 uin 的驻留编号（int32），无发送者为 -1
+- names / member_names: 发送者昵称、群名片的驻留编号
+- message_ids: messageId 的驻留编号
+- flags: 机器人 / 链接 / 合并转发 位标记
+- pic_images / pic_emojis / content_emojis: 图片、图片表情、content.emojis 数量
+- 文本: TextArena 中的 content.text
+
+@ 和回复元素以 CSR 形式存放（mention_ptr / reply_ptr 给出每行的区间）。
+"""
+
+import re
+from array import array
+from functools import partial
+
+from utils import (
+    iter_messages,
+    iter_message_chunk,
+    parse_in_parallel,
+    load_json,
+    NO_TIME,
+    parse_epoch,
+)
+from parse_cache import file_sha256
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# 行标记位
+FLAG_BOT_SUBTYPE = 1  # subMsgType 为 577 / 65 的机器人消息
+FLAG_LINK = 2         # 含链接（文本含 URL 或链接卡片）
+FLAG_FORWARD = 4      # 含合并转发
+
+# @ 元素标记位
+MENTION_TEXT_ELEMENT = 1  # 来自 elementType == 1 的文本元素
+
+_URL_PATTERN = re.compile(r'https?://')
+class ValuePool:
+    """值驻留池：相同的值共享一个编号，假值（None / '' / 0）不入池，编号为 -1"""
+
+    def __init__(self):
+        self.values = []
+        self._index = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, value):
+        if not value:
+            return -1
+        idx = self._index.get(value)
+        if idx is None:
+            idx = self._index[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+    def __getstate__(self):
+        # 反查索引可由 values 重建，不写入 pickle
+        return self.values
+
+    def __setstate__(self, values):
+        self.values = values
+        self._index = {value: idx for idx, value in enumerate(values)}
+
+    def lookup(self, value, default=-2):
+        """查询已驻留值的编号，不存在时返回 default（默认 -2，不与任何编号或 -1 相等）"""
+        return self._index.get(value, default)
+
+
+class TextArena:
+    """所有消息文本拼接为一段 UTF-8 字节区，按偏移量取回"""
+
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = array('Q', [0])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def append(self, text):
+        self._data += text.encode('utf-8', 'surrogatepass')
+        self._offsets.append(len(self._data))
+        return len(self._offsets) - 2
+
+    def __getitem__(self, idx):
+        return self._data[self._offsets[idx]:self._offsets[idx + 1]].decode('utf-8', 'surrogatepass')
+
+    def extend(self, other):
+        base = len(self._data)
+        self._data += other._data
+        self._offsets.extend(offset + base for offset in other._offsets[1:])
+
+    @property
+    def nbytes(self):
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
+
+
+class MessageIndex:
+    """
+    messageId 驻留编号 -> (发送者驻留编号, epoch 微秒) 的索引，用于按回复引用查找被回复的消息
+    驻留编号是从 0 开始的稠密整数，直接作为两个 array 的下标，查询为 O(1)。
+    同一 messageId 出现多次时，发送者取最后一次、时间取第一个有效时间。
+    """
+
+    def __init__(self):
+        self.sender_ids = array('i')
+        self.timestamps = array('q')
+
+    def __len__(self):
+        return len(self.sender_ids)
+
+    def _grow(self, size):
+        grow = max(size - len(self.sender_ids), len(self.sender_ids))
+        self.sender_ids.extend(array('i', [-1]) * grow)
+        self.timestamps.extend(array('q', [NO_TIME]) * grow)
+
+    def add(self, msg_id, sid=-1, timestamp=NO_TIME):
+        if msg_id < 0:
+            return
+        if msg_id >= len(self.sender_ids):
+            self._grow(msg_id + 1)
+        if sid >= 0:
+            self.sender_ids[msg_id] = sid
+        if self.timestamps[msg_id] == NO_TIME:
+            self.timestamps[msg_id] = timestamp
+
+    def sender(self, msg_id):
+        """被引用消息的发送者驻留编号，未知时返回 None"""
+        if 0 <= msg_id < len(self.sender_ids):
+            sid = self.sender_ids[msg_id]
+            if sid >= 0:
+                return sid
+        return None
+
+    def timestamp(self, msg_id):
+        """被引用消息的时间，未知时返回 NO_TIME"""
+        if 0 <= msg_id < len(self.timestamps):
+            return self.timestamps[msg_id]
+        return NO_TIME
+
+
+class MessageTable:
+    """列式消息表，见模块说明"""
+
+    def __init__(self, chat_name='未知群聊'):
+        self.chat_name = chat_name
+
+        self.senders = ValuePool()      # 发送者 uin（保留原始类型）
+        self.strings = ValuePool()      # 昵称、群名片、@ 的 uid 与内容、回复的 senderUid
+        self.message_ids = ValuePool()  # messageId 及回复引用的消息 ID
+
+        self.timestamps = array('q')
+        self.sender_ids = array('i')
+        self.names = array('i')
+        self.member_names = array('i')
+        self.msg_ids = array('i')
+        self.flags = array('B')
+        self.pic_images = array('I')
+        self.pic_emojis = array('I')
+        self.content_emojis = array('I')
+        self.texts = TextArena()
+
+        # @ 元素（CSR）
+        self.mention_ptr = array('I', [0])
+        self.mention_flags = array('B')
+        self.mention_at_types = array('b')
+        self.mention_uids = array('i')
+        self.mention_contents = array('i')
+
+        # 回复元素（CSR）
+        self.reply_ptr = array('I', [0])
+        self.reply_sender_uids = array('i')
+        self.reply_sources = array('i')
+        self.reply_replays = array('i')
+
+        self.bad_timestamps = 0
+
+    def __len__(self):
+        return len(self.sender_ids)
+
+    @classmethod
+    def from_data(cls, data):
+        """由 load_json 的结果（包含 messages 和 chatInfo）构建"""
+        table = cls(data.get('chatName', data.get('chatInfo', {}).get('name', '未知群聊')))
+        for msg in data.get('messages', []):
+            table.append(msg)
+        return table
+
+    def append(self, msg):
+        """追加一条（已裁剪的）消息字典，返回行号"""
+        sender = msg.get('sender', {})
+        raw = msg.get('rawMessage', {})
+        content = msg.get('content', {})
+        if not isinstance(content, dict):
+            content = {}
+
+        ts = parse_epoch(msg.get('timestamp', ''))
+        if ts == NO_TIME:
+            self.bad_timestamps += 1
+        self.timestamps.append(ts)
+        self.sender_ids.append(self.senders.intern(sender.get('uin')))
+        self.names.append(self.strings.intern((sender.get('name') or '').strip()))
+        self.member_names.append(self.strings.intern(raw.get('sendMemberName', '').strip()))
+        self.msg_ids.append(self.message_ids.intern(msg.get('messageId')))
+        self.texts.append(content.get('text', '') or '')
+        self.content_emojis.append(len(content.get('emojis', [])))
+
+        flags = FLAG_BOT_SUBTYPE if raw.get('subMsgType', 0) in (577, 65) else 0
+        pic_images = 0
+        pic_emojis = 0
+        strings = self.strings
+        message_ids = self.message_ids
+
+        for elem in raw.get('elements', []):
+            elem_type = elem.get('elementType')
+            text_elem = elem.get('textElement')
+
+            if text_elem:
+                at_type = text_elem.get('atType', 0) or 0
+                at_uid = text_elem.get('atUid', '')
+                if at_type or (at_uid and str(at_uid) != '0'):
+                    # 读取方只关心 atType == 2（@具体成员）与 atType > 0，归一化为 2 / 1 / 0
+                    self.mention_flags.append(MENTION_TEXT_ELEMENT if elem_type == 1 else 0)
+                    self.mention_at_types.append(2 if at_type == 2 else 1 if at_type > 0 else 0)
+                    self.mention_uids.append(strings.intern(str(at_uid) if at_uid else ''))
+                    self.mention_contents.append(strings.intern(text_elem.get('content', '')))
+
+            if elem_type == 1:
+                if text_elem and _URL_PATTERN.search(text_elem.get('content', '')):
+                    flags |= FLAG_LINK
+            elif elem_type == 2:
+                summary = elem.get('picElement', {}).get('summary', '')
+                # 判断是否为表情包（summary格式为 [表情名称]）
+                if summary and summary.startswith('[') and summary.endswith(']'):
+                    pic_emojis += 1
+                else:
+                    pic_images += 1
+            elif elem_type == 10:
+                flags |= FLAG_LINK
+            elif elem_type == 16 and 'multiForwardMsgElement' in elem:
+                flags |= FLAG_FORWARD
+            elif elem_type == 7:
+                reply_elem = elem.get('replyElement', {})
+                self.reply_sender_uids.append(strings.intern(reply_elem.get('senderUid')))
+                self.reply_sources.append(message_ids.intern(reply_elem.get('sourceMsgIdInRecords')))
+                self.reply_replays.append(message_ids.intern(reply_elem.get('replayMsgId')))
+
+        self.flags.append(flags)
+        self.pic_images.append(pic_images)
+        self.pic_emojis.append(pic_emojis)
+        self.mention_ptr.append(len(self.mention_at_types))
+        self.reply_ptr.append(len(self.reply_sources))
+        return len(self.sender_ids) - 1
+
+    def clear_rows(self):
+        """
+        清空所有行，保留驻留池和 bad_timestamps（已发出的驻留编号仍然有效）
+        流式分析不保留消息表时用来丢弃已经统计过的行
+        """
+        for col in vars(self).values():
+            if isinstance(col, array):
+                del col[:]
+        self.mention_ptr.append(0)
+        self.reply_ptr.append(0)
+        self.texts = TextArena()
+
+    def extend(self, other):
+        """把另一张表的行追加到本表末尾（驻留编号按本表重新映射）"""
+        sender_map = [self.senders.intern(v) for v in other.senders.values]
+        string_map = [self.strings.intern(v) for v in other.strings.values]
+        msg_id_map = [self.message_ids.intern(v) for v in other.message_ids.values]
+
+        def remap(dst, src, mapping):
+            dst.extend(mapping[x] if x >= 0 else x for x in src)
+
+        remap(self.sender_ids, other.sender_ids, sender_map)
+        remap(self.names, other.names, string_map)
+        remap(self.member_names, other.member_names, string_map)
+        remap(self.msg_ids, other.msg_ids, msg_id_map)
+        remap(self.mention_uids, other.mention_uids, string_map)
+        remap(self.mention_contents, other.mention_contents, string_map)
+        remap(self.reply_sender_uids, other.reply_sender_uids, string_map)
+        remap(self.reply_sources, other.reply_sources, msg_id_map)
+        remap(self.reply_replays, other.reply_replays, msg_id_map)
+
+        for name in ('timestamps', 'flags', 'pic_images', 'pic_emojis', 'content_emojis',
+                     'mention_flags', 'mention_at_types'):
+            getattr(self, name).extend(getattr(other, name))
+
+        mention_base = self.mention_ptr[-1]
+        self.mention_ptr.extend(p + mention_base for p in other.mention_ptr[1:])
+        reply_base = self.reply_ptr[-1]
+        self.reply_ptr.extend(p + reply_base for p in other.reply_ptr[1:])
+        self.texts.extend(other.texts)
+        self.bad_timestamps += other.bad_timestamps
+
+    def build_message_index(self, rows=None):
+        """为 rows（默认全部行）建立 MessageIndex"""
+        index = MessageIndex()
+        msg_ids = self.msg_ids
+        sender_ids = self.sender_ids
+        timestamps = self.timestamps
+        for row in (range(len(self)) if rows is None else rows):
+            index.add(msg_ids[row], sender_ids[row], timestamps[row])
+        return index
+
+    def text(self, row):
+        return self.texts[row]
+
+    def sender(self, row):
+        """行的发送者 uin（原始值），无发送者返回 None"""
+        sid = self.sender_ids[row]
+        return self.senders.values[sid] if sid >= 0 else None
+
+    def mentions(self, row):
+        """行内 @ 元素的下标区间"""
+        return range(self.mention_ptr[row], self.mention_ptr[row + 1])
+
+    def replies(self, row):
+        """行内回复元素的下标区间"""
+        return range(self.reply_ptr[row], self.reply_ptr[row + 1])
+
+    def nbytes(self):
+        """列与文本区占用的字节数（不含驻留池）"""
+        total = self.texts.nbytes
+        for col in vars(self).values():
+            if isinstance(col, array):
+                total += col.itemsize * len(col)
+        return total
+
+
+def _build_table_chunk(filepath, start, end, date_range=None):
+    """进程池 worker：把文件中的一段消息构建成 MessageTable"""
+    table = MessageTable()
+    for msg in iter_message_chunk(filepath, start, end, date_range):
+        table.append(msg)
+    return table
+
+
+def _load_table_parallel(filepath, workers, date_range=None, progress=None):
+    """并行解析并按文件顺序合并各段，无法切分时返回 None"""
+    try:
+        parsed = parse_in_parallel(filepath, workers, partial(_build_table_chunk, date_range=date_range),
+                                   progress)
+    except Exception as e:
+        logger.warning(f"⚠️ 并行解析失败，改用单进程解析: {e}")
+        return None
+    if parsed is None:
+        return None
+
+    chat_info, parts = parsed
+    table = MessageTable(chat_info.get('name') or '未知群聊')
+    for part in parts:
+        table.extend(part)
+    return table
+
+
+def _range_cache_key(key, date_range):
+    start, end = date_range
+    return f"{key}.{'' if start is None else start}_{'' if end is None else end}"
+
+
+def load_table(filepath, cache=None, workers=None, date_range=None, progress=None):
+    """
+    流式解析 JSON 文件并直接构建 MessageTable，不保留消息字典
+    
+    Args:
+        filepath: 导出的 JSON 文件
+        cache: 可选的 ParseCache，按文件内容命中时跳过解析
+        workers: 并行解析的进程数，大于 1 时按消息边界切段并行解析（仅支持缩进格式的文件）
+        date_range: resolve_date_range 的结果，给出时时间范围外的消息在解析阶段就被跳过，
+                    不进入消息表（分析器仍会按同一范围再过滤一次，结果与不下推时一致）
+        progress: 可选的 ProgressReporter，报告解析进度（命中缓存时不报告）
+    """
+    if cache is not None:
+        key = file_sha256(filepath)
+        # 完整表对任何时间范围都可用，优先命中；否则再找同一范围的裁剪表
+        table = cache.get(key)
+        if table is None and date_range is not None:
+            key = _range_cache_key(key, date_range)
+            table = cache.get(key)
+        if table is not None:
+            logger.info(f"✅ 消息表: {len(table)} 条消息, 群聊: {table.chat_name}")
+            return table
+
+    try:
+        table = None
+        if workers and workers > 1:
+            table = _load_table_parallel(filepath, workers, date_range, progress)
+        if table is None:
+            chat_info = {}
+            table = MessageTable()
+            for msg in iter_messages(filepath, chat_info, date_range, progress):
+                table.append(msg)
+            table.chat_name = chat_info.get('name') or '未知群聊'
+    except Exception as e:
+        logger.warning(f"⚠️ 流式构建消息表失败，回退到标准加载: {e}")
+        table = MessageTable.from_data(load_json(filepath, date_range=date_range, progress=progress))
+
+    if table.bad_timestamps:
+        logger.warning(f"⚠️ {table.bad_timestamps} 条消息的时间戳无法解析")
+    logger.info(f"✅ 消息表: {len(table)} 条消息, 群聊: {table.chat_name}, "
+                f"列存储约 {table.nbytes() / 1024 / 1024:.1f} MB")
+    if cache is not None:
+        cache.put(key, table)
+    return table
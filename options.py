@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+分析参数快照
+每次分析开始前从 config（以及后端的请求参数）解析出一份不可变的 AnalysisOptions，
+分析器只读这份快照：并发请求之间不需要修改全局 config，热点循环里也不再反复 getattr。
+"""
+
+from dataclasses import dataclass, field, fields, replace
+from typing import FrozenSet, Optional, Tuple
+
+# hour_flags 中的位标记
+HOUR_NIGHT_OWL = 1
+HOUR_EARLY_BIRD = 2
+
+
+@dataclass(frozen=True)
+class AnalysisOptions:
+    """一次分析使用的全部参数（字段含义见 config.example.py 中的同名大写配置）"""
+
+    # 词汇过滤
+    use_stopwords: bool = False
+    whitelist: FrozenSet[str] = frozenset()
+
+    # 时间范围（'YYYY-MM-DD'，None 表示不限制）
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+    # 机器人过滤
+    filter_bot_messages: bool = True
+    bot_uins: FrozenSet[str] = frozenset()
+
+    # 词频统计
+    top_n: int = 200
+    min_freq: int = 1
+    min_word_len: int = 1
+    max_word_len: int = 10
+
+    # 新词发现
+    pmi_threshold: float = 2.0
+    entropy_threshold: float = 0.5
+    new_word_min_freq: int = 20
+    new_word_engine: str = 'apriori'
+
+    # 词组合并
+    merge_min_freq: int = 30
+    merge_min_prob: float = 0.3
+    merge_max_len: int = 6
+
+    # 单字过滤
+    single_min_solo_ratio: float = 0.01
+    single_min_solo_count: int = 5
+
+    # 排行榜
+    rank_top_n: int = 10
+    contributor_top_n: int = 10
+    sample_count: int = 10
+    sample_seed: Optional[int] = None
+
+    # 词频统计方式
+    word_stats_mode: str = 'exact'
+    word_stats_capacity: int = 10000
+    word_sketch_width: int = 1 << 17
+    word_sketch_depth: int = 4
+
+    # 时段
+    night_owl_hours: FrozenSet[int] = frozenset(range(0, 6))
+    early_bird_hours: FrozenSet[int] = frozenset(range(6, 9))
+
+    # 性能
+    tokenize_cache_size: int = 200000
+    incremental_resegment: bool = False
+    workers: int = 1
+
+    # 按小时（0-23）预先算好的时段位标记，见 HOUR_NIGHT_OWL / HOUR_EARLY_BIRD
+    hour_flags: Tuple[int, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'hour_flags', tuple(
+            (HOUR_NIGHT_OWL if hour in self.night_owl_hours else 0)
+            | (HOUR_EARLY_BIRD if hour in self.early_bird_hours else 0)
+            for hour in range(24)
+        ))
+
+    @classmethod
+    def from_config(cls, config=None, **overrides):
+        """
+        从 config 模块读取参数（缺失的配置项使用默认值），overrides 中的值优先
+
+        Args:
+            config: 配置模块，None 表示 import config
+            overrides: 按字段名覆盖，如后端请求中的 use_stopwords、start_date
+        """
+        if config is None:
+            import config
+        values = {}
+        for f in fields(cls):
+            if not f.init:
+                continue
+            name = f.name.upper()
+            if name == 'START_DATE' or name == 'END_DATE':
+                name = 'MESSAGE_' + name
+            elif name == 'WORKERS':
+                name = 'ANALYSIS_WORKERS'
+            if hasattr(config, name):
+                values[f.name] = getattr(config, name)
+        values.update(overrides)
+
+        values['whitelist'] = frozenset(values.get('whitelist', ()))
+        values['bot_uins'] = frozenset(str(uin) for uin in values.get('bot_uins', ()))
+        for name in ('night_owl_hours', 'early_bird_hours'):
+            if name in values:
+                values[name] = frozenset(values[name])
+        return cls(**values)
+
+    def with_overrides(self, **overrides):
+        """返回修改了部分字段的新快照（None 值表示不覆盖）"""
+        overrides = {k: v for k, v in overrides.items() if v is not None}
+        return replace(self, **overrides) if overrides else self
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+解析缓存
+以文件内容的 SHA-256 为键，把 load_table 构建好的 MessageTable 以 pickle 存到磁盘，
+同一份导出文件再次分析（换时间范围、停用词、TOP_N 等）时直接读取缓存，跳过 JSON 解析。
+
+缓存目录有总大小上限，超出时按最近使用时间（文件 mtime）淘汰最旧的条目。
+"""
+
+import os
+import time
+import pickle
+import hashlib
+import tempfile
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# MessageTable 的结构变化时递增，旧缓存自动失效
+CACHE_FORMAT_VERSION = 1
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_CACHE_SUFFIX = f'.v{CACHE_FORMAT_VERSION}.pkl'
+
+
+def file_sha256(filepath):
+    """流式计算文件的 SHA-256（按块读取，不把整个文件读入内存）"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """按内容寻址的 MessageTable 磁盘缓存，带 LRU 大小上限"""
+
+    def __init__(self, cache_dir='runtime_outputs/parse_cache', max_mb=1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + _CACHE_SUFFIX)
+
+    def get(self, key):
+        """读取缓存，未命中或缓存损坏时返回 None"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            logger.info(f"🗃️ 解析缓存未命中: {key[:12]}")
+            return None
+
+        start_time = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                table = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ 解析缓存损坏，已删除: {key[:12]} ({e})")
+            self._remove(path)
+            return None
+
+        # 更新 mtime 作为最近使用时间
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        logger.info(f"🗃️ 解析缓存命中: {key[:12]}, 读取耗时 {time.perf_counter() - start_time:.2f}s")
+        return table
+
+    def put(self, key, table):
+        """写入缓存（先写临时文件再原子替换），然后按大小上限淘汰旧条目"""
+        path = self._path(key)
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"⚠️ 写入解析缓存失败: {e}")
+            if tmp_path:
+                self._remove(tmp_path)
+            return
+
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            logger.info(f"🗃️ 缓存条目 {size / 1024 / 1024:.1f} MB 超过上限，不保留")
+            self._remove(path)
+            return
+        logger.info(f"🗃️ 已写入解析缓存: {key[:12]} ({size / 1024 / 1024:.1f} MB)")
+        self._evict(keep=path)
+
+    def _evict(self, keep=None):
+        """总大小超过上限时，按 mtime 从旧到新删除条目"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+            logger.info(f"🗃️ 淘汰解析缓存: {os.path.basename(path)}")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
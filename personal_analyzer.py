@@ -5,16 +5,20 @@
 """
 
 import re
-# 尝试导入 jieba_fast（更快），如果失败则回退到 jieba（标准版本）
-try:
-    import jieba_fast as jieba
-except ImportError:
-    import jieba
+import copy
+from array import array
 from datetime import datetime, timezone, timedelta
 from collections import Counter, defaultdict
 from typing import Dict, List, Optional, Tuple
 from logger import get_logger
-from utils import parse_datetime, clean_text
+from utils import (
+    clean_text, NO_TIME, epoch_to_datetime, epoch_to_date, epoch_to_hour,
+    resolve_date_range, in_date_range,
+)
+from message_table import MessageTable, MENTION_TEXT_ELEMENT
+from tokenizer import CachedTokenizer
+from options import AnalysisOptions
+from progress import ProgressReporter
 import os
 
 logger = get_logger(__name__)
@@ -71,68 +75,103 @@ def load_stopwords_for_personal():
 class PersonalAnalyzer:
     """个人年度报告分析器"""
     
-    def __init__(self, data: Dict, target_name: str, use_stopwords: bool = False):
+    def __init__(self, data: Dict, target_name: str, use_stopwords: bool = False,
+                 options: Optional[AnalysisOptions] = None, target_uin: Optional[str] = None):
         """
         初始化个人分析器
         
         Args:
-            data: 群聊数据（包含messages和chatInfo）
+            data: MessageTable，或群聊数据（包含messages和chatInfo）
             target_name: 要分析的用户名称
-            use_stopwords: 是否使用停用词库
+            use_stopwords: 是否使用停用词库（传入 options 时以 options.use_stopwords 为准）
+            options: AnalysisOptions 参数快照，None 表示使用默认参数
+            target_uin: 可选，按 QQ 号查找用户（优先于 target_name，target_name 可为空）
         """
-        self.data = data
-        self.messages = data.get('messages', [])
-        self.chat_name = data.get('chatName', data.get('chatInfo', {}).get('name', '未知群聊'))
+        self._init_shared(data, use_stopwords, options)
         self.target_name = target_name
-        self.use_stopwords = use_stopwords
-        if use_stopwords:
-            self.stopwords = load_stopwords_for_personal()
-            logger.info(f"✅ 个人报告停用词功能已启用，已加载 {len(self.stopwords)} 个停用词")
-        else:
-            self.stopwords = set()
-            logger.info("📚 个人报告停用词功能已禁用")
-        
-        # 构建用户映射
-        self._build_user_mapping()
         
         # 查找目标用户
-        self.target_uin = self._find_target_user()
+        self.target_uin = self._find_target_user(target_uin)
         if not self.target_uin:
-            raise ValueError(f"未找到用户: {target_name}")
+            raise ValueError(f"未找到用户: {target_name or target_uin}")
+        if not target_name:
+            self.target_name = self.uin_to_name[self.target_uin]
         
-        # 过滤出目标用户的消息
-        self.user_messages = [msg for msg in self.messages 
-                             if msg.get('sender', {}).get('uin') == self.target_uin]
+        # 过滤出目标用户的消息（行号）
+        self.target_sid = self.table.senders.lookup(self.target_uin)
+        sender_ids = self.table.sender_ids
+        self.user_rows = [row for row in self.rows if sender_ids[row] == self.target_sid]
         
-        if not self.user_messages:
+        if not self.user_rows:
             raise ValueError(f"用户 {target_name} 在指定时间范围内没有发言")
         
         logger.info(f"📊 开始分析用户: {target_name} (UIN: {self.target_uin})")
-        logger.info(f"📝 找到 {len(self.user_messages)} 条消息")
+        logger.info(f"📝 找到 {len(self.user_rows)} 条消息")
         
         # 初始化统计变量
         self._init_stats()
     
+    def _init_shared(self, data, use_stopwords, options):
+        """与目标用户无关的部分：消息表、停用词、分词器、用户映射、messageId 索引（批量分析时各成员共用）"""
+        self.table = data if isinstance(data, MessageTable) else MessageTable.from_data(data)
+        self.chat_name = self.table.chat_name
+        if options is None:
+            options = AnalysisOptions(use_stopwords=use_stopwords)
+        self.options = options
+
+        # 时间范围内的行（options.start_date / end_date），之后的统计都只看这些行
+        self.date_range = resolve_date_range(options.start_date, options.end_date)
+        if self.date_range is None:
+            self.rows = range(len(self.table))
+        else:
+            timestamps = self.table.timestamps
+            self.rows = array('I', (row for row in range(len(self.table))
+                                    if in_date_range(timestamps[row], self.date_range)))
+            logger.info(f"📅 时间范围内共 {len(self.rows)}/{len(self.table)} 条消息")
+        use_stopwords = options.use_stopwords
+        self.use_stopwords = use_stopwords
+        if use_stopwords:
+            self.stopwords = load_stopwords_for_personal()
+            logger.info(f"✅ 个人报告停用词功能已启用，已加载 {len(self.stopwords)} 个停用词")
+        else:
+            self.stopwords = set()
+            logger.info("📚 个人报告停用词功能已禁用")
+        
+        self.tokenizer = CachedTokenizer(options.tokenize_cache_size)
+        
+        # 构建用户映射
+        self._build_user_mapping()
+        
+        # messageId -> (发送者, 时间) 索引（用于回复分析，均为驻留编号）
+        self.message_index = self.table.build_message_index(self.rows)
+    
     def _build_user_mapping(self):
         """构建用户UIN到名称的映射"""
         self.uin_to_name = {}
+        table = self.table
+        senders = table.senders.values
+        strings = table.strings.values
         uin_names = defaultdict(list)
         uin_member_names = {}
         
-        for msg in self.messages:
-            sender = msg.get('sender', {})
-            uin = sender.get('uin')
-            name = (sender.get('name') or '').strip()
+        sender_ids = table.sender_ids
+        names = table.names
+        member_names = table.member_names
+        for row in self.rows:
+            sid = sender_ids[row]
+            name = names[row]
+            member_name = member_names[row]
+            if sid < 0:
+                continue
+            uin = senders[sid]
             
-            if uin and name:
+            if name >= 0:
+                name = strings[name]
                 if not uin_names[uin] or uin_names[uin][-1] != name:
                     uin_names[uin].append(name)
             
-            if uin:
-                raw_msg = msg.get('rawMessage', {})
-                send_member_name = raw_msg.get('sendMemberName', '').strip()
-                if send_member_name:
-                    uin_member_names[uin] = send_member_name
+            if member_name >= 0:
+                uin_member_names[uin] = strings[member_name]
         
         for uin, names in uin_names.items():
             chosen_name = None
@@ -151,8 +190,16 @@ class PersonalAnalyzer:
             
             self.uin_to_name[uin] = chosen_name
     
-    def _find_target_user(self) -> Optional[str]:
+    def _find_target_user(self, target_uin: Optional[str] = None) -> Optional[str]:
         """查找目标用户的UIN"""
+        if target_uin:
+            for uin in self.uin_to_name:
+                if str(uin) == str(target_uin):
+                    return uin
+            return None
+        if not self.target_name:
+            return None
+        
         # 精确匹配
         for uin, name in self.uin_to_name.items():
             if name == self.target_name:
@@ -213,66 +260,185 @@ class PersonalAnalyzer:
         self.most_replied_message = None  # 最多人回复的消息
         self.most_emoji_message = None  # 表情反应最多的消息
         self.chain_repeat_message = None  # 引发复读的消息
-        
-        # 构建msgid到发送者的映射（用于回复分析）
-        self.msgid_to_sender = {}
-        for msg in self.messages:
-            msg_id = msg.get('messageId')
-            sender_uin = msg.get('sender', {}).get('uin')
-            if msg_id and sender_uin:
-                self.msgid_to_sender[msg_id] = sender_uin
     
     def analyze(self):
         """执行分析"""
         logger.info("🔍 开始分析个人数据...")
+        self._count_received()
+        self._analyze_own_messages()
+        self.tokenizer.log_stats()
+        logger.info("✅ 个人数据分析完成")
+
+    @classmethod
+    def analyze_all(cls, data: Dict, min_messages: int = 1, use_stopwords: bool = False,
+                    options: Optional[AnalysisOptions] = None,
+                    progress: Optional[ProgressReporter] = None) -> Dict:
+        """
+        批量分析群内全部成员
+        消息表、用户映射、messageId 索引和分词缓存只构建一次，被@/被回复只遍历一遍全部消息，
+        之后每个成员只处理自己的消息，总耗时与单个群报告相当。
+
+        Args:
+            data: MessageTable，或群聊数据（包含messages和chatInfo）
+            min_messages: 发言数少于该值的成员不生成报告
+            use_stopwords: 是否使用停用词库（传入 options 时以 options.use_stopwords 为准）
+            options: AnalysisOptions 参数快照
+            progress: 可选的 ProgressReporter，按已完成的成员数报告进度
+
+        Returns:
+            uin -> 已完成分析的 PersonalAnalyzer，按发言数从多到少排列
+        """
+        shared = cls.__new__(cls)
+        shared._init_shared(data, use_stopwords, options)
+        table = shared.table
+        senders = table.senders.values
+
+        sender_ids = table.sender_ids
+        rows_by_sid = defaultdict(list)
+        for row in shared.rows:
+            sid = sender_ids[row]
+            if sid >= 0:
+                rows_by_sid[sid].append(row)
+
+        members = {}
+        for sid, rows in sorted(rows_by_sid.items(), key=lambda item: len(item[1]), reverse=True):
+            if len(rows) < max(min_messages, 1):
+                continue
+            uin = senders[sid]
+            member = copy.copy(shared)  # 共用消息表、分词器、用户映射和索引
+            member.target_name = shared.uin_to_name.get(uin, f"用户{uin}")
+            member.target_uin = uin
+            member.target_sid = sid
+            member.user_rows = rows
+            member._init_stats()
+            members[sid] = member
+        logger.info(f"👥 批量分析 {len(members)} 位成员（共 {len(rows_by_sid)} 位发言成员）")
+
+        if progress is None:
+            progress = ProgressReporter()
+        progress.start('统计被@和被回复')
+        shared._count_received_all(members)
+        progress.start('分析成员', total=len(members), unit='人')
+        for member in progress.track(members.values(), every=1):
+            member._analyze_own_messages()
+
+        shared.tokenizer.log_stats()
+        logger.info("✅ 批量个人数据分析完成")
+        return {member.target_uin: member for member in members.values()}
+
+    def _count_received_all(self, members):
+        """一次遍历全部消息，为每个成员统计被@和被回复的情况（members: 发送者驻留编号 -> 分析器）"""
+        table = self.table
+        senders = table.senders.values
+        strings = table.strings.values
+        by_uin_str = {str(member.target_uin): member for member in members.values()}
+
+        # messageId -> 发过该 messageId 的成员，与单人模式按 user_msg_ids 判断的规则相同：
+        # 同一 messageId 被多个成员使用时每个人都算被回复（多出的成员记在 shared_owners 中）
+        msg_ids = table.msg_ids
+        owners = array('i', [-1]) * len(table.message_ids)
+        shared_owners = {}
+        for member_sid, member in members.items():
+            for row in member.user_rows:
+                msg_id = msg_ids[row]
+                if msg_id < 0:
+                    continue
+                owner = owners[msg_id]
+                if owner < 0:
+                    owners[msg_id] = member_sid
+                elif owner != member_sid:
+                    shared_owners.setdefault(msg_id, set()).add(member_sid)
+
+        sender_ids = table.sender_ids
+        for row in self.rows:
+            sid = sender_ids[row]
+            if sid < 0:
+                continue
+            sender_str = str(senders[sid])
+
+            for m in table.mentions(row):
+                at_uid = table.mention_uids[m]
+                if not table.mention_flags[m] & MENTION_TEXT_ELEMENT or at_uid < 0:
+                    continue
+                target = by_uin_str.get(strings[at_uid])
+                if target is not None and strings[at_uid] != sender_str:
+                    target.ated_count += 1
+                    target.at_by[sender_str] += 1
+
+            for r in table.replies(row):
+                ref_msg_id = table.reply_sources[r]
+                if ref_msg_id < 0:
+                    ref_msg_id = table.reply_replays[r]
+                if ref_msg_id < 0 or owners[ref_msg_id] < 0:
+                    continue
+                targets = [owners[ref_msg_id]]
+                if ref_msg_id in shared_owners:
+                    targets.extend(shared_owners[ref_msg_id])
+                for target_sid in targets:
+                    target = members[target_sid]
+                    if str(target.target_uin) != sender_str:
+                        target.replied_count += 1
+                        target.replied_by[sender_str] += 1
+
+    def _count_received(self):
+        """遍历其他人的消息，统计目标用户被@和被回复的情况"""
+        table = self.table
+        senders = table.senders.values
+        strings = table.strings.values
+        target_str = str(self.target_uin)
         
         # 先遍历所有消息，统计@和回复关系（避免重复计算）
-        msg_id_to_user_msg = {msg.get('messageId'): msg for msg in self.user_messages}
+        user_msg_ids = {table.msg_ids[row] for row in self.user_rows}
         
-        for msg in self.messages:
-            sender_uin = msg.get('sender', {}).get('uin')
-            if not sender_uin or str(sender_uin) == str(self.target_uin):
+        sender_ids = table.sender_ids
+        for row in self.rows:
+            sid = sender_ids[row]
+            if sid < 0 or str(senders[sid]) == target_str:
                 continue  # 跳过目标用户自己的消息
+            sender_str = str(senders[sid])
             
-            elements = msg.get('rawMessage', {}).get('elements', [])
-            for element in elements:
-                elem_type = element.get('elementType')
-                
-                # 检查是否@了目标用户
-                if elem_type == 1:  # 文本元素
-                    text_elem = element.get('textElement', {})
-                    at_uid = text_elem.get('atUid', '')
-                    if str(at_uid) == str(self.target_uin):
-                        self.ated_count += 1
-                        self.at_by[str(sender_uin)] += 1
-                
-                # 检查是否回复了目标用户
-                elif elem_type == 7:  # 回复元素
-                    reply_elem = element.get('replyElement', {})
-                    ref_msg_id = reply_elem.get('sourceMsgIdInRecords') or reply_elem.get('replayMsgId')
-                    if ref_msg_id and ref_msg_id in msg_id_to_user_msg:
-                        self.replied_count += 1
-                        self.replied_by[str(sender_uin)] += 1
+            # 检查是否@了目标用户
+            for m in table.mentions(row):
+                at_uid = table.mention_uids[m]
+                if (table.mention_flags[m] & MENTION_TEXT_ELEMENT
+                        and at_uid >= 0 and strings[at_uid] == target_str):
+                    self.ated_count += 1
+                    self.at_by[sender_str] += 1
+            
+            # 检查是否回复了目标用户
+            for r in table.replies(row):
+                ref_msg_id = table.reply_sources[r]
+                if ref_msg_id < 0:
+                    ref_msg_id = table.reply_replays[r]
+                if ref_msg_id >= 0 and ref_msg_id in user_msg_ids:
+                    self.replied_count += 1
+                    self.replied_by[sender_str] += 1
+    
+    def _analyze_own_messages(self):
+        """按时间顺序遍历目标用户自己的消息"""
+        table = self.table
+        senders = table.senders.values
+        strings = table.strings.values
         
         # 再遍历用户消息，统计用户自己的数据
         # 先按时间排序用户消息，确保时间计算的准确性
+        # 时间戳在建表时已解码为 epoch 微秒，排序和日期、小时推导都直接用整数
         user_messages_with_time = []
-        for msg in self.user_messages:
-            timestamp = msg.get('timestamp', '')
-            msg_dt = parse_datetime(timestamp)
-            if msg_dt:
-                user_messages_with_time.append((msg_dt, msg))
+        for row in self.user_rows:
+            ts = table.timestamps[row]
+            if ts != NO_TIME:
+                user_messages_with_time.append((ts, row))
         
         # 按时间排序
         user_messages_with_time.sort(key=lambda x: x[0])
         
         # 更新用户消息列表为排序后的
-        self.user_messages = [msg for _, msg in user_messages_with_time]
+        self.user_rows = [row for _, row in user_messages_with_time]
         
         # 从排序后的消息中确定最早和最晚时间
         if user_messages_with_time:
-            self.first_message_time = user_messages_with_time[0][0]
-            self.last_message_time = user_messages_with_time[-1][0]
+            self.first_message_time = epoch_to_datetime(user_messages_with_time[0][0])
+            self.last_message_time = epoch_to_datetime(user_messages_with_time[-1][0])
             logger.info(f"📅 最早发言: {self.first_message_time.strftime('%Y-%m-%d %H:%M:%S')}")
             logger.info(f"📅 最晚发言: {self.last_message_time.strftime('%Y-%m-%d %H:%M:%S')}")
         
@@ -280,87 +446,76 @@ class PersonalAnalyzer:
         prev_sender_uin = None
         repeat_chain = []  # 当前复读链
         
-        for i, (msg_dt, msg) in enumerate(user_messages_with_time):
+        for i, (msg_ts, row) in enumerate(user_messages_with_time):
             # 基本统计
             self.total_messages += 1
             
-            # 重置当前消息的类型标记
-            current_msg_has_emoji = False
-            current_msg_has_image = False
+            # 活跃天数
+            date_str = epoch_to_date(msg_ts)
+            self.active_days.add(date_str)
+            self.daily_message_count[date_str] += 1
             
-            if msg_dt:
-                # 活跃天数
-                date_str = msg_dt.strftime('%Y-%m-%d')
-                self.active_days.add(date_str)
-                self.daily_message_count[date_str] += 1
-                
-                # 小时分布
-                hour = msg_dt.hour
-                self.hour_distribution[hour] += 1
-                
-                # 夜猫子指数（22:00-06:00）
-                if hour >= 22 or hour < 6:
-                    self.night_messages += 1
+            # 小时分布
+            hour = epoch_to_hour(msg_ts)
+            self.hour_distribution[hour] += 1
+            
+            # 夜猫子指数（22:00-06:00）
+            if hour >= 22 or hour < 6:
+                self.night_messages += 1
             
             # 内容分析
-            content = msg.get('content', {})
-            text = content.get('text', '') if isinstance(content, dict) else ''
+            text = table.text(row)
             
             # 提取@信息
             at_contents = []
-            elements = msg.get('rawMessage', {}).get('elements', [])
-            for element in elements:
-                elem_type = element.get('elementType')
+            for m in table.mentions(row):
+                if not table.mention_flags[m] & MENTION_TEXT_ELEMENT:
+                    continue
+                at_uid = table.mention_uids[m]
+                if table.mention_at_types[m] > 0 and at_uid >= 0 and strings[at_uid] != '0':
+                    self.at_count += 1
+                    self.at_targets[strings[at_uid]] += 1
+                    content_id = table.mention_contents[m]
+                    if content_id >= 0:
+                        at_contents.append(strings[content_id])
+            
+            # 图片元素（表情包的 summary 格式为 [表情名称]）
+            pic_emojis = table.pic_emojis[row]
+            pic_images = table.pic_images[row]
+            current_msg_has_emoji = pic_emojis > 0
+            current_msg_has_image = pic_images > 0
+            if pic_emojis:
+                self.message_types['emoji'] += pic_emojis
+                self.emoji_count += pic_emojis
+            if pic_images:
+                self.message_types['image'] += pic_images
+                self.image_count += pic_images
+            
+            # 回复元素
+            for r in table.replies(row):
+                self.reply_count += 1
+                sender_uid = table.reply_sender_uids[r]
+                target_uin = strings[sender_uid] if sender_uid >= 0 else None
                 
-                if elem_type == 1:  # 文本元素
-                    text_elem = element.get('textElement', {})
-                    at_type = text_elem.get('atType', 0)
-                    at_uid = text_elem.get('atUid', '')
-                    at_content = text_elem.get('content', '')
-                    
-                    if at_type > 0 and at_uid and str(at_uid) != '0':
-                        self.at_count += 1
-                        at_target_uin = str(at_uid)
-                        self.at_targets[at_target_uin] += 1
-                        if at_content:
-                            at_contents.append(at_content)
+                ref_msg_id = table.reply_sources[r]
+                if ref_msg_id < 0:
+                    ref_msg_id = table.reply_replays[r]
                 
-                elif elem_type == 2:  # 图片元素
-                    pic_elem = element.get('picElement', {})
-                    summary = pic_elem.get('summary', '')
-                    if summary and summary.startswith('[') and summary.endswith(']'):
-                        current_msg_has_emoji = True
-                        self.message_types['emoji'] += 1
-                        self.emoji_count += 1
-                    else:
-                        current_msg_has_image = True
-                        self.message_types['image'] += 1
-                        self.image_count += 1
+                if not target_uin or target_uin == '0':
+                    if ref_msg_id >= 0:
+                        target_sid = self.message_index.sender(ref_msg_id)
+                        target_uin = senders[target_sid] if target_sid is not None else None
                 
-                elif elem_type == 7:  # 回复元素
-                    self.reply_count += 1
-                    reply_elem = element.get('replyElement', {})
-                    target_uin = reply_elem.get('senderUid')
-                    
-                    if not target_uin or target_uin == '0':
-                        ref_msg_id = reply_elem.get('sourceMsgIdInRecords') or reply_elem.get('replayMsgId')
-                        if ref_msg_id:
-                            target_uin = self.msgid_to_sender.get(ref_msg_id)
+                if target_uin and str(target_uin) != '0' and str(target_uin) != self.target_uin:
+                    target_uin_str = str(target_uin)
+                    self.reply_to[target_uin_str] += 1
                     
-                    if target_uin and str(target_uin) != '0' and str(target_uin) != self.target_uin:
-                        target_uin_str = str(target_uin)
-                        self.reply_to[target_uin_str] += 1
-                        
-                        # 计算回复间隔（需要找到被回复的消息时间）
-                        ref_msg_id = reply_elem.get('sourceMsgIdInRecords') or reply_elem.get('replayMsgId')
-                        if ref_msg_id:
-                            for prev_msg in self.messages:
-                                if prev_msg.get('messageId') == ref_msg_id:
-                                    prev_msg_dt = parse_datetime(prev_msg.get('timestamp', ''))
-                                    if prev_msg_dt and msg_dt:
-                                        interval = (msg_dt - prev_msg_dt).total_seconds()
-                                        self.reply_intervals[target_uin_str].append(interval)
-                                    break
+                    # 计算回复间隔（需要找到被回复的消息时间）
+                    if ref_msg_id >= 0:
+                        prev_ts = self.message_index.timestamp(ref_msg_id)
+                        if prev_ts != NO_TIME:
+                            interval = (msg_ts - prev_ts) / 1000000
+                            self.reply_intervals[target_uin_str].append(interval)
             
             # 文本处理
             cleaned = clean_text(text, at_contents)
@@ -379,7 +534,7 @@ class PersonalAnalyzer:
                     self.long_messages += 1
                 
                 # 词频分析
-                words = list(jieba.cut(cleaned))
+                words = self.tokenizer.cut(cleaned)
                 for word in words:
                     word = word.strip()
                     if not word:
@@ -401,11 +556,11 @@ class PersonalAnalyzer:
             
             # 复读链检测（需要检查前后消息）
             if i > 0 and i < len(user_messages_with_time) - 1:
-                prev_msg = user_messages_with_time[i-1][1]
-                next_msg = user_messages_with_time[i+1][1] if i+1 < len(user_messages_with_time) else None
+                prev_row = user_messages_with_time[i-1][1]
+                next_row = user_messages_with_time[i+1][1] if i+1 < len(user_messages_with_time) else None
                 
-                prev_text = clean_text(prev_msg.get('content', {}).get('text', ''), [])
-                next_text = clean_text(next_msg.get('content', {}).get('text', ''), []) if next_msg else None
+                prev_text = clean_text(table.text(prev_row), [])
+                next_text = clean_text(table.text(next_row), []) if next_row is not None else None
                 
                 if cleaned and prev_text and cleaned == prev_text:
                     # 检查是否形成复读链
@@ -418,8 +573,6 @@ class PersonalAnalyzer:
             # 更新前一条消息文本（用于复读检测）
             prev_message_text = cleaned if cleaned else None
             prev_sender_uin = self.target_uin
-        
-        logger.info("✅ 个人数据分析完成")
     
     def export_json(self) -> Dict:
         """导出分析结果为JSON格式"""
@@ -586,7 +739,7 @@ class PersonalAnalyzer:
         
         word_consecutive_count = Counter()
         for msg_text in self.all_messages:
-            words = list(jieba.cut(msg_text))
+            words = self.tokenizer.cut(msg_text)
             prev_word = None
             for word in words:
                 word = word.strip()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+分析进度报告
+加载和分析的各个阶段把“阶段名称、已处理量/总量”报告给 ProgressReporter，
+由它按阶段内的吞吐量估算剩余时间，并按时间间隔节流后交给回调（例如写入后台任务状态）。
+
+未设置回调时所有方法都是空操作，track 直接返回原迭代器，不给热循环增加开销。
+"""
+
+import time
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# 热循环中每处理这么多项检查一次是否需要报告
+PROGRESS_EVERY = 2000
+
+
+class ProgressReporter:
+    """阶段进度与剩余时间估算；回调接收 snapshot() 的字典"""
+
+    def __init__(self, callback=None, min_interval=1.0):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.stage = None
+        self.processed = 0
+        self.total = None
+        self.unit = '条'
+        self._stage_start = time.monotonic()
+        self._last_emit = 0.0
+
+    @property
+    def enabled(self):
+        return self.callback is not None
+
+    def start(self, stage, total=None, unit='条'):
+        """进入新阶段（总量未知时 total 为 None），立即报告一次"""
+        if self.callback is None:
+            return
+        self.stage = stage
+        self.processed = 0
+        self.total = total
+        self.unit = unit
+        self._stage_start = time.monotonic()
+        self._emit()
+
+    def update(self, processed, total=None):
+        """更新当前阶段的已处理量，距上次报告不足 min_interval 秒时只记录不回调"""
+        if self.callback is None:
+            return
+        self.processed = processed
+        if total is not None:
+            self.total = total
+        if time.monotonic() - self._last_emit >= self.min_interval:
+            self._emit()
+
+    def track(self, iterable, total=None, every=PROGRESS_EVERY):
+        """包装迭代器，每产出 every 项更新一次进度；未启用时原样返回"""
+        if self.callback is None:
+            return iterable
+        if total is not None:
+            self.total = total
+        return self._track(iterable, every)
+
+    def _track(self, iterable, every):
+        count = 0
+        for count, item in enumerate(iterable, 1):
+            if not count % every:
+                self.update(count)
+            yield item
+        self.update(count)
+
+    def track_file(self, iterable, f, every=PROGRESS_EVERY):
+        """包装从文件 f 流式解析出的迭代器，按已读取的字节数更新进度（总量为文件大小）"""
+        if self.callback is None:
+            return iterable
+        return self._track_file(iterable, f, every)
+
+    def _track_file(self, iterable, f, every):
+        count = 0
+        for count, item in enumerate(iterable, 1):
+            if not count % every:
+                self.update(f.tell())
+            yield item
+        self.update(self.total if self.total is not None else f.tell())
+
+    def snapshot(self):
+        """当前进度：percent 和 eta_seconds 在总量未知或尚无吞吐量数据时为 None"""
+        elapsed = time.monotonic() - self._stage_start
+        percent = eta = None
+        if self.total:
+            processed = min(self.processed, self.total)
+            percent = round(processed * 100 / self.total, 1)
+            if processed and elapsed > 0:
+                rate = processed / elapsed
+                eta = round((self.total - processed) / rate, 1)
+        return {
+            'stage': self.stage,
+            'processed': self.processed,
+            'total': self.total,
+            'unit': self.unit,
+            'percent': percent,
+            'elapsed_seconds': round(elapsed, 1),
+            'eta_seconds': eta,
+        }
+
+    def _emit(self):
+        self._last_emit = time.monotonic()
+        try:
+            self.callback(self.snapshot())
+        except Exception as e:
+            # 进度只用于展示，报告失败不能中断分析
+            logger.debug(f"进度报告失败: {e}")
@@ -84,7 +84,7 @@ class ReportGenerator:
         lines.append("=" * 60)
         lines.append(f"  📊 {self.chat_name} - 年度热词报告")
         lines.append(f"  📅 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        lines.append(f"  📝 消息总数: {len(self.analyzer.messages)}")
+        lines.append(f"  📝 消息总数: {self.analyzer.message_count}")
         lines.append("=" * 60)
         lines.append("")
         
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+热词示例消息
+每个词在全部出现位置上做均匀的蓄水池抽样（Algorithm L，Li 1994：先放满 k 个，
+之后按几何分布跳过若干次出现再随机替换一个，随机数调用次数约为 k·(1 + ln(n/k))），
+抽样期间只保存文本下标；抽样结束后被选中的文本去重写入一个 TextArena，
+WordSamples 按词保存 arena 下标，取用时才解码为字符串。
+"""
+
+import math
+from array import array
+
+from message_table import TextArena
+
+# 跳过次数的上限（避免极小概率下的超大值溢出 array('Q')）
+_MAX_GAP = 1 << 62
+
+
+def _open_uniform(rng):
+    """(0, 1) 上的均匀随机数"""
+    u = rng.random()
+    while u == 0.0:
+        u = rng.random()
+    return u
+
+
+def reservoir_weight(rng, k):
+    """Algorithm L 的权重 W 初值 / 每次替换后的乘数"""
+    return math.exp(math.log(_open_uniform(rng)) / k)
+
+
+def reservoir_gap(rng, weight):
+    """下一次替换前要经过的出现次数（含替换的那一次）"""
+    gap = math.floor(math.log(_open_uniform(rng)) / math.log1p(-weight)) + 1
+    return min(gap, _MAX_GAP)
+
+
+class WordSamples:
+    """词 -> 示例消息，取用方式与 dict 相同（get / [] / in），值为字符串列表"""
+
+    def __init__(self, arena=None, refs=None):
+        self.arena = arena if arena is not None else TextArena()
+        self._refs = refs if refs is not None else {}
+
+    @classmethod
+    def from_reservoirs(cls, reservoirs, texts, vocab):
+        """
+        Args:
+            reservoirs: 词编号 -> 被抽中的文本下标 array
+            texts: 文本下标 -> (文本, 发送者) 列表
+            vocab: 词表
+        """
+        arena = TextArena()
+        positions = {}
+        for idx in sorted({idx for reservoir in reservoirs.values() for idx in reservoir}):
+            positions[idx] = arena.append(texts[idx][0])
+        # 示例按消息先后排列
+        refs = {vocab[wid]: array('I', sorted(positions[idx] for idx in reservoir))
+                for wid, reservoir in reservoirs.items() if reservoir}
+        return cls(arena, refs)
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __iter__(self):
+        return iter(self._refs)
+
+    def __contains__(self, word):
+        return word in self._refs
+
+    def __getitem__(self, word):
+        return self.get(word, [])
+
+    def get(self, word, default=None):
+        refs = self._refs.get(word)
+        if refs is None:
+            return default
+        arena = self.arena
+        return [arena[idx] for idx in refs]
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+近似计数结构
+用于近似词频统计模式（WORD_STATS_MODE = 'approximate'）：结构本身的内存只与参数有关，与语料大小无关。
+
+CountMinSketch：depth 行 × width 列的计数矩阵，估计值不会偏小，
+    以 1 - delta 的概率偏大不超过 epsilon * total（epsilon = e / width，delta = e^-depth）。
+SpaceSaving：最多跟踪 capacity 个键的 Top-K 结构，表满时新键替换计数最小的键并继承其计数；
+    每个被跟踪键的计数不会偏小，偏大不超过其 error；未被跟踪的键真实计数不超过 min_count。
+"""
+
+import heapq
+import math
+import random
+from array import array
+
+# 哈希用的梅森素数 2^61 - 1
+_PRIME = (1 << 61) - 1
+
+
+class CountMinSketch:
+    """Count-Min Sketch，键为任意可哈希对象（整数键的哈希在不同进程间一致）"""
+
+    def __init__(self, width=1 << 17, depth=4, seed=0):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        rnd = random.Random(seed)
+        self._hashes = [(rnd.randrange(1, _PRIME), rnd.randrange(_PRIME)) for _ in range(depth)]
+        self._rows = [array('I', bytes(4 * width)) for _ in range(depth)]
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    @property
+    def error_bound(self):
+        """估计值偏大的上界（以 1 - delta 的概率成立）"""
+        return math.ceil(self.epsilon * self.total)
+
+    def _cells(self, key):
+        h = hash(key)
+        width = self.width
+        return [(a * h + b) % _PRIME % width for a, b in self._hashes]
+
+    def add(self, key, count=1):
+        self.total += count
+        for row, cell in zip(self._rows, self._cells(key)):
+            row[cell] += count
+
+    def estimate(self, key):
+        return min(row[cell] for row, cell in zip(self._rows, self._cells(key)))
+
+
+class SpaceSaving:
+    """Space-Saving Top-K（Metwally 等，2005）"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        # (计数, 键) 的最小堆；计数只增不减，堆中过期的项在淘汰时再按最新计数放回
+        self._heap = []
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def add(self, key):
+        self.total += 1
+        counts = self.counts
+        count = counts.get(key)
+        if count is not None:
+            counts[key] = count + 1
+            return
+        if len(counts) < self.capacity:
+            counts[key] = 1
+            self.errors[key] = 0
+            heapq.heappush(self._heap, (1, key))
+            return
+
+        min_count, evicted = self._pop_min()
+        del counts[evicted]
+        del self.errors[evicted]
+        counts[key] = min_count + 1
+        self.errors[key] = min_count
+        heapq.heappush(self._heap, (min_count + 1, key))
+
+    def _pop_min(self):
+        heap = self._heap
+        counts = self.counts
+        while True:
+            count, key = heapq.heappop(heap)
+            current = counts[key]
+            if current == count:
+                return count, key
+            heapq.heappush(heap, (current, key))
+
+    @property
+    def min_count(self):
+        """未被跟踪的键真实计数的上界（表未满时为 0）"""
+        if len(self.counts) < self.capacity:
+            return 0
+        heap = self._heap
+        counts = self.counts
+        while counts[heap[0][1]] != heap[0][0]:
+            count, key = heapq.heappop(heap)
+            heapq.heappush(heap, (counts[key], key))
+        return heap[0][0]
+
+    def items(self):
+        """返回 (键, 计数, 误差) 列表，按计数从大到小"""
+        return sorted(((key, count, self.errors[key]) for key, count in self.counts.items()),
+                      key=lambda item: item[1], reverse=True)
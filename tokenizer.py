@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+带缓存的分词器
+群聊里大量重复的短句（“哈哈哈”、“6”、复读）会在多轮统计中被反复分词，
+这里按清洗后的文本缓存 jieba 的分词结果（有上限的 LRU），并统计命中率。
+
+Vocabulary 把词驻留为整数编号，TokenStreams 保存每条文本的分词结果（词编号序列），
+后续各轮统计都在编号上进行；新词加入词典后只需对包含新词的文本重新分词，其余文本沿用已有结果。
+两者都可以 pickle，供进程池在 worker 与主进程之间传递。
+
+每个 CachedTokenizer 都有自己的 jieba.Tokenizer，与全局默认词典共享只读的基础词频表，
+add_word 加入的新词写入该实例自己的小词频表（先查它再查基础词频表），只对该实例生效。
+"""
+
+import re
+from array import array
+from collections import OrderedDict
+
+# 尝试导入 jieba_fast（更快），如果失败则回退到 jieba（标准版本）
+try:
+    import jieba_fast as jieba
+except ImportError:
+    import jieba
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# 设置 jieba 日志级别（jieba_fast 和 jieba 都支持，但标准 jieba 可能没有此方法）
+try:
+    if hasattr(jieba, 'setLogLevel') and hasattr(jieba, 'logging'):
+        jieba.setLogLevel(jieba.logging.INFO)
+except (AttributeError, Exception):
+    # 某些版本的 jieba 可能没有 setLogLevel，忽略错误
+    pass
+
+DEFAULT_CACHE_SIZE = 200000
+
+# jieba_fast 的 C 扩展用 PyDict_GetItem 直接读取词频表，会绕过 _FreqOverlay 重写的查找方法，
+# 只能在第一次 add_word 时复制一份完整的词频表
+_OVERLAY_SUPPORTED = jieba.__name__ != 'jieba_fast'
+
+
+class _FreqOverlay(dict):
+    """
+    叠加在只读基础词频表上的词频表：自身只保存 add_word 写入的词（和新词的前缀），
+    查找时先查自身再查基础表，不复制基础词典
+    """
+
+    __slots__ = ('base',)
+
+    def __init__(self, base):
+        super().__init__()
+        self.base = base
+
+    def __missing__(self, word):
+        return self.base[word]
+
+    def __contains__(self, word):
+        return dict.__contains__(self, word) or word in self.base
+
+    def get(self, word, default=None):
+        freq = dict.get(self, word, self)
+        if freq is self:
+            return self.base.get(word, default)
+        return freq
+
+
+def _new_overlay():
+    """
+    创建与全局默认词典共享词频表的 jieba.Tokenizer
+    基础词典只加载一次，各分词器在第一次 add_word 时才换上自己的 _FreqOverlay；
+    total 是每个 jieba.Tokenizer 自己的属性，加词只改本实例的值
+    """
+    base = jieba.dt
+    base.check_initialized()
+    overlay = jieba.Tokenizer(base.dictionary)
+    overlay.FREQ = base.FREQ
+    overlay.total = base.total
+    overlay.initialized = True
+    return overlay
+
+
+class CachedTokenizer:
+    """
+    按文本缓存分词结果的 jieba 包装
+    每个实例有独立的词典视图：add_word 只影响本实例，不会修改全局 jieba 词典，
+    同一进程中的多次分析（如后端的并发请求）之间互不干扰
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.added_words = []  # 本实例添加过的 (词, 词频)，供 worker 进程重建同样的词典
+        self._cache = OrderedDict()
+        self._jieba = None
+        self._owns_freq = False
+
+    def _dictionary(self):
+        if self._jieba is None:
+            self._jieba = _new_overlay()
+        return self._jieba
+
+    def cut(self, text):
+        """分词，返回词元组（与 list(jieba.cut(text)) 内容一致）"""
+        cache = self._cache
+        words = cache.get(text)
+        if words is not None:
+            self.hits += 1
+            cache.move_to_end(text)
+            return words
+
+        self.misses += 1
+        words = tuple(self._dictionary().cut(text))
+        if self.max_size > 0:
+            cache[text] = words
+            if len(cache) > self.max_size:
+                cache.popitem(last=False)
+        return words
+
+    def warm_up(self):
+        """提前加载 jieba 词典（首次分词时也会自动加载）"""
+        self._dictionary()
+
+    def add_word(self, word, freq=None):
+        """向本实例的词典添加新词，并清空分词缓存"""
+        tokenizer = self._dictionary()
+        if not self._owns_freq:
+            if _OVERLAY_SUPPORTED:
+                tokenizer.FREQ = _FreqOverlay(tokenizer.FREQ)
+            else:
+                tokenizer.FREQ = dict(tokenizer.FREQ)
+            self._owns_freq = True
+        tokenizer.add_word(word, freq=freq)
+        self.added_words.append((word, freq))
+        self._cache.clear()
+
+    def clear(self):
+        self._cache.clear()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        if total:
+            logger.info(f"🧩 分词缓存: {total} 次分词, 命中率 {self.hit_rate:.1%}, "
+                        f"缓存 {len(self._cache)} 条")
+
+
+class Vocabulary:
+    """词表：词 <-> 整数编号（按首次驻留的顺序编号）"""
+
+    def __init__(self):
+        self.words = []  # 编号 -> 词
+        self._ids = {}
+
+    def __len__(self):
+        return len(self.words)
+
+    def __getitem__(self, wid):
+        return self.words[wid]
+
+    def get(self, word, default=None):
+        return self._ids.get(word, default)
+
+    def intern(self, word):
+        wid = self._ids.get(word)
+        if wid is None:
+            wid = self._ids[word] = len(self.words)
+            self.words.append(word)
+        return wid
+
+    def encode(self, words):
+        """把分词结果转换为词编号列表（词先 strip，空词跳过）"""
+        word_ids = self._ids
+        vocab = self.words
+        ids = []
+        for word in words:
+            word = word.strip()
+            if not word:
+                continue
+            wid = word_ids.get(word)
+            if wid is None:
+                wid = word_ids[word] = len(vocab)
+                vocab.append(word)
+            ids.append(wid)
+        return ids
+
+    def mapping_from(self, other):
+        """other 词表编号 -> 本词表编号的映射（other 中的词按顺序驻留进本词表）"""
+        return array('I', map(self.intern, other.words))
+
+    def counts(self):
+        """按编号索引的计数数组（全 0）"""
+        return array('I', bytes(4 * len(self.words)))
+
+
+class TokenStreams:
+    """
+    按文本顺序保存分词结果：词驻留为编号，所有文本的编号首尾相接存在一个 array 中，
+    offsets 给出每条文本的区间。去掉首尾空白后为空的词不保存，保存的词都已 strip。
+    """
+
+    def __init__(self, vocab=None):
+        self.vocab = vocab if vocab is not None else Vocabulary()
+        self.tokens = array('I')
+        self.offsets = array('Q', [0])
+
+    @property
+    def words(self):
+        """编号 -> 词"""
+        return self.vocab.words
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        return self.tokens[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def __iter__(self):
+        tokens = self.tokens
+        offsets = self.offsets
+        for idx in range(len(offsets) - 1):
+            yield tokens[offsets[idx]:offsets[idx + 1]]
+
+    def encode(self, words):
+        """把分词结果转换为词编号列表"""
+        return self.vocab.encode(words)
+
+    def append(self, words):
+        self.tokens.extend(self.vocab.encode(words))
+        self.offsets.append(len(self.tokens))
+
+    def append_ids(self, ids):
+        """追加已经是本词表编号的分词结果"""
+        self.tokens.extend(ids)
+        self.offsets.append(len(self.tokens))
+
+    def replace(self, updates):
+        """用新的分词结果替换部分文本（updates: 文本下标 -> 分词结果），其余文本原样保留"""
+        if not updates:
+            return
+        tokens = array('I')
+        offsets = array('Q', [0])
+        old_tokens = self.tokens
+        old_offsets = self.offsets
+
+        def copy_range(begin, end):
+            # 整段复制 [begin, end) 的文本，偏移量按新位置平移
+            shift = len(tokens) - old_offsets[begin]
+            tokens.extend(old_tokens[old_offsets[begin]:old_offsets[end]])
+            offsets.extend(offset + shift for offset in old_offsets[begin + 1:end + 1])
+
+        copied = 0
+        for idx in sorted(updates):
+            copy_range(copied, idx)
+            tokens.extend(self.encode(updates[idx]))
+            offsets.append(len(tokens))
+            copied = idx + 1
+        copy_range(copied, len(old_offsets) - 1)
+        self.tokens = tokens
+        self.offsets = offsets
+
+
+def compile_word_pattern(words):
+    """把一组词编译成多模式匹配的正则，用于找出包含其中任一词的文本"""
+    return re.compile('|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True)))
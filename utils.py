@@ -1,268 +1,648 @@
 # -*- coding: utf-8 -*-
+import io
+import os
 import re
 import json
 import math
+import mmap
+import time
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone, timedelta
 from collections import Counter
 from logger import get_logger
 
 logger = get_logger(__name__)
 
-def load_json(filepath):
+_UNRESOLVED = object()
+_REJECTED = object()  # 时间范围外的消息，放进待产出队列通知主循环跳过
+
+# 消息级别的简单字段：前缀 -> (所在子字典路径, 字段名, 接受的事件类型, 值转换)
+_MESSAGE_FIELDS = {
+    'messages.item.messageId': ((), 'messageId', ('string',), None),
+    'messages.item.sender.uin': (('sender',), 'uin', ('string',), None),
+    'messages.item.sender.name': (('sender',), 'name', ('string',), None),
+    'messages.item.content.text': (('content',), 'text', ('string',), None),
+    'messages.item.content.reply.referencedMessageId': (('content', 'reply'), 'referencedMessageId', ('string',), None),
+    'messages.item.rawMessage.subMsgType': (('rawMessage',), 'subMsgType', ('number',), None),
+    'messages.item.rawMessage.sendMemberName': (('rawMessage',), 'sendMemberName', ('string',), None),
+}
+
+# 元素级别的子对象：前缀 -> (子对象名, {后缀: (字段名, 接受的事件类型, 值转换)})
+_ELEMENT_FAMILIES = (
+    ('messages.item.rawMessage.elements.item.textElement', 'textElement', (
+        ('.atType', 'atType', ('number',), None),
+        ('.atUid', 'atUid', ('string',), None),
+        ('.content', 'content', ('string',), None),
+    )),
+    ('messages.item.rawMessage.elements.item.picElement', 'picElement', (
+        ('.summary', 'summary', ('string',), None),
+    )),
+    ('messages.item.rawMessage.elements.item.replyElement', 'replyElement', (
+        ('.sourceMsgIdInRecords', 'sourceMsgIdInRecords', ('string',), None),
+        ('.replayMsgId', 'replayMsgId', ('string',), None),
+        ('.senderUid', 'senderUid', ('string', 'number'), str),
+    )),
+)
+
+
+class ChatFileError(Exception):
+    """聊天记录文件无法读取或不是有效的 JSON（流式解析时由 iter_messages 抛出）"""
+
+
+def _get_ijson_backend():
+    """优先使用 ijson 的 C 后端（yajl2_c），不可用时回退到 ijson 默认后端"""
+    import ijson
+    try:
+        return ijson.get_backend('yajl2_c')
+    except ImportError:
+        return ijson
+
+
+class _MessageTrimmer:
+    """
+    基于事件前缀分发的消息裁剪器
+    每个前缀只在第一次出现时解析出对应的处理函数，之后直接查表，
+    不需要的字段（html、resources 详情等）只花一次字典查找就被跳过
+    """
+
+    def __init__(self, date_range=None):
+        self.chat_info = {}
+        self.date_range = date_range
+        self.rejected_count = 0
+        self._in_range = False
+        self.event_count = 0
+        self.current_message = None
+        self.current_element = None
+        self.in_messages = False
+        self.in_elements = False
+        self.message_count = 0
+        self._completed = []
+        self._handlers = {}
+        self._exact = {
+            'chatInfo.name': self._on_chat_name,
+            'messages': self._on_messages_array,
+            'messages.item': self._on_message_boundary,
+            'messages.item.timestamp': self._on_timestamp,
+            'messages.item.content.emojis': self._on_emojis_array,
+            'messages.item.content.emojis.item': self._on_emoji_item,
+            'messages.item.content.multiForward': self._on_multi_forward,
+            'messages.item.rawMessage.elements': self._on_elements_array,
+            'messages.item.rawMessage.elements.item': self._on_element_boundary,
+            'messages.item.rawMessage.elements.item.elementType': self._on_element_type,
+            'messages.item.rawMessage.elements.item.arkElement': self._element_marker('arkElement'),
+            'messages.item.rawMessage.elements.item.multiForwardMsgElement': self._element_marker('multiForwardMsgElement'),
+        }
+
+    def iter_messages(self, events):
+        """处理 ijson.parse 产生的事件流，每裁剪完一条消息就产出"""
+        events = iter(events)
+        pending = self._completed
+        handlers = self._handlers
+        resolve = self._resolve
+        count = 0
+        skipped = 0
+        try:
+            for count, (prefix, event, value) in enumerate(events, 1):
+                handler = handlers.get(prefix, _UNRESOLVED)
+                if handler is _UNRESOLVED:
+                    handler = handlers[prefix] = resolve(prefix)
+                if handler is not None:
+                    handler(event, value)
+                    if pending:
+                        message = pending.pop()
+                        if message is _REJECTED:
+                            skipped += self._skip_message(events)
+                        else:
+                            yield message
+        finally:
+            self.event_count = count + skipped
+
+    def _skip_message(self, events):
+        """丢弃当前消息余下的事件（直到消息对象结束），返回跳过的事件数"""
+        skipped = 0
+        for prefix, event, _ in events:
+            skipped += 1
+            if event == 'end_map' and prefix == 'messages.item':
+                break
+        self.current_message = None
+        self.current_element = None
+        self.in_elements = False
+        self.rejected_count += 1
+        return skipped
+
+    def _resolve(self, prefix):
+        """为前缀选出处理函数，无关前缀返回 None"""
+        handler = self._exact.get(prefix)
+        if handler is not None:
+            return handler
+        if prefix in _MESSAGE_FIELDS:
+            return self._field_setter(*_MESSAGE_FIELDS[prefix])
+        if prefix.startswith('messages.item.content.resources'):
+            return self._list_family('resources', prefix == 'messages.item.content.resources.item',
+                                     '.type', 'type', prefix.endswith('.type'))
+        if prefix.startswith('messages.item.content.mentions'):
+            return self._list_family('mentions', prefix == 'messages.item.content.mentions.item',
+                                     '.uid', 'uid', prefix.endswith('.uid'))
+        for family_prefix, name, fields in _ELEMENT_FAMILIES:
+            if prefix.startswith(family_prefix):
+                for suffix, key, events, convert in fields:
+                    if prefix.endswith(suffix):
+                        return self._element_family(name, key, events, convert)
+                return self._element_family(name, None, (), None)
+        return None
+
+    # ---------- 顶层 ----------
+
+    def _on_chat_name(self, event, value):
+        if event == 'string':
+            self.chat_info['name'] = value
+
+    def _on_messages_array(self, event, value):
+        if event == 'start_array':
+            self.in_messages = True
+        elif event == 'end_array':
+            self.in_messages = False
+
+    def _on_message_boundary(self, event, value):
+        if not self.in_messages:
+            return
+        if event == 'start_map':
+            self.current_message = {}
+            self.message_count += 1
+            if self.message_count % 10000 == 0:
+                logger.debug(f"   已处理 {self.message_count} 条消息...")
+            self._in_range = False
+        elif event == 'end_map':
+            if self.date_range is not None and not self._in_range:
+                # 没有有效时间戳的消息在启用时间过滤时一律丢弃
+                self.current_message = None
+                self.rejected_count += 1
+            elif self.current_message:
+                self._completed.append(self.current_message)
+                self.current_message = None
+
+    def _on_timestamp(self, event, value):
+        msg = self.current_message
+        if msg is None or event not in ('string', 'number'):
+            return
+        value = str(value)
+        msg['timestamp'] = value
+        if self.date_range is not None:
+            self._in_range = in_date_range(parse_epoch(value), self.date_range)
+            if not self._in_range:
+                self._completed.append(_REJECTED)
+
+    # ---------- 消息字段 ----------
+
+    def _field_setter(self, path, key, events, convert):
+        def handler(event, value):
+            target = self.current_message
+            if target is None or event not in events:
+                return
+            for section in path:
+                if section not in target:
+                    target[section] = {}
+                target = target[section]
+            target[key] = convert(value) if convert else value
+        return handler
+
+    def _list_family(self, name, is_item, suffix, key, has_key):
+        """resources / mentions：保留列表，每项只记录一个字段"""
+        def handler(event, value):
+            msg = self.current_message
+            if msg is None:
+                return
+            if 'content' not in msg:
+                msg['content'] = {}
+            if name not in msg['content']:
+                msg['content'][name] = []
+            items = msg['content'][name]
+            if is_item and event == 'start_map':
+                items.append({})
+            elif has_key and event == 'string':
+                if items:
+                    items[-1][key] = value
+        return handler
+
+    def _on_emojis_array(self, event, value):
+        msg = self.current_message
+        if msg is not None and event == 'start_array':
+            if 'content' not in msg:
+                msg['content'] = {}
+            msg['content']['emojis'] = []
+
+    def _on_emoji_item(self, event, value):
+        msg = self.current_message
+        if msg is not None and event in ('string', 'start_map'):
+            if 'content' in msg and 'emojis' in msg['content']:
+                msg['content']['emojis'].append({} if event == 'start_map' else value)
+
+    def _on_multi_forward(self, event, value):
+        msg = self.current_message
+        if msg is not None and event == 'start_map':
+            if 'content' not in msg:
+                msg['content'] = {}
+            msg['content']['multiForward'] = {}
+
+    # ---------- rawMessage.elements ----------
+
+    def _on_elements_array(self, event, value):
+        msg = self.current_message
+        if msg is None:
+            return
+        if event == 'start_array':
+            if 'rawMessage' not in msg:
+                msg['rawMessage'] = {}
+            msg['rawMessage']['elements'] = []
+            self.in_elements = True
+        elif event == 'end_array':
+            self.in_elements = False
+
+    def _on_element_boundary(self, event, value):
+        if self.current_message is None or not self.in_elements:
+            return
+        if event == 'start_map':
+            self.current_element = {}
+        elif event == 'end_map':
+            if self.current_element:
+                self.current_message['rawMessage']['elements'].append(self.current_element)
+                self.current_element = None
+
+    def _on_element_type(self, event, value):
+        if self.current_message is None or not self.in_elements:
+            return
+        if event == 'number' and self.current_element is not None:
+            self.current_element['elementType'] = value
+
+    def _element_marker(self, name):
+        """arkElement / multiForwardMsgElement：只记录是否存在"""
+        def handler(event, value):
+            if self.current_message is None or not self.in_elements:
+                return
+            if event == 'start_map' and self.current_element is not None:
+                self.current_element[name] = {}
+        return handler
+
+    def _element_family(self, name, key, events, convert):
+        def handler(event, value):
+            element = self.current_element
+            if self.current_message is None or not self.in_elements or element is None:
+                return
+            if name not in element:
+                element[name] = {}
+            if key is not None and event in events:
+                element[name][key] = convert(value) if convert else value
+        return handler
+
+
+def _trimmed_messages(backend, f, trimmer, progress=None):
+    """从已打开的文件 f 流式产出裁剪后的消息；给出 progress 时按已读取的字节数报告解析进度"""
+    messages = trimmer.iter_messages(backend.parse(f))
+    if progress is None:
+        return messages
+    progress.start('解析聊天记录', total=os.fstat(f.fileno()).st_size, unit='字节')
+    return progress.track_file(messages, f)
+
+
+def _log_parse_rate(event_count, elapsed):
+    rate = event_count / elapsed if elapsed > 0 else 0
+    logger.info(f"⚡ 解析 {event_count} 个事件, 耗时 {elapsed:.2f}s ({rate:,.0f} 事件/秒)")
+
+
+def _log_rejected(count):
+    if count:
+        logger.info(f"⏰ 加载时跳过 {count} 条时间范围外的消息")
+
+
+def iter_messages(filepath, chat_info=None, date_range=None, progress=None):
+    """
+    逐条产出裁剪后的消息，整个过程中不保留消息列表
+    
+    Args:
+        filepath: JSON 文件路径
+        chat_info: 可选字典，解析到的 chatInfo 字段（群名）会写入其中
+        date_range: resolve_date_range 的结果，给出时在读到 timestamp 后直接跳过范围外的消息
+        progress: 可选的 ProgressReporter，按已读取的字节数报告解析进度
+    Raises:
+        ChatFileError: 文件无法读取或 JSON 格式错误（消费方处理消息时的异常不会被转换）
+    """
+    backend = _get_ijson_backend()
+    from ijson import JSONError
+    trimmer = _MessageTrimmer(date_range)
+    if chat_info is not None:
+        trimmer.chat_info = chat_info
+    
+    start_time = time.perf_counter()
+    try:
+        with open(filepath, 'rb') as f:
+            yield from _trimmed_messages(backend, f, trimmer, progress)
+    except (OSError, ValueError, JSONError) as e:
+        raise ChatFileError(f"{filepath}: {e}") from e
+    _log_parse_rate(trimmer.event_count, time.perf_counter() - start_time)
+    _log_rejected(trimmer.rejected_count)
+
+
+# 每个进程分到的段数，段数多于进程数可以平衡各段消息长短不一带来的负载差异
+_CHUNKS_PER_WORKER = 4
+_TOP_LEVEL_INDENT = re.compile(rb'\{\r?\n([ \t]+)"')
+
+
+def find_message_chunks(filepath, parts):
+    """
+    按字节定位缩进格式（pretty-printed）导出文件中 messages 数组的消息边界，
+    把数组切成约 parts 段，返回 ([(起始偏移, 结束偏移), ...], chatInfo)；
+    文件不是缩进格式（如压缩成一行的 JSON）时返回 None
+    
+    JSON 字符串里不会出现未转义的换行，所以“换行 + 数组元素缩进 + {”只可能是结构空白，
+    按这个模式匹配就能精确找到每条消息的起点，不需要逐字节跟踪字符串和嵌套层级。
+    """
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 3 if mm[:3] == b'\xef\xbb\xbf' else 0
+        m = _TOP_LEVEL_INDENT.match(mm, start)
+        if not m:
+            return None
+        indent = re.escape(m.group(1))
+
+        head = re.compile(rb'\n' + indent + rb'"messages":\s*\[').search(mm)
+        if not head:
+            return None
+        array_end = re.compile(rb'\n' + indent + rb'\]').search(mm, head.end())
+        if not array_end:
+            return None
+        item_start = re.compile(rb'\n' + indent + indent + rb'\{')
+
+        chat_info = {}
+        info = re.compile(rb'\n' + indent + rb'"chatInfo":\s*(\{)').search(mm)
+        if info and mm[info.end():info.end() + 1] != b'}':
+            info_end = re.compile(rb'\n' + indent + rb'\}').search(mm, info.end())
+            if info_end:
+                parsed = json.loads(mm[info.start(1):info_end.end()].decode('utf-8'))
+                if isinstance(parsed, dict) and isinstance(parsed.get('name'), str):
+                    chat_info['name'] = parsed['name']
+
+        first = item_start.search(mm, head.end(), array_end.start())
+        if not first:
+            return [], chat_info
+
+        begin = first.start() + 1
+        end = array_end.start()
+        step = max((end - begin) // max(parts, 1), 1)
+        bounds = [begin]
+        while True:
+            nxt = item_start.search(mm, bounds[-1] + step, end)
+            if not nxt:
+                break
+            bounds.append(nxt.start() + 1)
+        bounds.append(end)
+        return list(zip(bounds, bounds[1:])), chat_info
+
+
+def iter_message_chunk(filepath, start, end, date_range=None):
+    """裁剪 find_message_chunks 给出的一段消息（供进程池中的 worker 调用）"""
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    data = data.rstrip().rstrip(b',')
+    backend = _get_ijson_backend()
+    trimmer = _MessageTrimmer(date_range)
+    yield from trimmer.iter_messages(backend.parse(io.BytesIO(b'{"messages":[' + data + b']}')))
+
+
+def _load_message_chunk(filepath, start, end, date_range=None):
+    return list(iter_message_chunk(filepath, start, end, date_range))
+
+
+def parse_in_parallel(filepath, workers, chunk_func, progress=None):
+    """
+    按消息边界把文件切段，用进程池并行解析
+    
+    Args:
+        chunk_func: 顶层函数 (filepath, start, end) -> 该段的解析结果，
+                    需要额外参数时用 functools.partial 包装
+        progress: 可选的 ProgressReporter，按已完成的段数报告解析进度
+    Returns:
+        (chatInfo, 按文件顺序排列的各段结果)；文件无法切分时返回 None
+    """
+    layout = find_message_chunks(filepath, workers * _CHUNKS_PER_WORKER)
+    if layout is None:
+        logger.info("ℹ️ 文件不是缩进格式，无法按消息切分，使用单进程解析")
+        return None
+    chunks, chat_info = layout
+
+    start_time = time.perf_counter()
+    if progress is not None:
+        progress.start('并行解析聊天记录', total=len(chunks), unit='段')
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(chunk_func,
+                           [filepath] * len(chunks),
+                           [s for s, _ in chunks],
+                           [e for _, e in chunks])
+        if progress is not None:
+            results = progress.track(results, every=1)
+        results = list(results)
+    logger.info(f"⚡ {workers} 个进程并行解析 {len(chunks)} 段, 耗时 {time.perf_counter() - start_time:.2f}s")
+    return chat_info, results
+
+
+def load_json(filepath, workers=None, date_range=None, progress=None):
     """
     使用流式解析加载 JSON 文件，减少内存占用
     对于大文件，只保留必要的字段
+    
+    Args:
+        filepath: JSON 文件路径
+        workers: 并行解析的进程数，大于 1 时按消息边界切段并行解析（仅支持缩进格式的文件）
+        date_range: resolve_date_range 的结果，给出时范围外的消息在解析阶段即被丢弃
+        progress: 可选的 ProgressReporter，报告解析进度
     """
     try:
-        import ijson
-        logger.info("📖 使用流式解析加载 JSON 文件...")
-        
-        with open(filepath, 'rb') as f:
-            parser = ijson.parse(f)
-            result = {
-                'messages': [],
-                'chatInfo': {}
-            }
-            
-            current_message = None
-            current_element = None
-            in_messages = False
-            in_elements = False
-            message_count = 0
-            
-            for prefix, event, value in parser:
-                if prefix == 'chatInfo.name' and event == 'string':
-                    result['chatInfo']['name'] = value
-                
-                elif prefix == 'messages' and event == 'start_array':
-                    in_messages = True
-                elif prefix == 'messages' and event == 'end_array':
-                    in_messages = False
-                
-                elif in_messages:
-                    if prefix == 'messages.item' and event == 'start_map':
-                        current_message = {}
-                        message_count += 1
-                        if message_count % 10000 == 0:
-                            logger.debug(f"   已处理 {message_count} 条消息...")
-                    
-                    elif prefix == 'messages.item' and event == 'end_map':
-                        if current_message:
-                            result['messages'].append(current_message)
-                            current_message = None
-                    
-                    # 保留必要字段
-                    elif current_message is not None:
-                        # 消息 ID
-                        if prefix == 'messages.item.messageId' and event == 'string':
-                            current_message['messageId'] = value
-                        
-                        # 时间戳
-                        elif prefix == 'messages.item.timestamp' and event in ('string', 'number'):
-                            current_message['timestamp'] = str(value)
-                        
-                        # 发送者信息
-                        elif prefix == 'messages.item.sender.uin' and event == 'string':
-                            if 'sender' not in current_message:
-                                current_message['sender'] = {}
-                            current_message['sender']['uin'] = value
-                        elif prefix == 'messages.item.sender.name' and event == 'string':
-                            if 'sender' not in current_message:
-                                current_message['sender'] = {}
-                            current_message['sender']['name'] = value
-                        
-                        # 内容
-                        elif prefix == 'messages.item.content.text' and event == 'string':
-                            if 'content' not in current_message:
-                                current_message['content'] = {}
-                            current_message['content']['text'] = value
-                        
-                        # resources（图片等资源）
-                        elif prefix.startswith('messages.item.content.resources'):
-                            if 'content' not in current_message:
-                                current_message['content'] = {}
-                            if 'resources' not in current_message['content']:
-                                current_message['content']['resources'] = []
-                            
-                            if prefix == 'messages.item.content.resources.item' and event == 'start_map':
-                                current_message['content']['resources'].append({})
-                            elif prefix.endswith('.type') and event == 'string':
-                                if current_message['content']['resources']:
-                                    current_message['content']['resources'][-1]['type'] = value
-                        
-                        # emojis
-                        elif prefix == 'messages.item.content.emojis' and event == 'start_array':
-                            if 'content' not in current_message:
-                                current_message['content'] = {}
-                            current_message['content']['emojis'] = []
-                        elif prefix == 'messages.item.content.emojis.item' and event in ('string', 'start_map'):
-                            if 'content' in current_message and 'emojis' in current_message['content']:
-                                current_message['content']['emojis'].append({} if event == 'start_map' else value)
-                        
-                        # mentions
-                        elif prefix.startswith('messages.item.content.mentions'):
-                            if 'content' not in current_message:
-                                current_message['content'] = {}
-                            if 'mentions' not in current_message['content']:
-                                current_message['content']['mentions'] = []
-                            
-                            if prefix == 'messages.item.content.mentions.item' and event == 'start_map':
-                                current_message['content']['mentions'].append({})
-                            elif prefix.endswith('.uid') and event == 'string':
-                                if current_message['content']['mentions']:
-                                    current_message['content']['mentions'][-1]['uid'] = value
-                        
-                        # multiForward
-                        elif prefix == 'messages.item.content.multiForward' and event == 'start_map':
-                            if 'content' not in current_message:
-                                current_message['content'] = {}
-                            current_message['content']['multiForward'] = {}
-                        
-                        # 回复信息
-                        elif prefix == 'messages.item.content.reply.referencedMessageId' and event == 'string':
-                            if 'content' not in current_message:
-                                current_message['content'] = {}
-                            if 'reply' not in current_message['content']:
-                                current_message['content']['reply'] = {}
-                            current_message['content']['reply']['referencedMessageId'] = value
-                        
-                        # rawMessage 中的关键字段
-                        elif prefix == 'messages.item.rawMessage.subMsgType' and event == 'number':
-                            if 'rawMessage' not in current_message:
-                                current_message['rawMessage'] = {}
-                            current_message['rawMessage']['subMsgType'] = value
-                        elif prefix == 'messages.item.rawMessage.sendMemberName' and event == 'string':
-                            if 'rawMessage' not in current_message:
-                                current_message['rawMessage'] = {}
-                            current_message['rawMessage']['sendMemberName'] = value
-                        
-                        # 完整保留 elements
-                        elif prefix == 'messages.item.rawMessage.elements' and event == 'start_array':
-                            if 'rawMessage' not in current_message:
-                                current_message['rawMessage'] = {}
-                            current_message['rawMessage']['elements'] = []
-                            in_elements = True
-                        
-                        elif prefix == 'messages.item.rawMessage.elements' and event == 'end_array':
-                            in_elements = False
-                        
-                        elif in_elements:
-                            if prefix == 'messages.item.rawMessage.elements.item' and event == 'start_map':
-                                current_element = {}
-                            
-                            elif prefix == 'messages.item.rawMessage.elements.item' and event == 'end_map':
-                                if current_element:
-                                    current_message['rawMessage']['elements'].append(current_element)
-                                    current_element = None
-                            
-                            # 元素类型
-                            elif prefix == 'messages.item.rawMessage.elements.item.elementType' and event == 'number':
-                                if current_element is not None:
-                                    current_element['elementType'] = value
-                            
-                            # textElement（文本/艾特）
-                            elif prefix.startswith('messages.item.rawMessage.elements.item.textElement'):
-                                if current_element is not None:
-                                    if 'textElement' not in current_element:
-                                        current_element['textElement'] = {}
-                                    
-                                    if prefix.endswith('.atType') and event == 'number':
-                                        current_element['textElement']['atType'] = value
-                                    elif prefix.endswith('.atUid') and event == 'string':
-                                        current_element['textElement']['atUid'] = value
-                                    elif prefix.endswith('.content') and event == 'string':
-                                        current_element['textElement']['content'] = value
-                            
-                            # picElement（图片）
-                            elif prefix.startswith('messages.item.rawMessage.elements.item.picElement'):
-                                if current_element is not None:
-                                    if 'picElement' not in current_element:
-                                        current_element['picElement'] = {}
-                                    
-                                    if prefix.endswith('.summary') and event == 'string':
-                                        current_element['picElement']['summary'] = value
-                            
-                            # replyElement（回复）
-                            elif prefix.startswith('messages.item.rawMessage.elements.item.replyElement'):
-                                if current_element is not None:
-                                    if 'replyElement' not in current_element:
-                                        current_element['replyElement'] = {}
-                                    
-                                    if prefix.endswith('.sourceMsgIdInRecords') and event == 'string':
-                                        current_element['replyElement']['sourceMsgIdInRecords'] = value
-                                    elif prefix.endswith('.replayMsgId') and event == 'string':
-                                        current_element['replyElement']['replayMsgId'] = value
-                                    elif prefix.endswith('.senderUid') and event in ('string', 'number'):
-                                        current_element['replyElement']['senderUid'] = str(value)                            
-
-                            # arkElement（链接/小程序）
-                            elif prefix == 'messages.item.rawMessage.elements.item.arkElement' and event == 'start_map':
-                                if current_element is not None:
-                                    current_element['arkElement'] = {}
-                            
-                            # multiForwardMsgElement（合并转发）
-                            elif prefix == 'messages.item.rawMessage.elements.item.multiForwardMsgElement' and event == 'start_map':
-                                if current_element is not None:
-                                    current_element['multiForwardMsgElement'] = {}
-        
-        # 确保群名有值
-        chat_name = result['chatInfo'].get('name', '未知群聊')
-        if not chat_name:
-            chat_name = '未知群聊'
-            result['chatInfo']['name'] = chat_name
-            
-        logger.info(f"✅ 成功加载 {len(result['messages'])} 条消息, 群聊: {chat_name}")
-        return result
-        
+        backend = _get_ijson_backend()
+        from ijson import JSONError
     except ImportError:
         logger.warning("⚠️ ijson 未安装，使用标准加载（大文件可能导致内存不足）")
-        with open(filepath, 'r', encoding='utf-8-sig') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.warning(f"⚠️ 流式解析失败，尝试标准加载: {e}")
+        return _load_json_standard(filepath, date_range)
+
+    backend_name = getattr(backend, 'backend_name', getattr(backend, 'backend', 'unknown'))
+    logger.info(f"📖 使用流式解析加载 JSON 文件... (ijson 后端: {backend_name})")
+    
+    result = {
+        'messages': [],
+        'chatInfo': {}
+    }
+    parsed = None
+    if workers and workers > 1:
+        try:
+            parsed = parse_in_parallel(filepath, workers, partial(_load_message_chunk, date_range=date_range),
+                                       progress)
+        except Exception as e:
+            logger.warning(f"⚠️ 并行解析失败，改用单进程解析: {e}")
+    
+    if parsed is not None:
+        result['chatInfo'], parts = parsed
+        for part in parts:
+            result['messages'].extend(part)
+    else:
+        trimmer = _MessageTrimmer(date_range)
+        trimmer.chat_info = result['chatInfo']
+        
+        start_time = time.perf_counter()
         try:
-            with open(filepath, 'r', encoding='utf-8-sig') as f:
-                return json.load(f)
-        except MemoryError:
-            logger.error("❌ 文件过大，无法加载到内存")
-            raise MemoryError("JSON 文件过大，请减小文件大小或增加系统内存")
+            with open(filepath, 'rb') as f:
+                result['messages'].extend(_trimmed_messages(backend, f, trimmer, progress))
+        except JSONError as e:
+            # ijson 无法解析的文件（如带 UTF-8 BOM）交给标准库再试一次；裁剪器本身的异常照常抛出
+            logger.warning(f"⚠️ 流式解析失败，尝试标准加载: {e}")
+            return _load_json_standard(filepath, date_range)
+        _log_parse_rate(trimmer.event_count, time.perf_counter() - start_time)
+        _log_rejected(trimmer.rejected_count)
+    
+    # 确保群名有值
+    chat_name = result['chatInfo'].get('name', '未知群聊')
+    if not chat_name:
+        chat_name = '未知群聊'
+        result['chatInfo']['name'] = chat_name
         
+    logger.info(f"✅ 成功加载 {len(result['messages'])} 条消息, 群聊: {chat_name}")
+    return result
+
+
+def _load_json_standard(filepath, date_range=None):
+    """用标准 json 模块整体加载（ijson 不可用或无法解析时），同样按 date_range 丢弃范围外的消息"""
+    try:
+        with open(filepath, 'r', encoding='utf-8-sig') as f:
+            data = json.load(f)
+    except MemoryError:
+        logger.error("❌ 文件过大，无法加载到内存")
+        raise MemoryError("JSON 文件过大，请减小文件大小或增加系统内存")
+    if date_range is not None and isinstance(data, dict) and isinstance(data.get('messages'), list):
+        messages = data['messages']
+        data['messages'] = [msg for msg in messages
+                            if in_date_range(parse_epoch(msg.get('timestamp')), date_range)]
+        _log_rejected(len(messages) - len(data['messages']))
+    return data
+
+# ---------- 字符分类（模块加载时预先构建，调用时只做查表或单次正则扫描） ----------
+
+_EMOJI_RANGES = (
+    (0x1F600, 0x1F64F), (0x1F300, 0x1F5FF), (0x1F680, 0x1F6FF),
+    (0x1F1E0, 0x1F1FF), (0x2702, 0x27B0), (0x1F900, 0x1F9FF),
+    (0x1FA00, 0x1FA6F), (0x1FA70, 0x1FAFF), (0x2600, 0x26FF), (0x2300, 0x23FF),
+)
+_EMOJI_CHARS = frozenset(chr(code) for start, end in _EMOJI_RANGES for code in range(start, end + 1))
+_EMOJI_PATTERN = re.compile('[' + ''.join(f'{chr(start)}-{chr(end)}' for start, end in _EMOJI_RANGES) + ']')
+
 def extract_emojis(text):
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"
-        "\U0001F300-\U0001F5FF"
-        "\U0001F680-\U0001F6FF"
-        "\U0001F1E0-\U0001F1FF"
-        "\U00002702-\U000027B0"
-        "\U0001F900-\U0001F9FF"
-        "\U0001FA00-\U0001FA6F"
-        "\U0001FA70-\U0001FAFF"
-        "\U00002600-\U000026FF"
-        "\U00002300-\U000023FF"
-        "]",
-        flags=re.UNICODE
-    )
-    return emoji_pattern.findall(text)
+    return _EMOJI_PATTERN.findall(text)
 
 def is_emoji(char):
-    if len(char) != 1:
-        return False
-    code = ord(char)
-    emoji_ranges = [
-        (0x1F600, 0x1F64F), (0x1F300, 0x1F5FF), (0x1F680, 0x1F6FF),
-        (0x1F1E0, 0x1F1FF), (0x2702, 0x27B0), (0x1F900, 0x1F9FF),
-        (0x1FA00, 0x1FA6F), (0x1FA70, 0x1FAFF), (0x2600, 0x26FF), (0x2300, 0x23FF),
-    ]
-    return any(start <= code <= end for start, end in emoji_ranges)
+    return char in _EMOJI_CHARS
 
-def parse_timestamp(ts):
+# 时间戳缺失或无法解析
+NO_TIME = -(1 << 63)
+
+_TZ_CN = timezone(timedelta(hours=8))
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc).astimezone(_TZ_CN)
+_ONE_US = timedelta(microseconds=1)
+_US_PER_HOUR = 3600 * 1000000
+_US_PER_DAY = 24 * _US_PER_HOUR
+_US_CN_OFFSET = 8 * _US_PER_HOUR
+
+
+def datetime_to_epoch(dt):
+    """带时区的 datetime -> epoch 微秒"""
+    return (dt - _EPOCH) // _ONE_US
+
+
+def epoch_to_datetime(us):
+    """epoch 微秒 -> 东八区 datetime（与 parse_datetime 的结果一致）"""
+    return _EPOCH + timedelta(microseconds=us)
+
+
+def epoch_to_hour(us):
+    """epoch 微秒 -> 东八区小时"""
+    return (us // _US_PER_HOUR + 8) % 24
+
+
+def parse_epoch(ts):
+    """解析 ISO 8601 时间字符串为 epoch 微秒，失败返回 NO_TIME（不打日志）"""
     try:
         dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-        local_dt = dt.astimezone(timezone(timedelta(hours=8)))
-        return local_dt.hour
-    except:
+        return datetime_to_epoch(dt.astimezone(_TZ_CN))
+    except Exception:
+        return NO_TIME
+
+
+def epoch_to_day(us):
+    """epoch 微秒 -> 东八区日序号（自 1970-01-01 起的天数），同一天的消息序号相同"""
+    return (us + _US_CN_OFFSET) // _US_PER_DAY
+
+
+_date_cache = {}
+
+
+def epoch_to_date(us):
+    """epoch 微秒 -> 东八区日期字符串 'YYYY-MM-DD'（按日序号缓存）"""
+    day = epoch_to_day(us)
+    date_str = _date_cache.get(day)
+    if date_str is None:
+        date_str = _date_cache[day] = epoch_to_datetime(us).strftime('%Y-%m-%d')
+    return date_str
+
+
+def epoch_to_weekday(us):
+    """epoch 微秒 -> 东八区星期（0 为周一，与 datetime.weekday 一致）"""
+    return (epoch_to_day(us) + 3) % 7
+
+
+def resolve_date_range(start_date, end_date):
+    """
+    把 'YYYY-MM-DD' 格式的起止日期（东八区，均包含当天）换算成 epoch 微秒区间
+    
+    Returns:
+        两端都未设置时返回 None（不过滤）；否则返回 (起始, 结束)，
+        未设置或格式错误的一端为 None。启用过滤时时间戳缺失或无法解析的消息会被丢弃。
+    """
+    if start_date is None and end_date is None:
+        return None
+
+    start_ts = None
+    end_ts = None
+    if start_date:
+        try:
+            start_dt = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=_TZ_CN)
+            start_ts = datetime_to_epoch(start_dt)
+        except Exception as e:
+            logger.warning(f"起始日期格式错误: {start_date}, 错误: {e}")
+    if end_date:
+        try:
+            end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(
+                hour=23, minute=59, second=59, microsecond=999999, tzinfo=_TZ_CN)
+            end_ts = datetime_to_epoch(end_dt)
+        except Exception as e:
+            logger.warning(f"结束日期格式错误: {end_date}, 错误: {e}")
+    return start_ts, end_ts
+
+
+def in_date_range(ts, date_range):
+    """epoch 微秒时间戳是否落在 resolve_date_range 给出的区间内"""
+    if date_range is None:
+        return True
+    if ts == NO_TIME:
+        return False
+    start_ts, end_ts = date_range
+    if start_ts is not None and ts < start_ts:
+        return False
+    if end_ts is not None and ts > end_ts:
+        return False
+    return True
+
+
+def parse_timestamp(ts):
+    us = parse_epoch(ts)
+    if us == NO_TIME:
         return None
+    return epoch_to_hour(us)
 
 def parse_datetime(ts):
     """
@@ -270,13 +650,16 @@ def parse_datetime(ts):
     """
     if not ts:
         return None
-    try:
-        dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-        local_dt = dt.astimezone(timezone(timedelta(hours=8)))
-        return local_dt
-    except Exception as e:
-        logger.warning(f"解析时间失败: {ts} | 错误: {e}")
+    us = parse_epoch(ts)
+    if us == NO_TIME:
+        logger.warning(f"解析时间失败: {ts}")
         return None
+    return epoch_to_datetime(us)
+
+_INNER_BRACKETS = re.compile(r'\[[^\[\]]*\]')
+_HTTP_LINK = re.compile(r'https?://\S+')
+_WWW_LINK = re.compile(r'www\.\S+')
+_WHITESPACE = re.compile(r'\s+')
 
 def clean_text(text, at_contents=None):
     """清理文本，去除表情、@、回复等干扰内容"""
@@ -289,27 +672,24 @@ def clean_text(text, at_contents=None):
             if at_content:
                 text = text.replace(at_content, '')
     
-    # 2. 去除方括号内容（仅当存在时）
+    # 2. 去除方括号内容（仅当存在时，支持嵌套）
     if '[' in text or ']' in text:
-        result = []
-        bracket_depth = 0
-        for char in text:
-            if char == '[':
-                bracket_depth += 1
-            elif char == ']':
-                if bracket_depth > 0:
-                    bracket_depth -= 1
-            elif bracket_depth == 0:
-                result.append(char)
-        text = ''.join(result)
+        # 由内向外去掉成对的括号；剩下的 ']' 都在 '[' 之前：未闭合的 '[' 之后全部去掉，多余的 ']' 删除
+        removed = 1
+        while removed:
+            text, removed = _INNER_BRACKETS.subn('', text)
+        cut = text.find('[')
+        if cut >= 0:
+            text = text[:cut]
+        text = text.replace(']', '')
     
     # 3. 去除链接（仅当存在时）
     if 'http' in text or 'www.' in text:
-        text = re.sub(r'https?://\S+', '', text)
-        text = re.sub(r'www\.\S+', '', text)
+        text = _HTTP_LINK.sub('', text)
+        text = _WWW_LINK.sub('', text)
     
     # 4. 去除多余空白
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _WHITESPACE.sub(' ', text).strip()
     
     return text
 
@@ -360,28 +740,25 @@ def sanitize_filename(filename):
     return sanitized
 
 
+# 单字统计：汉字和英文字母；左右两侧都是文本边界、标点或空白的单字计为“独立出现”
+_SINGLE_CHAR_CLASS = '\u4e00-\u9fffa-zA-Z'
+_SINGLE_CHAR_PUNCTUATION = set('，。！？、；：""''（）,.!?;:\'"()[]【】《》<>…—～·')
+_SINGLE_CHAR_BOUNDARY = ''.join(re.escape(c) for c in sorted(_SINGLE_CHAR_PUNCTUATION)) + r'\s'
+_SINGLE_CHAR = re.compile(f'[{_SINGLE_CHAR_CLASS}]')
+_SOLO_CHAR = re.compile(f'[^{_SINGLE_CHAR_CLASS}]*([{_SINGLE_CHAR_CLASS}])[^{_SINGLE_CHAR_CLASS}]*')
+_BOUNDED_CHAR = re.compile(
+    f'(?<![^{_SINGLE_CHAR_BOUNDARY}])[{_SINGLE_CHAR_CLASS}](?![^{_SINGLE_CHAR_BOUNDARY}])')
+
+
 def analyze_single_chars(texts):
-    total_count = Counter()
-    solo_count = Counter()
-    boundary_count = Counter()
-    punctuation = set('，。！？、；：""''（）,.!?;:\'"()[]【】《》<>…—～·')
-    
-    for text in texts:
-        for char in text:
-            if re.match(r'^[\u4e00-\u9fffa-zA-Z]$', char):
-                total_count[char] += 1
-        
-        clean_chars = [c for c in text if re.match(r'^[\u4e00-\u9fffa-zA-Z]$', c)]
-        if len(clean_chars) == 1:
-            solo_count[clean_chars[0]] += 1
-        
-        for i, char in enumerate(text):
-            if not re.match(r'^[\u4e00-\u9fffa-zA-Z]$', char):
-                continue
-            left_ok = (i == 0) or (text[i-1] in punctuation) or (text[i-1].isspace())
-            right_ok = (i == len(text)-1) or (text[i+1] in punctuation) or (text[i+1].isspace())
-            if left_ok and right_ok:
-                boundary_count[char] += 1
+    texts = list(texts)
+    # 换行是空白，拼接后文本首尾仍是边界，计数与逐条处理相同
+    corpus = '\n'.join(texts)
+    total_count = Counter(_SINGLE_CHAR.findall(corpus))
+    boundary_count = Counter(_BOUNDED_CHAR.findall(corpus))
+    del corpus
+    # 整条文本只有一个汉字/字母
+    solo_count = Counter(match.group(1) for match in map(_SOLO_CHAR.fullmatch, texts) if match)
     
     result = {}
     for char in total_count:
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+新词发现
+按句子统计 2-5 字的 n-gram，用邻接熵和内部凝固度（PMI）筛选新词。两种实现，结果完全一致：
+
+apriori（默认）：逐层计数，只有左右两个 (n-1)-gram 都达到最低词频，n-gram 才可能达到，
+    因此只延伸高频的 (n-1)-gram。每一层的 n-gram 编号为整数，按位置存放在 array 中，
+    n-gram 由相邻两个 (n-1)-gram 的编号组合成一个整数键计数；
+    左右邻字也编码为整数键统一计数，不再为每个 n-gram 建立邻字 Counter。
+
+suffix_array：对全部句子拼接成的语料建立后缀数组（按前 5 个字排序）和 LCP，
+    相同前缀的后缀在数组中相邻，n-gram 的词频就是 LCP >= n 的连续区间长度，
+    邻字直接从区间内的位置读取，全程不需要以 n-gram 为键的哈希表，内存只与语料长度成正比，
+    适合多年的超大导出。两种实现的对比见 benchmarks/bench_new_words.py。
+"""
+
+import math
+from array import array
+from collections import Counter
+from itertools import compress, repeat
+from operator import add, lt, mul
+
+from logger import get_logger
+from utils import calculate_entropy
+
+logger = get_logger(__name__)
+
+ENGINES = ('apriori', 'suffix_array')
+
+# 句子之间的分隔符，必须是切句正则会切掉的字符（句子内不会出现）
+_SEP = '\n'
+# 邻字编码的进制（大于任何 Unicode 码位）
+_CHAR_BASE = 0x110000
+
+
+def _split_sentences(texts, split_pattern):
+    sentences = []
+    for text in texts:
+        for sentence in split_pattern.split(text):
+            sentence = sentence.strip()
+            if len(sentence) >= 2:
+                sentences.append(sentence)
+    return sentences
+
+
+def _build_corpus(texts, split_pattern):
+    """切句后首尾相接，句子前后都是分隔符。返回 (语料, 总字数)，没有有效句子时语料为空"""
+    sentences = _split_sentences(texts, split_pattern)
+    if not sentences:
+        return '', 0
+    total_chars = sum(map(len, sentences))
+    return _SEP + _SEP.join(sentences) + _SEP, total_chars
+
+
+def _min_pmi(word, freq, ngram_freq, total_chars):
+    """词内所有切分位置中最小的 PMI（两侧都有词频的切分才计算，没有则为 0）"""
+    min_pmi = float('inf')
+    for i in range(1, len(word)):
+        left_freq = ngram_freq.get(word[:i], 0)
+        right_freq = ngram_freq.get(word[i:], 0)
+        if left_freq > 0 and right_freq > 0:
+            pmi = math.log2((freq * total_chars) / (left_freq * right_freq + 1e-10))
+            min_pmi = min(min_pmi, pmi)
+    if min_pmi == float('inf'):
+        min_pmi = 0
+    return min_pmi
+
+
+def discover_words(texts, split_pattern, min_freq, entropy_threshold, pmi_threshold,
+                   max_len=5, engine='apriori'):
+    """
+    从文本中发现新词
+
+    Args:
+        texts: 清洗后的文本
+        split_pattern: 切句正则（需要能切掉换行符）
+        min_freq: 最低词频（NEW_WORD_MIN_FREQ）
+        entropy_threshold: 左右邻接熵的最小值（ENTROPY_THRESHOLD）
+        pmi_threshold: 内部凝固度的最小值（PMI_THRESHOLD）
+        max_len: 最长词长
+        engine: 'apriori' 或 'suffix_array'（NEW_WORD_ENGINE）
+
+    Returns:
+        list: 新词，按发现顺序
+    """
+    if engine not in ENGINES:
+        logger.warning(f"⚠️ 未知的新词发现实现 {engine!r}，使用 apriori")
+        engine = 'apriori'
+    corpus, total_chars = _build_corpus(texts, split_pattern)
+    if not corpus:
+        return []
+    discover = _discover_suffix_array if engine == 'suffix_array' else _discover_apriori
+    return discover(corpus, total_chars, min_freq, entropy_threshold, pmi_threshold, max_len)
+
+
+def _neighbor_entropy(pair_counts, freqs):
+    """由 (n-gram 编号, 邻字) 的计数计算每个 n-gram 的邻接熵（累加顺序与 calculate_entropy 相同）"""
+    entropy = [0.0] * len(freqs)
+    log2 = math.log2
+    for key, count in pair_counts.items():
+        gid = key // _CHAR_BASE
+        if gid:
+            p = count / freqs[gid]
+            entropy[gid] -= p * log2(p)
+    return entropy
+
+
+def _discover_apriori(corpus, total_chars, min_freq, entropy_threshold, pmi_threshold, max_len):
+    # 分隔符既是编号 0（无效），也是邻字中的句首/句尾
+    chars = array('I', map(ord, corpus))
+    threshold = max(min_freq, 1)
+
+    # 第 1 层：单字，低频字编号为 0
+    char_freq = Counter(corpus)
+    del char_freq[_SEP]
+    grams = ['']
+    gram_ids = {}
+    for char, freq in char_freq.items():
+        if freq >= threshold:
+            gram_ids[char] = len(grams)
+            grams.append(char)
+    del char_freq
+    level = array('I', map(gram_ids.get, corpus, repeat(0)))
+    del corpus
+
+    ngram_freq = {}  # 长度 >= 2 的高频 n-gram -> 词频，供计算 PMI
+    discovered = []
+    for n in range(2, max_len + 1):
+        # 位置 i 的 n-gram = 位置 i 与 i+1 的 (n-1)-gram，两个编号都非 0 时才有效
+        base = len(grams)
+        keys = array('Q', map(add, map(mul, level, repeat(base)), level[1:]))
+        counts = Counter(keys)
+
+        grams_n = ['']
+        freqs = [0]
+        gram_ids = {}
+        for key, freq in counts.items():
+            if freq < threshold:
+                continue
+            left, right = divmod(key, base)
+            if not left or not right:
+                continue
+            gram_ids[key] = len(grams_n)
+            grams_n.append(grams[left] + grams[right][-1])
+            freqs.append(freq)
+        del counts
+        if not gram_ids:
+            break
+        level = array('I', map(gram_ids.get, keys, repeat(0)))
+        del keys, gram_ids
+        grams = grams_n
+
+        # 位置 i 的 n-gram 左邻字在 i-1，右邻字在 i+n
+        left_entropy = _neighbor_entropy(
+            Counter(map(add, map(mul, level[1:], repeat(_CHAR_BASE)), chars)), freqs)
+        right_entropy = _neighbor_entropy(
+            Counter(map(add, map(mul, level, repeat(_CHAR_BASE)), chars[n:])), freqs)
+
+        for gid in range(1, len(grams)):
+            word = grams[gid]
+            if not word.strip():
+                continue
+            freq = freqs[gid]
+            ngram_freq[word] = freq
+            if freq < min_freq:
+                continue
+
+            if min(left_entropy[gid], right_entropy[gid]) < entropy_threshold:
+                continue
+
+            if _min_pmi(word, freq, ngram_freq, total_chars) < pmi_threshold:
+                continue
+
+            discovered.append(word)
+
+    return discovered
+
+
+def _build_suffix_array(corpus, chars, depth):
+    """
+    按前 depth 个字排序的后缀数组（只含能开始 2-gram 的位置）及相邻后缀的公共前缀长度（不跨句）
+    先按首字计数排序分桶，桶内再按后续字排序，排序时的临时内存只与最大的桶成正比
+    """
+    # 位置 p 与 p+1 都不是分隔符时才能开始一个 2-gram
+    starts = array('I', compress(range(len(chars) - 1), map(mul, chars, chars[1:])))
+
+    first = array('I', map(chars.__getitem__, starts))
+    bucket_start = {}
+    offset = 0
+    for char, count in sorted(Counter(first).items()):
+        bucket_start[char] = offset
+        offset += count
+    bounds = sorted(bucket_start.values()) + [offset]
+    sa = array('I', bytes(4 * offset))
+    for pos, char in zip(starts, first):
+        idx = bucket_start[char]
+        sa[idx] = pos
+        bucket_start[char] = idx + 1
+    del starts, first, bucket_start
+
+    for begin, end in zip(bounds, bounds[1:]):
+        if end - begin > 1:
+            sa[begin:end] = array('I', sorted(sa[begin:end], key=lambda p: corpus[p + 1:p + depth]))
+
+    lcp = array('B', bytes(len(sa)))
+    prev = sa[0] if sa else 0
+    for i in range(1, len(sa)):
+        pos = sa[i]
+        length = 0
+        while length < depth and chars[pos + length] == chars[prev + length] and chars[pos + length]:
+            length += 1
+        lcp[i] = length
+        prev = pos
+    return sa, lcp
+
+
+def _discover_suffix_array(corpus, total_chars, min_freq, entropy_threshold, pmi_threshold, max_len):
+    # 字编号按首次出现顺序，分隔符为 0（也代表句首/句尾）；末尾补分隔符，读取 p+max_len 不越界
+    corpus += _SEP * max_len
+    char_ids = {char: idx for idx, char in enumerate(dict.fromkeys(_SEP + corpus))}
+    chars = array('I', map(char_ids.__getitem__, corpus))
+    del char_ids
+    sa, lcp = _build_suffix_array(corpus, chars, max_len)
+    threshold = max(min_freq, 1)
+
+    ngram_freq = {}  # 长度 >= 2 的高频 n-gram -> 词频，供计算 PMI
+    discovered = []
+    for n in range(2, max_len + 1):
+        # LCP < n 的位置是 n-gram 区间的起点；区间内的后缀共享同一个 n-gram
+        bounds = array('I', compress(range(len(lcp)), map(lt, lcp, repeat(n))))
+        bounds.append(len(sa))
+        for begin, end in zip(bounds, bounds[1:]):
+            freq = end - begin
+            if freq < threshold:
+                continue
+            pos = sa[begin]
+            word = corpus[pos:pos + n]
+            if freq == 1 and _SEP in word:
+                continue
+            if not word.strip():
+                continue
+            ngram_freq[word] = freq
+            if freq < min_freq:
+                continue
+
+            # 先算 PMI（只需查词频），通过后才读取区间内的邻字算邻接熵
+            if _min_pmi(word, freq, ngram_freq, total_chars) < pmi_threshold:
+                continue
+
+            # 按出现位置顺序计数，熵的累加顺序与逐个枚举时相同
+            left = Counter()
+            right = Counter()
+            for p in sorted(sa[begin:end]):
+                left[chars[p - 1]] += 1
+                right[chars[p + n]] += 1
+            if min(calculate_entropy(left), calculate_entropy(right)) < entropy_threshold:
+                continue
+
+            discovered.append(word)
+
+    return discovered